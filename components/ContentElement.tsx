@@ -30,6 +30,88 @@ export interface QuestionContent {
     imageWidth?: number;
     imageHeight?: number;
     altText?: string;
+    imageAtlas?: SpriteRegion;
+
+    // Table content
+    tableData?: TableData;
+}
+
+export interface SpriteRegion {
+    x: number;
+    y: number;
+    width: number;
+    height: number;
+    atlas_width: number;
+    atlas_height: number;
+}
+
+export interface TableData {
+    rows: (string | null)[][];
+    cells: (number[] | null)[][];
+    column_x: number[];
+    row_y: number[];
+    header_row: boolean;
+}
+
+/**
+ * Render an extracted table. Cells continuing a horizontally merged cell
+ * are null and widen the cell to their left.
+ */
+function TableContent({ table, style }: { table: TableData; style: CSSProperties }) {
+    return (
+        <table style={style} className="question-table">
+            <tbody>
+                {table.rows.map((row, rowIndex) => {
+                    const Cell = table.header_row && rowIndex === 0 ? 'th' : 'td';
+                    const cells: React.ReactNode[] = [];
+                    row.forEach((text, colIndex) => {
+                        if (text === null && colIndex > 0) return;
+                        let span = 1;
+                        while (colIndex + span < row.length && row[colIndex + span] === null) span++;
+                        cells.push(
+                            <Cell key={colIndex} colSpan={span > 1 ? span : undefined}>
+                                {text}
+                            </Cell>
+                        );
+                    });
+                    return <tr key={rowIndex}>{cells}</tr>;
+                })}
+            </tbody>
+        </table>
+    );
+}
+
+/**
+ * Render a small image as its region of a sprite atlas, so a question's
+ * small images share one request. The region is scaled to `width` px.
+ */
+function SpriteImage({
+    url,
+    region,
+    width,
+    alt,
+}: {
+    url: string;
+    region: SpriteRegion;
+    width: number;
+    alt: string;
+}) {
+    const scale = width / region.width;
+    return (
+        <div
+            role="img"
+            aria-label={alt}
+            className="question-image"
+            style={{
+                width: `${width}px`,
+                height: `${region.height * scale}px`,
+                backgroundImage: `url(${url})`,
+                backgroundRepeat: 'no-repeat',
+                backgroundSize: `${region.atlas_width * scale}px ${region.atlas_height * scale}px`,
+                backgroundPosition: `${-region.x * scale}px ${-region.y * scale}px`,
+            }}
+        />
+    );
 }
 
 interface ContentElementProps {
@@ -69,28 +151,51 @@ export default function ContentElement({
 
             return (
                 <div style={style} className="question-image-wrapper">
-                    <Image
-                        src={content.imageUrl}
-                        alt={content.altText || 'Question image'}
-                        width={content.imageWidth || 400}
-                        height={content.imageHeight || 300}
-                        className="question-image"
-                    />
+                    {content.imageAtlas ? (
+                        <SpriteImage
+                            url={content.imageUrl}
+                            region={content.imageAtlas}
+                            width={content.imageWidth || 400}
+                            alt={content.altText || 'Question image'}
+                        />
+                    ) : (
+                        <Image
+                            src={content.imageUrl}
+                            alt={content.altText || 'Question image'}
+                            width={content.imageWidth || 400}
+                            height={content.imageHeight || 300}
+                            className="question-image"
+                        />
+                    )}
                 </div>
             );
 
-        case 'DIAGRAM':
         case 'TABLE':
+            if (content.tableData) {
+                return <TableContent table={content.tableData} style={style} />;
+            }
+            return null;
+
+        case 'DIAGRAM':
             if (content.imageUrl) {
                 return (
                     <div style={style} className="question-diagram-wrapper">
-                        <Image
-                            src={content.imageUrl}
-                            alt={content.altText || 'Diagram'}
-                            width={content.imageWidth || 500}
-                            height={content.imageHeight || 400}
-                            className="question-image"
-                        />
+                        {content.imageAtlas ? (
+                            <SpriteImage
+                                url={content.imageUrl}
+                                region={content.imageAtlas}
+                                width={content.imageWidth || 500}
+                                alt={content.altText || 'Diagram'}
+                            />
+                        ) : (
+                            <Image
+                                src={content.imageUrl}
+                                alt={content.altText || 'Diagram'}
+                                width={content.imageWidth || 500}
+                                height={content.imageHeight || 400}
+                                className="question-image"
+                            />
+                        )}
                     </div>
                 );
             }
@@ -0,0 +1,280 @@
+"""
+Bulk import a directory tree of past paper PDFs.
+
+Walks a directory for PDFs, works out each paper's metadata from a CSV
+manifest or from its path, parses files on a process pool and stores them
+through the configured database service. Progress is appended to a state
+file as each paper finishes, so an interrupted import resumes where it
+stopped. Run from parsing-api/:
+
+    python -m app.bulk_import /data/archive --manifest archive.csv --workers 4
+
+A manifest has a ``path`` column (relative to the directory) and any
+PaperMetadata fields as further columns. Without one, metadata is read
+from the path, e.g. ``AQA/2019/June/AQA-7136-paper-1.pdf``.
+"""
+import argparse
+import asyncio
+import csv
+import json
+import multiprocessing
+import os
+import re
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Any, List, Optional, Tuple
+
+from pydantic import ValidationError
+
+from app.config import get_settings
+from app.models.request import PaperMetadata
+from app.services.db_service import get_database_service
+from app.services.docpack import PackedDocument
+from app.services.parse_pool import parse_pdf_to_spool
+
+
+# Exam boards recognised in paths, with their canonical spelling
+EXAM_BOARDS = {
+    "aqa": "AQA", "edexcel": "Edexcel", "pearson": "Edexcel", "ocr": "OCR",
+    "wjec": "WJEC", "eduqas": "Eduqas", "cie": "CIE", "cambridge": "CIE",
+}
+SESSIONS = {
+    "jan": "January", "january": "January", "may": "June", "jun": "June",
+    "june": "June", "summer": "June", "oct": "October", "october": "October",
+    "nov": "November", "november": "November", "winter": "November",
+}
+
+_TOKEN = re.compile(r"[a-z]+|\d+")
+_PAPER_NUMBER = re.compile(r"(?:paper|qp|p)[\s_-]*([1-3])\b")
+
+
+def infer_metadata(relative_path: str) -> Dict[str, Any]:
+    """
+    Read exam board, year, session and paper number from a file path.
+
+    Args:
+        relative_path: Path of the PDF relative to the import directory
+
+    Returns:
+        The fields that could be recognised
+    """
+    text = relative_path.lower().replace("\\", "/")
+    metadata: Dict[str, Any] = {}
+    for token in _TOKEN.findall(text):
+        if "exam_board" not in metadata and token in EXAM_BOARDS:
+            metadata["exam_board"] = EXAM_BOARDS[token]
+        elif "session" not in metadata and token in SESSIONS:
+            metadata["session"] = SESSIONS[token]
+        elif "year" not in metadata and len(token) == 4 and token.startswith("20"):
+            metadata["year"] = int(token)
+    match = _PAPER_NUMBER.search(text)
+    if match:
+        metadata["paper_number"] = int(match.group(1))
+    return metadata
+
+
+def load_manifest(path: str) -> Dict[str, Dict[str, Any]]:
+    """
+    Read a CSV manifest keyed by relative path.
+
+    Empty cells are left out so path inference can fill them in.
+    """
+    with open(path, newline="", encoding="utf-8") as f:
+        return {
+            row.pop("path").replace("\\", "/"): {k: v for k, v in row.items() if v}
+            for row in csv.DictReader(f)
+        }
+
+
+def find_pdfs(root: str) -> List[str]:
+    """Relative paths of all PDFs under ``root``, in a stable order."""
+    found = []
+    for directory, subdirectories, files in os.walk(root):
+        subdirectories.sort()
+        for name in sorted(files):
+            if name.lower().endswith(".pdf"):
+                found.append(os.path.relpath(os.path.join(directory, name), root).replace("\\", "/"))
+    return found
+
+
+class ImportState:
+    """
+    Append-only record of finished files.
+
+    Each line is a JSON object for one file. The last line for a path wins,
+    and a file counts as done while its size and modification time match.
+    """
+
+    def __init__(self, path: str):
+        """Load previous progress from ``path`` if it exists."""
+        self.path = path
+        self.entries: Dict[str, Dict[str, Any]] = {}
+        if os.path.exists(path):
+            with open(path, encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                    except json.JSONDecodeError:
+                        continue  # torn final line from an interrupted run
+                    self.entries[entry["path"]] = entry
+        self._file = open(path, "a", encoding="utf-8")
+
+    def is_done(self, relative_path: str, stat: os.stat_result) -> bool:
+        """Whether the file was imported and has not changed since."""
+        entry = self.entries.get(relative_path)
+        return (
+            entry is not None and entry["status"] == "done"
+            and entry["size"] == stat.st_size and entry["mtime"] == stat.st_mtime
+        )
+
+    def record(self, relative_path: str, stat: os.stat_result, status: str, **fields: Any):
+        """Append a result and flush it to disk."""
+        entry = {
+            "path": relative_path, "status": status,
+            "size": stat.st_size, "mtime": stat.st_mtime, **fields
+        }
+        self.entries[relative_path] = entry
+        self._file.write(json.dumps(entry) + "\n")
+        self._file.flush()
+        os.fsync(self._file.fileno())
+
+    def close(self):
+        """Close the state file."""
+        self._file.close()
+
+
+class Progress:
+    """Single-line progress bar with throughput, written to stderr."""
+
+    def __init__(self, total: int):
+        self.total = total
+        self.done = 0
+        self.failed = 0
+        self.pages = 0
+        self.start = time.monotonic()
+
+    def update(self, pages: int = 0, failed: bool = False):
+        """Count a finished file and redraw."""
+        self.done += 1
+        self.failed += failed
+        self.pages += pages
+        elapsed = max(time.monotonic() - self.start, 1e-9)
+        rate = self.done / elapsed
+        eta = (self.total - self.done) / rate if rate else 0
+        filled = int(30 * self.done / max(self.total, 1))
+        sys.stderr.write(
+            f"\r[{'#' * filled}{'.' * (30 - filled)}] {self.done}/{self.total} "
+            f"{rate:.2f} papers/s {self.pages / elapsed:.1f} pages/s "
+            f"failed {self.failed} eta {eta / 60:.0f}m "
+        )
+        sys.stderr.flush()
+
+
+async def import_file(
+    root: str,
+    relative_path: str,
+    metadata: PaperMetadata,
+    pool: ProcessPoolExecutor,
+    spool_dir: Optional[str]
+) -> Tuple[str, int]:
+    """
+    Parse one PDF on the pool and store it.
+
+    Returns:
+        Tuple of (paper ID, page count)
+    """
+    with open(os.path.join(root, relative_path), "rb") as f:
+        pdf_bytes = f.read()
+
+    async def parse() -> Dict[str, Any]:
+        loop = asyncio.get_running_loop()
+        path = await loop.run_in_executor(pool, parse_pdf_to_spool, pdf_bytes, spool_dir)
+        return PackedDocument.open(path, delete=True).to_parsed_data()
+
+    paper, parsed_data = await get_database_service().ingest_paper(
+        parse(),
+        metadata=metadata.model_dump(),
+        pdf_bytes=pdf_bytes
+    )
+    return paper["id"], len(parsed_data["pages"])
+
+
+async def run(args: argparse.Namespace) -> int:
+    """Import every pending PDF; returns the number of failures."""
+    settings = get_settings()
+    manifest = load_manifest(args.manifest) if args.manifest else {}
+    state = ImportState(args.state)
+
+    # Resolve metadata up front so bad paths are reported before any work
+    pending: List[Tuple[str, os.stat_result, PaperMetadata]] = []
+    for relative_path in find_pdfs(args.directory):
+        stat = os.stat(os.path.join(args.directory, relative_path))
+        if state.is_done(relative_path, stat):
+            continue
+        fields = {**infer_metadata(relative_path), **manifest.get(relative_path, {})}
+        try:
+            pending.append((relative_path, stat, PaperMetadata(**fields)))
+        except ValidationError as e:
+            missing = ", ".join(".".join(map(str, err["loc"])) for err in e.errors())
+            print(f"Skipping {relative_path}: no usable metadata ({missing})")
+            if not args.dry_run:
+                state.record(relative_path, stat, "error", error=f"metadata: {missing}")
+
+    done = sum(1 for entry in state.entries.values() if entry["status"] == "done")
+    print(f"{len(pending)} PDFs to import, {done} already done")
+    if args.dry_run:
+        for relative_path, _, metadata in pending:
+            print(f"  {relative_path}: {metadata.model_dump(exclude_none=True)}")
+        state.close()
+        return 0
+
+    workers = args.workers or settings.parse_workers
+    progress = Progress(len(pending))
+    # Keep every worker busy while the main process stores finished papers
+    slots = asyncio.Semaphore(workers + 1)
+
+    async def worker(relative_path: str, stat: os.stat_result, metadata: PaperMetadata):
+        async with slots:
+            try:
+                paper_id, pages = await import_file(
+                    args.directory, relative_path, metadata, pool, settings.parse_spool_dir or None
+                )
+            except Exception as e:
+                state.record(relative_path, stat, "error", error=str(e))
+                progress.update(failed=True)
+                return
+            state.record(relative_path, stat, "done", paper_id=paper_id)
+            progress.update(pages=pages)
+
+    with ProcessPoolExecutor(
+        max_workers=workers,
+        mp_context=multiprocessing.get_context("spawn")
+    ) as pool:
+        try:
+            await asyncio.gather(*(worker(*item) for item in pending))
+        finally:
+            state.close()
+            sys.stderr.write("\n")
+
+    print(f"Imported {progress.done - progress.failed} papers, {progress.failed} failed "
+          f"(see {args.state})")
+    return progress.failed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("directory", help="Directory to search for PDFs")
+    parser.add_argument("--manifest", help="CSV with a path column and PaperMetadata fields")
+    parser.add_argument("--state", default="bulk_import_state.jsonl",
+                        help="Progress file; rerun with the same file to resume")
+    parser.add_argument("--workers", type=int, default=0,
+                        help="Parse processes (default: PARSE_WORKERS)")
+    parser.add_argument("--dry-run", action="store_true",
+                        help="List the PDFs and metadata that would be imported")
+    failures = asyncio.run(run(parser.parse_args()))
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,6 +1,7 @@
 """Configuration management for the API."""
 from pydantic_settings import BaseSettings
 from functools import lru_cache
+from typing import Optional
 
 
 class Settings(BaseSettings):
@@ -12,10 +13,64 @@ class Settings(BaseSettings):
     supabase_service_key: str
     storage_bucket: str = "question-images"
     
+    # Database backend: "supabase" (PostgREST) or "postgres" (direct COPY)
+    db_backend: str = "supabase"
+    database_url: Optional[str] = None
+    pg_pool_size: int = 10  # pooled connections per process for DB_BACKEND=postgres
+    
     # API
     api_host: str = "0.0.0.0"
     api_port: int = 8000
     
+    # Parsing
+    parse_workers: int = 2
+    parse_max_concurrency: int = 0  # 0 means one parse per worker
+    parse_queue_size: int = 16
+    parse_queue_timeout: float = 60.0
+    parse_retry_after: int = 10
+    parse_aging_rate: float = 2.0  # page-equivalents of priority gained per second waited
+    memory_profiling: bool = False  # measure per-stage peak memory of each upload
+    parse_spool_dir: str = ""  # where workers write packed results; "" = system temp
+    diagram_dpi: int = 192
+    
+    # Image transcoding
+    image_formats: str = "webp"  # comma-separated; "webp,avif" adds AVIF copies
+    image_target_dpi: int = 192
+    image_thumbnail_size: int = 160
+    image_quality: int = 80
+    image_workers: int = 4
+    image_upload_buffer_bytes: int = 32 * 1024 * 1024  # extracted bytes awaiting upload per parse
+    image_atlas: bool = False  # pack small images into per-paper sprite atlases
+    image_atlas_max_image: float = 96  # largest placement (points) packed into an atlas
+    image_atlas_size: int = 2048  # atlas width and height limit in pixels
+    
+    # Page rendering
+    page_cache_dir: str = ".page_cache"
+    page_cache_max_bytes: int = 2 * 1024 * 1024 * 1024
+    page_render_zooms: str = "1,2,4"  # comma-separated scale factors
+    page_tile_size: int = 512
+    render_workers: int = 2
+    
+    # Batch ingest
+    batch_max_files: int = 200
+    batch_max_bytes: int = 500 * 1024 * 1024
+    db_insert_batch_size: int = 500
+    ingest_queue_size: int = 2  # row batches a fast ingest stage may run ahead of the next
+    ingest_abandon_after_minutes: int = 60  # pending ingests older than this are removed
+    
+    # Database and storage calls
+    db_timeout: float = 30.0  # seconds per attempt
+    storage_timeout: float = 120.0
+    retry_attempts: int = 4  # attempts for idempotent calls failing transiently
+    retry_base_delay: float = 0.25  # backoff doubles per retry, with full jitter
+    retry_max_delay: float = 5.0
+    circuit_failure_threshold: int = 5  # consecutive failures that open the breaker
+    circuit_reset_seconds: float = 30.0  # fail fast this long before a trial call
+    
+    # Similar questions
+    similarity_threshold: float = 0.5
+    similarity_max_candidates: int = 500
+    
     class Config:
         env_file = ".env"
         case_sensitive = False
@@ -1,8 +1,18 @@
 """Main FastAPI application."""
+import asyncio
+import tracemalloc
+from datetime import timedelta
+from typing import Optional
+
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from app.routers import parse
 from app.config import get_settings
+from app.services.db_service import get_database_service
+from app.services.image_pipeline import shutdown_image_pool
+from app.services.page_renderer import shutdown_page_renderer
+from app.services.parse_pool import shutdown_parse_executor
+from app.utils.supabase_client import close_async_client
 
 # Initialize settings
 settings = get_settings()
@@ -27,6 +37,47 @@ app.add_middleware(
 app.include_router(parse.router)
 
 
+_ingest_gc_task: Optional[asyncio.Task] = None
+
+
+async def collect_abandoned_ingests_periodically():
+    """Remove stalled partial ingests every INGEST_ABANDON_AFTER_MINUTES."""
+    older_than = timedelta(minutes=settings.ingest_abandon_after_minutes)
+    while True:
+        await asyncio.sleep(older_than.total_seconds())
+        try:
+            removed = await get_database_service().collect_abandoned_ingests(older_than)
+            if removed:
+                print(f"Removed {len(removed)} abandoned ingests")
+        except Exception as e:
+            print(f"Warning: Could not collect abandoned ingests: {e}")
+
+
+@app.on_event("startup")
+async def startup():
+    """Start background maintenance."""
+    global _ingest_gc_task
+    if settings.memory_profiling:
+        # Traced for the process lifetime so concurrent uploads can profile
+        tracemalloc.start()
+    _ingest_gc_task = asyncio.create_task(collect_abandoned_ingests_periodically())
+
+
+@app.on_event("shutdown")
+async def shutdown():
+    """Stop background maintenance and release worker processes and connections on shutdown."""
+    if _ingest_gc_task is not None:
+        _ingest_gc_task.cancel()
+    shutdown_parse_executor()
+    shutdown_image_pool()
+    shutdown_page_renderer()
+    await close_async_client()
+    if settings.db_backend == "postgres":
+        # Imported lazily so psycopg is only required for this backend
+        from app.services.pg_service import close_connection_pool
+        close_connection_pool()
+
+
 @app.get("/")
 async def root():
     """Root endpoint."""
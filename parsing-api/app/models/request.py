@@ -1,6 +1,6 @@
 """Request models for API endpoints."""
 from pydantic import BaseModel, Field
-from typing import Optional
+from typing import List, Optional
 
 
 class PaperMetadata(BaseModel):
@@ -14,3 +14,11 @@ class PaperMetadata(BaseModel):
     paper_number: int = Field(..., description="Paper number (1, 2, 3)", ge=1, le=3)
     total_marks: Optional[int] = Field(None, description="Total marks for the paper")
     title: Optional[str] = Field(None, description="Custom title for the paper")
+
+
+class ResegmentRequest(BaseModel):
+    """Papers to re-segment from their stored span layers."""
+    
+    paper_ids: Optional[List[str]] = Field(
+        None, description="Paper IDs to re-segment; all papers if omitted"
+    )
@@ -13,6 +13,48 @@ class ContentType(str, Enum):
     EQUATION = "EQUATION"
 
 
+class ImageVariant(BaseModel):
+    """A transcoded copy of an image at a particular size and format."""
+    
+    label: str
+    format: str
+    width: int
+    height: int
+    url: str
+
+
+class SpriteRegion(BaseModel):
+    """Where an image sits within the sprite atlas given as its image URL."""
+    
+    x: int
+    y: int
+    width: int
+    height: int
+    atlas_width: int
+    atlas_height: int
+
+
+class TableData(BaseModel):
+    """Structure of an extracted table."""
+    
+    rows: List[List[Optional[str]]]  # cell text; None where a merged cell continues
+    cells: List[List[Optional[List[float]]]]  # cell rectangles [x0, y0, x1, y1]
+    column_x: List[float]  # column boundaries, left to right
+    row_y: List[float]  # row boundaries, top to bottom
+    header_row: bool
+
+
+class TextStyle(BaseModel):
+    """A distinct text style used in a paper."""
+    
+    style_id: int
+    font_family: Optional[str] = None
+    font_size: Optional[float] = None
+    is_bold: bool = False
+    is_italic: bool = False
+    color: int = 0
+
+
 class QuestionContentResponse(BaseModel):
     """Response model for question content elements."""
     
@@ -20,8 +62,9 @@ class QuestionContentResponse(BaseModel):
     sequence_order: int
     content_type: ContentType
     
-    # Text content
+    # Text content; formatting is in the paper's style table unless expanded
     text: Optional[str] = None
+    style_id: Optional[int] = None
     font_size: Optional[float] = None
     font_family: Optional[str] = None
     is_bold: bool = False
@@ -35,9 +78,14 @@ class QuestionContentResponse(BaseModel):
     
     # Image content
     image_url: Optional[str] = None
+    image_variants: Optional[List[ImageVariant]] = None
+    image_atlas: Optional[SpriteRegion] = None
     image_width: Optional[int] = None
     image_height: Optional[int] = None
     alt_text: Optional[str] = None
+    
+    # Table content
+    table_data: Optional[TableData] = None
 
 
 class QuestionResponse(BaseModel):
@@ -63,9 +111,42 @@ class PaperResponse(BaseModel):
     paper_number: int
     total_marks: Optional[int] = None
     uploaded_at: str
+    styles: List[TextStyle] = []
     questions: List[QuestionResponse] = []
 
 
+class PaperSummary(BaseModel):
+    """Lightweight paper row for catalogue listings."""
+    
+    id: str
+    title: str
+    exam_board: str
+    subject: str
+    level: str
+    year: int
+    session: str
+    paper_number: int
+    total_marks: Optional[int] = None
+    uploaded_at: str
+    question_count: int
+
+
+class PaperListResponse(BaseModel):
+    """Response model for one page of the paper catalogue."""
+    
+    papers: List[PaperSummary]
+    next_cursor: Optional[str] = None
+
+
+class StageMemory(BaseModel):
+    """Peak memory of one pipeline stage (see app.utils.profiling)."""
+    
+    stage: str
+    calls: int
+    peak_bytes: int  # largest Python heap growth during one call
+    rss_growth_bytes: int  # rise in the process's peak RSS
+
+
 class ParseResponse(BaseModel):
     """Response model for PDF parsing operation."""
     
@@ -73,4 +154,118 @@ class ParseResponse(BaseModel):
     status: str
     questions_count: int
     processing_time: float
+    tables_count: int = 0
+    table_rows_saved: int = 0  # content rows avoided by storing tables whole
+    pages_skipped: int = 0  # blank, cover, instruction and additional pages
+    memory_profile: Optional[List[StageMemory]] = None  # with MEMORY_PROFILING on
     message: Optional[str] = None
+
+
+class BatchFileResult(BaseModel):
+    """Outcome of ingesting a single file within a batch."""
+    
+    filename: str
+    status: str
+    paper_id: Optional[str] = None
+    questions_count: Optional[int] = None
+    error: Optional[str] = None
+
+
+class BatchParseResponse(BaseModel):
+    """Response model for a batch PDF parsing operation."""
+    
+    total: int
+    succeeded: int
+    failed: int
+    processing_time: float
+    results: List[BatchFileResult]
+
+
+class PageZoomLevel(BaseModel):
+    """Tile grid for a page at one zoom level."""
+    
+    zoom: float
+    columns: int
+    rows: int
+
+
+class PageRenderInfo(BaseModel):
+    """Response model describing how a page is tiled for rendering."""
+    
+    page_number: int
+    width: float
+    height: float
+    tile_size: int
+    zoom_levels: List[PageZoomLevel]
+
+
+class ResegmentResult(BaseModel):
+    """Outcome of re-segmenting a single paper."""
+    
+    paper_id: str
+    status: str
+    questions_count: Optional[int] = None
+    error: Optional[str] = None
+
+
+class ResegmentResponse(BaseModel):
+    """Response model for a re-segmentation run."""
+    
+    total: int
+    succeeded: int
+    failed: int
+    processing_time: float
+    results: List[ResegmentResult]
+
+
+class SearchHit(BaseModel):
+    """A question matching a full-text search."""
+    
+    question_id: str
+    question_number: str
+    marks: Optional[int] = None
+    paper_id: str
+    paper_title: str
+    exam_board: str
+    year: int
+    session: str
+    paper_number: int
+    rank: float
+    snippet: str
+
+
+class SearchResponse(BaseModel):
+    """Response model for question search."""
+    
+    query: str
+    limit: int
+    offset: int
+    hits: List[SearchHit]
+
+
+class SimilarQuestion(BaseModel):
+    """A question that is a near-duplicate of another."""
+    
+    question_id: str
+    question_number: str
+    marks: Optional[int] = None
+    paper_id: str
+    paper_title: str
+    exam_board: str
+    year: int
+    session: str
+    paper_number: int
+    similarity: float
+
+
+class SimilarQuestionsResponse(BaseModel):
+    """Response model for similar question lookup."""
+    
+    question_id: str
+    similar: List[SimilarQuestion]
+
+
+class IngestCleanupResponse(BaseModel):
+    """Response model for garbage collection of abandoned ingests."""
+    
+    removed: List[str]
@@ -1,20 +1,60 @@
 """API router for PDF parsing endpoints."""
+import asyncio
+import contextlib
+import io
+import logging
 import time
-from fastapi import APIRouter, UploadFile, File, Form, HTTPException
-from typing import Dict, Any
+import zipfile
+import zlib
+from datetime import timedelta
+from pathlib import PurePosixPath
+from fastapi import APIRouter, UploadFile, File, Form, HTTPException, Query, Request, Response
+from typing import Dict, Any, List, Optional, Tuple
 import json
 
-from app.models.request import PaperMetadata
-from app.models.response import ParseResponse, PaperResponse
-from app.services.pdf_parser import PDFParser
-from app.services.db_service import DatabaseService
+from app.config import get_settings
+from app.models.request import PaperMetadata, ResegmentRequest
+from app.models.response import (
+    ParseResponse,
+    PaperResponse,
+    PaperListResponse,
+    BatchFileResult,
+    BatchParseResponse,
+    IngestCleanupResponse,
+    PageRenderInfo,
+    ResegmentResponse,
+    SearchResponse,
+    SimilarQuestionsResponse,
+)
+from app.services.db_service import DatabaseService, get_database_service
+from app.services.ingest_pipeline import pipeline_stats
+from app.services.page_renderer import get_page_renderer
+from app.services.parse_pool import ParserBusyError, get_parse_executor
+from app.services.resegment import resegment_papers
+from app.utils.profiling import memory_profile, profile_stage
+from app.utils.resilience import CircuitOpenError, breaker_stats
 
 
 router = APIRouter(prefix="/api/parse", tags=["parsing"])
 
+logger = logging.getLogger(__name__)
+
+
+def _client_id(request: Request) -> str:
+    """
+    Identify the caller for fair scheduling of parse slots.
+    
+    Uses the ``X-Client-Id`` header when sent, otherwise the client address.
+    """
+    client_id = request.headers.get("x-client-id")
+    if client_id:
+        return client_id
+    return request.client.host if request.client else ""
+
 
 @router.post("/upload", response_model=ParseResponse)
 async def upload_and_parse_pdf(
+    request: Request,
     file: UploadFile = File(..., description="PDF file to parse"),
     metadata: str = Form(..., description="Paper metadata as JSON string")
 ):
@@ -22,6 +62,7 @@ async def upload_and_parse_pdf(
     Upload and parse a PDF past paper.
     
     Args:
+        request: Incoming request, used to identify the client
         file: PDF file
         metadata: JSON string with paper metadata
         
@@ -41,33 +82,57 @@ async def upload_and_parse_pdf(
     except Exception as e:
         raise HTTPException(status_code=400, detail=f"Invalid metadata: {str(e)}")
     
+    settings = get_settings()
+    profiling = memory_profile() if settings.memory_profiling else contextlib.nullcontext()
+    
     try:
         start_time = time.time()
         
         # Read PDF bytes
         pdf_bytes = await file.read()
         
-        # Parse PDF
-        parser = PDFParser()
-        parsed_data = parser.parse_pdf(pdf_bytes)
-        
-        # Store in database
-        db_service = DatabaseService()
-        paper = await db_service.store_parsed_paper(
-            parsed_data=parsed_data,
-            metadata=paper_metadata.model_dump()
-        )
+        with profiling as profile:
+            # Parse on the worker pool while the PDF is uploaded, then store
+            db_service = get_database_service()
+            with profile_stage("ingest_paper"):
+                paper, parsed_data = await db_service.ingest_paper(
+                    get_parse_executor().parse(pdf_bytes, client=_client_id(request)),
+                    metadata=paper_metadata.model_dump(),
+                    pdf_bytes=pdf_bytes
+                )
         
         processing_time = time.time() - start_time
+        stats = parsed_data.get("stats", {})
+        
+        memory = None
+        if profile is not None:
+            # Parsing stages were measured in the worker process
+            profile.merge(stats.get("memory", []))
+            memory = profile.to_list()
+            logger.debug("Memory profile for %s: %s", file.filename, ", ".join(
+                f"{s['stage']} {s['peak_bytes'] / 2**20:.1f} MiB" for s in memory
+            ))
         
         return ParseResponse(
             paper_id=paper["id"],
             status="success",
             questions_count=len(parsed_data["questions"]),
             processing_time=round(processing_time, 2),
+            tables_count=stats.get("tables", 0),
+            table_rows_saved=stats.get("table_rows_saved", 0),
+            pages_skipped=stats.get("pages_skipped", 0),
+            memory_profile=memory,
             message=f"Successfully parsed {len(parsed_data['questions'])} questions"
         )
         
+    except ParserBusyError as e:
+        raise HTTPException(
+            status_code=503,
+            detail=f"Parser is busy, retry later: {str(e)}",
+            headers={"Retry-After": str(e.retry_after)}
+        )
+    except CircuitOpenError as e:
+        raise _backend_unavailable(e)
     except Exception as e:
         raise HTTPException(
             status_code=500,
@@ -75,29 +140,545 @@ async def upload_and_parse_pdf(
         )
 
 
+@router.post("/batch", response_model=BatchParseResponse)
+async def batch_upload_and_parse(
+    request: Request,
+    files: List[UploadFile] = File(..., description="PDF files or ZIP archives of PDFs"),
+    manifest: str = Form(..., description="JSON object mapping each PDF file name to its metadata")
+):
+    """
+    Upload and parse many PDF past papers in one request.
+    
+    Files are parsed concurrently on the worker pool. A failure in one file
+    is reported in its result entry and does not abort the rest of the batch.
+    
+    Args:
+        request: Incoming request, used to identify the client
+        files: PDF files and/or ZIP archives containing PDFs
+        manifest: JSON string mapping file name (or path inside a ZIP) to metadata
+        
+    Returns:
+        Per-file results with batch totals
+    """
+    settings = get_settings()
+    
+    try:
+        manifest_dict = json.loads(manifest)
+    except json.JSONDecodeError:
+        raise HTTPException(status_code=400, detail="Invalid JSON in manifest")
+    if not isinstance(manifest_dict, dict):
+        raise HTTPException(
+            status_code=400,
+            detail="Manifest must be a JSON object keyed by file name"
+        )
+    
+    pdfs = await _collect_batch_pdfs(files, settings.batch_max_files, settings.batch_max_bytes)
+    
+    start_time = time.time()
+    db_service = get_database_service()
+    
+    # Bound how many of this batch's files compete for parse slots at once,
+    # so a large batch cannot fill the shared admission queue on its own
+    batch_slots = asyncio.Semaphore(settings.parse_workers)
+    
+    results: List[BatchFileResult] = []
+    tasks = []
+    for filename, pdf_bytes in pdfs:
+        metadata = manifest_dict.get(filename)
+        if metadata is None:
+            results.append(BatchFileResult(
+                filename=filename,
+                status="error",
+                error="No manifest entry for this file"
+            ))
+            continue
+        
+        try:
+            paper_metadata = PaperMetadata(**metadata)
+        except Exception as e:
+            results.append(BatchFileResult(
+                filename=filename,
+                status="error",
+                error=f"Invalid metadata: {str(e)}"
+            ))
+            continue
+        
+        tasks.append(_ingest_batch_file(
+            filename, pdf_bytes, paper_metadata, db_service, batch_slots, _client_id(request)
+        ))
+    
+    results.extend(await asyncio.gather(*tasks))
+    
+    uploaded_names = {filename for filename, _ in pdfs}
+    for filename in manifest_dict:
+        if filename not in uploaded_names:
+            results.append(BatchFileResult(
+                filename=filename,
+                status="error",
+                error="Manifest entry has no matching file"
+            ))
+    
+    succeeded = sum(1 for result in results if result.status == "success")
+    
+    return BatchParseResponse(
+        total=len(results),
+        succeeded=succeeded,
+        failed=len(results) - succeeded,
+        processing_time=round(time.time() - start_time, 2),
+        results=results
+    )
+
+
+async def _collect_batch_pdfs(
+    files: List[UploadFile],
+    max_files: int,
+    max_bytes: int
+) -> List[Tuple[str, bytes]]:
+    """
+    Read uploaded PDFs and expand ZIP archives into (file name, bytes) pairs.
+    
+    Args:
+        files: Uploaded files
+        max_files: Maximum number of PDFs accepted in one batch
+        max_bytes: Maximum total uncompressed PDF size in bytes
+        
+    Returns:
+        List of (file name, PDF bytes)
+    """
+    pdfs: List[Tuple[str, bytes]] = []
+    total_bytes = 0
+    
+    for upload in files:
+        data = await upload.read()
+        name = upload.filename or ""
+        
+        if name.lower().endswith(".zip"):
+            try:
+                archive = zipfile.ZipFile(io.BytesIO(data))
+            except zipfile.BadZipFile:
+                raise HTTPException(status_code=400, detail=f"Invalid ZIP archive: {name}")
+            
+            with archive:
+                for info in archive.infolist():
+                    if info.is_dir() or not info.filename.lower().endswith(".pdf"):
+                        continue
+                    # Resource forks macOS adds to archives it creates
+                    path = PurePosixPath(info.filename)
+                    if path.parts[0] == "__MACOSX" or path.name.startswith("._"):
+                        continue
+                    # Check declared size before decompressing to avoid ZIP bombs
+                    total_bytes += info.file_size
+                    if total_bytes > max_bytes:
+                        raise HTTPException(status_code=413, detail="Batch exceeds maximum total size")
+                    try:
+                        pdfs.append((info.filename, archive.read(info)))
+                    except (zipfile.BadZipFile, zlib.error, EOFError, RuntimeError):
+                        # Corrupt, truncated or encrypted entry
+                        raise HTTPException(
+                            status_code=400,
+                            detail=f"Invalid ZIP archive: {name} ({info.filename} is unreadable)"
+                        )
+        
+        elif name.lower().endswith(".pdf"):
+            total_bytes += len(data)
+            if total_bytes > max_bytes:
+                raise HTTPException(status_code=413, detail="Batch exceeds maximum total size")
+            pdfs.append((name, data))
+        
+        else:
+            raise HTTPException(
+                status_code=400,
+                detail=f"Only PDF files and ZIP archives are accepted: {name}"
+            )
+        
+        if len(pdfs) > max_files:
+            raise HTTPException(
+                status_code=413,
+                detail=f"Batch exceeds maximum of {max_files} files"
+            )
+    
+    return pdfs
+
+
+async def _ingest_batch_file(
+    filename: str,
+    pdf_bytes: bytes,
+    metadata: PaperMetadata,
+    db_service: DatabaseService,
+    batch_slots: asyncio.Semaphore,
+    client: str
+) -> BatchFileResult:
+    """
+    Parse and store one file of a batch, capturing any failure in the result.
+    
+    Args:
+        filename: File name from the upload or ZIP archive
+        pdf_bytes: PDF file as bytes
+        metadata: Validated paper metadata
+        db_service: Shared database service
+        batch_slots: Per-batch concurrency limit
+        client: Identity of the uploading client
+        
+    Returns:
+        Result entry for this file
+    """
+    async def parse() -> Dict[str, Any]:
+        async with batch_slots:
+            return await get_parse_executor().parse(pdf_bytes, client=client)
+    
+    try:
+        paper, parsed_data = await db_service.ingest_paper(
+            parse(),
+            metadata=metadata.model_dump(),
+            pdf_bytes=pdf_bytes
+        )
+    except Exception as e:
+        return BatchFileResult(filename=filename, status="error", error=str(e))
+    
+    return BatchFileResult(
+        filename=filename,
+        status="success",
+        paper_id=paper["id"],
+        questions_count=len(parsed_data["questions"])
+    )
+
+
+@router.post("/resegment", response_model=ResegmentResponse)
+async def resegment(request: ResegmentRequest):
+    """
+    Rebuild questions and content from stored span layers.
+    
+    Runs the current segmentation over the layer persisted at ingest, so
+    segmentation improvements apply without re-uploading or re-parsing PDFs.
+    
+    Args:
+        request: Papers to process (all papers if none are given)
+        
+    Returns:
+        Per-paper results with totals
+    """
+    start_time = time.time()
+    
+    try:
+        results = await resegment_papers(get_database_service(), request.paper_ids)
+    except CircuitOpenError as e:
+        raise _backend_unavailable(e)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error re-segmenting papers: {str(e)}")
+    
+    succeeded = sum(1 for result in results if result["status"] == "success")
+    
+    return ResegmentResponse(
+        total=len(results),
+        succeeded=succeeded,
+        failed=len(results) - succeeded,
+        processing_time=round(time.time() - start_time, 2),
+        results=results
+    )
+
+
+@router.post("/ingests/cleanup", response_model=IngestCleanupResponse)
+async def cleanup_abandoned_ingests(
+    older_than_minutes: Optional[int] = Query(
+        None, ge=0, description="Defaults to INGEST_ABANDON_AFTER_MINUTES"
+    )
+):
+    """
+    Delete partially stored papers whose ingest stopped making progress.
+    
+    This also runs periodically in the background; the endpoint allows
+    cleaning up on demand.
+    
+    Args:
+        older_than_minutes: Minimum time since the ingest last checkpointed
+        
+    Returns:
+        IDs of the removed papers
+    """
+    if older_than_minutes is None:
+        older_than_minutes = get_settings().ingest_abandon_after_minutes
+    
+    try:
+        db_service = get_database_service()
+        removed = await db_service.collect_abandoned_ingests(
+            timedelta(minutes=older_than_minutes)
+        )
+    except CircuitOpenError as e:
+        raise _backend_unavailable(e)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error cleaning up ingests: {str(e)}")
+    
+    return IngestCleanupResponse(removed=removed)
+
+
+@router.get("/search", response_model=SearchResponse)
+async def search_questions(
+    q: str = Query(..., min_length=1, max_length=200, description="Search terms"),
+    exam_board: Optional[str] = Query(None, description="Filter by exam board"),
+    year: Optional[int] = Query(None, description="Filter by year"),
+    limit: int = Query(20, ge=1, le=100, description="Maximum number of hits"),
+    offset: int = Query(0, ge=0, le=1000, description="Number of hits to skip")
+):
+    """
+    Search question text across all papers.
+    
+    Supports web search syntax: quoted phrases, ``OR`` and ``-excluded``
+    terms. Hits are ranked by relevance and include a highlighted snippet.
+    
+    Args:
+        q: Search terms
+        exam_board: Only return questions from this exam board
+        year: Only return questions from this year
+        limit: Maximum number of hits
+        offset: Number of hits to skip
+        
+    Returns:
+        Ranked matching questions
+    """
+    try:
+        db_service = get_database_service()
+        hits = await db_service.search_questions(q, exam_board, year, limit, offset)
+    except CircuitOpenError as e:
+        raise _backend_unavailable(e)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error searching questions: {str(e)}")
+    
+    return SearchResponse(query=q, limit=limit, offset=offset, hits=hits)
+
+
+@router.get("/questions/{question_id}/similar", response_model=SimilarQuestionsResponse)
+async def get_similar_questions(
+    question_id: str,
+    min_similarity: Optional[float] = Query(
+        None, ge=0.0, le=1.0, description="Minimum similarity; defaults to SIMILARITY_THRESHOLD"
+    ),
+    limit: int = Query(10, ge=1, le=50, description="Maximum number of results")
+):
+    """
+    Find reused or lightly reworded versions of a question in other papers.
+    
+    Args:
+        question_id: Question UUID
+        min_similarity: Minimum estimated overlap of word sequences (0-1)
+        limit: Maximum number of results
+        
+    Returns:
+        Similar questions, most similar first
+    """
+    if min_similarity is None:
+        min_similarity = get_settings().similarity_threshold
+    
+    try:
+        db_service = get_database_service()
+        similar = await db_service.find_similar_questions(question_id, min_similarity, limit)
+    except ValueError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except CircuitOpenError as e:
+        raise _backend_unavailable(e)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error finding similar questions: {str(e)}")
+    
+    return SimilarQuestionsResponse(question_id=question_id, similar=similar)
+
+
+@router.get("/papers", response_model=PaperListResponse)
+async def list_papers(
+    exam_board: Optional[str] = Query(None, description="Filter by exam board"),
+    year: Optional[int] = Query(None, description="Filter by year"),
+    session: Optional[str] = Query(None, description="Filter by session"),
+    paper_number: Optional[int] = Query(None, description="Filter by paper number"),
+    limit: int = Query(50, ge=1, le=200, description="Maximum number of papers"),
+    cursor: Optional[str] = Query(None, description="next_cursor from the previous page")
+):
+    """
+    List papers in the catalogue, one page at a time.
+    
+    Papers are ordered by exam board, year, session and paper number.
+    Pass ``next_cursor`` from a response to get the following page; it is
+    null on the last page.
+    
+    Args:
+        exam_board: Only list papers from this exam board
+        year: Only list papers from this year
+        session: Only list papers from this session
+        paper_number: Only list papers with this number
+        limit: Maximum number of papers
+        cursor: Cursor from the previous page
+        
+    Returns:
+        Paper summaries with question counts and the next cursor
+    """
+    db_service = get_database_service()
+    try:
+        papers, next_cursor = await db_service.list_papers(
+            exam_board, year, session, paper_number, limit, cursor
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except CircuitOpenError as e:
+        raise _backend_unavailable(e)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error listing papers: {str(e)}")
+    
+    return PaperListResponse(papers=papers, next_cursor=next_cursor)
+
+
 @router.get("/papers/{paper_id}", response_model=PaperResponse)
-async def get_paper(paper_id: str):
+async def get_paper(
+    paper_id: str,
+    expand_styles: bool = Query(
+        False, description="Copy style fields onto each text content element"
+    )
+):
     """
     Retrieve a parsed paper with all questions and content.
     
+    Text formatting is returned once per paper in ``styles`` and content
+    elements reference it by ``style_id``. Older clients that read
+    formatting from each element can pass ``expand_styles=true``.
+    
     Args:
         paper_id: Paper UUID
+        expand_styles: Expand the style table into content elements
         
     Returns:
         Complete paper data
     """
     try:
-        db_service = DatabaseService()
-        paper = await db_service.get_paper(paper_id)
+        db_service = get_database_service()
+        paper = await db_service.get_paper(paper_id, expand_styles=expand_styles)
         return paper
         
     except ValueError as e:
         raise HTTPException(status_code=404, detail=str(e))
+    except CircuitOpenError as e:
+        raise _backend_unavailable(e)
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error retrieving paper: {str(e)}")
 
 
+@router.get("/papers/{paper_id}/pages/{page_number}", response_model=PageRenderInfo)
+async def get_page_render_info(paper_id: str, page_number: int):
+    """
+    Describe the page size and tile grid for rendering a page.
+    
+    Args:
+        paper_id: Paper UUID
+        page_number: Page number (1-indexed)
+        
+    Returns:
+        Page size in points and tile columns/rows per zoom level
+    """
+    db_service = get_database_service()
+    pdf_hash = await _get_stored_pdf_hash(db_service, paper_id)
+    
+    try:
+        return await get_page_renderer().get_page_info(
+            pdf_hash,
+            lambda: db_service.storage.download_pdf(pdf_hash),
+            page_number
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except CircuitOpenError as e:
+        raise _backend_unavailable(e)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error reading page: {str(e)}")
+
+
+@router.get("/papers/{paper_id}/pages/{page_number}/render")
+async def render_page_tile(
+    paper_id: str,
+    page_number: int,
+    zoom: float = Query(1.0, description="Zoom level, one of PAGE_RENDER_ZOOMS"),
+    tile_x: int = Query(0, ge=0, description="Tile column"),
+    tile_y: int = Query(0, ge=0, description="Tile row")
+):
+    """
+    Render one tile of the original page as PNG.
+    
+    Tiles are rendered from the stored PDF on first request and then
+    served from an on-disk cache.
+    
+    Args:
+        paper_id: Paper UUID
+        page_number: Page number (1-indexed)
+        zoom: Zoom level
+        tile_x: Tile column
+        tile_y: Tile row
+        
+    Returns:
+        PNG image
+    """
+    renderer = get_page_renderer()
+    if zoom not in renderer.zooms:
+        raise HTTPException(status_code=400, detail=f"Zoom must be one of {renderer.zooms}")
+    
+    db_service = get_database_service()
+    pdf_hash = await _get_stored_pdf_hash(db_service, paper_id)
+    
+    try:
+        png = await renderer.get_tile(
+            pdf_hash,
+            lambda: db_service.storage.download_pdf(pdf_hash),
+            page_number,
+            zoom,
+            tile_x,
+            tile_y
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except CircuitOpenError as e:
+        raise _backend_unavailable(e)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error rendering page: {str(e)}")
+    
+    # Tiles are keyed by PDF content hash, so they never change
+    return Response(
+        content=png,
+        media_type="image/png",
+        headers={"Cache-Control": "public, max-age=31536000, immutable"}
+    )
+
+
+async def _get_stored_pdf_hash(db_service: DatabaseService, paper_id: str) -> str:
+    """Get a paper's PDF hash, raising 404 if the paper or its PDF is missing."""
+    try:
+        pdf_hash = await db_service.get_paper_pdf_hash(paper_id)
+    except ValueError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except CircuitOpenError as e:
+        raise _backend_unavailable(e)
+    
+    if not pdf_hash:
+        raise HTTPException(status_code=404, detail=f"No stored PDF for paper {paper_id}")
+    return pdf_hash
+
+
+def _backend_unavailable(e: CircuitOpenError) -> HTTPException:
+    """503 response for a call rejected by an open circuit breaker."""
+    return HTTPException(
+        status_code=503,
+        detail=f"Service temporarily unavailable, retry later: {str(e)}",
+        headers={"Retry-After": str(e.retry_after)}
+    )
+
+
 @router.get("/health")
 async def health_check():
-    """Health check endpoint."""
-    return {"status": "healthy", "service": "PDF Parsing API"}
+    """
+    Health check endpoint.
+    
+    Reports "degraded" while any database or storage circuit breaker is
+    not closed, and the queue depth of each ingest stage. Breakers and
+    stage counters are per process; these are the API process's.
+    """
+    backends = breaker_stats()
+    degraded = any(backend["state"] != "closed" for backend in backends.values())
+    return {
+        "status": "degraded" if degraded else "healthy",
+        "service": "PDF Parsing API",
+        "parser": get_parse_executor().stats(),
+        "ingest": pipeline_stats(),
+        "backends": backends
+    }
@@ -0,0 +1,188 @@
+"""Sprite atlases that pack a paper's small images into a few larger images."""
+import hashlib
+from typing import Dict, Any, List, Optional, Tuple
+
+from PIL import Image
+
+from app.services.image_pipeline import ImageProcessor
+
+
+# Transparent gap around each sprite so lossy encoding and scaling do not
+# bleed neighbouring sprites into each other
+SPRITE_PADDING = 2
+
+
+def is_sprite_candidate(element: Dict[str, Any], max_image_size: float) -> bool:
+    """
+    Whether an image is placed small enough on the page to go in an atlas.
+
+    Args:
+        element: Image or diagram element
+        max_image_size: Largest placement width and height in points
+
+    Returns:
+        True for images that should be packed rather than stored alone
+    """
+    width = element.get("bbox_width") or 0
+    height = element.get("bbox_height") or 0
+    return 0 < width <= max_image_size and 0 < height <= max_image_size
+
+
+class _Sheet:
+    """One atlas being filled shelf by shelf."""
+
+    __slots__ = ("shelves", "height")
+
+    def __init__(self):
+        self.shelves: List[List[int]] = []  # [y, height, used width]
+        self.height = 0
+
+    def place(self, width: int, height: int, max_size: int) -> Optional[Tuple[int, int]]:
+        """Position for a rectangle on the first shelf with room, or None if full."""
+        for shelf in self.shelves:
+            if height <= shelf[1] and shelf[2] + width <= max_size:
+                position = (shelf[2], shelf[0])
+                shelf[2] += width
+                return position
+        if self.height + height <= max_size:
+            self.shelves.append([self.height, height, width])
+            position = (0, self.height)
+            self.height += height
+            return position
+        return None
+
+
+def pack_rectangles(
+    sizes: List[Tuple[int, int]],
+    max_size: int,
+    padding: int = SPRITE_PADDING
+) -> List[Tuple[int, int, int]]:
+    """
+    Place rectangles on as few ``max_size`` square sheets as possible.
+
+    First-fit decreasing height shelf packing: rectangles are taken tallest
+    first and put on the first shelf of the first sheet with room, opening
+    a new shelf (or sheet) when none has. Sprites in one paper are similar
+    in size, which is where shelves waste little space.
+
+    Args:
+        sizes: (width, height) of each rectangle, each at most ``max_size``
+        max_size: Width and height limit of a sheet
+        padding: Gap kept after each rectangle on both axes
+
+    Returns:
+        (sheet index, x, y) for each rectangle, in input order
+    """
+    sheets: List[_Sheet] = []
+    placements: List[Tuple[int, int, int]] = [(0, 0, 0)] * len(sizes)
+
+    order = sorted(range(len(sizes)), key=lambda i: (-sizes[i][1], -sizes[i][0]))
+    for index in order:
+        width, height = sizes[index][0] + padding, sizes[index][1] + padding
+        for sheet_index, sheet in enumerate(sheets):
+            position = sheet.place(width, height, max_size)
+            if position is not None:
+                break
+        else:
+            sheets.append(_Sheet())
+            sheet_index = len(sheets) - 1
+            # A rectangle of max_size plus padding still gets a sheet of its own
+            position = sheets[-1].place(width, height, max_size + padding)
+        placements[index] = (sheet_index, *position)
+    return placements
+
+
+def build_atlases(
+    elements: List[Dict[str, Any]],
+    processor: ImageProcessor,
+    max_size: int
+) -> List[Dict[str, Any]]:
+    """
+    Pack image elements into atlas images.
+
+    Each distinct image (by content ``hash``) is drawn once at its
+    high-density display size. Elements that cannot be decoded, and sheets
+    that would hold a single image, are left out and keep their bytes so
+    they are stored standalone.
+
+    Args:
+        elements: Image elements with ``image_bytes`` and ``hash``
+        processor: Image processor for sprite sizing and encoding
+        max_size: Width and height limit of an atlas in pixels
+
+    Returns:
+        Atlases with ``bytes``, ``format``, ``width``, ``height``, ``hash``
+        and ``regions``: (element, (x, y, width, height)) for every element
+        placed on it
+    """
+    sprites: Dict[str, Image.Image] = {}
+    for element in elements:
+        if element["hash"] in sprites:
+            continue
+        try:
+            sprite = processor.sprite(
+                bytes(element["image_bytes"]), element.get("bbox_width"), element.get("bbox_height")
+            )
+        except Exception as e:
+            print(f"Warning: Could not decode image {element['hash'][:12]} for atlas: {e}")
+            continue
+        if sprite.width <= max_size and sprite.height <= max_size:
+            sprites[element["hash"]] = sprite
+
+    hashes = list(sprites)
+    placements = pack_rectangles([sprites[h].size for h in hashes], max_size)
+    sheets: Dict[int, Dict[str, Tuple[int, int]]] = {}
+    for content_hash, (sheet, x, y) in zip(hashes, placements):
+        sheets.setdefault(sheet, {})[content_hash] = (x, y)
+
+    atlases = []
+    for positions in sheets.values():
+        if len(positions) < 2:
+            continue
+        width = max(x + sprites[h].width for h, (x, _) in positions.items())
+        height = max(y + sprites[h].height for h, (_, y) in positions.items())
+        sheet = Image.new("RGBA", (width, height), (0, 0, 0, 0))
+        for content_hash, (x, y) in positions.items():
+            sheet.paste(sprites[content_hash], (x, y))
+
+        data, format = processor.encode(sheet)
+        regions = [
+            (element, (*positions[element["hash"]], *sprites[element["hash"]].size))
+            for element in elements
+            if element["hash"] in positions
+        ]
+        atlases.append({
+            "bytes": data,
+            "format": format,
+            "width": width,
+            "height": height,
+            "hash": hashlib.sha256(data).hexdigest(),
+            "regions": regions
+        })
+    return atlases
+
+
+def apply_atlas(atlas: Dict[str, Any], url: str):
+    """
+    Point an atlas's elements at the uploaded atlas image.
+
+    Each element's ``image_url`` becomes the atlas URL and ``image_atlas``
+    records where its sprite sits, so a viewer draws it as a crop of the
+    atlas. The element's bytes are released.
+
+    Args:
+        atlas: Atlas from build_atlases
+        url: Public URL of the uploaded atlas image
+    """
+    for element, (x, y, width, height) in atlas["regions"]:
+        element.pop("image_bytes", None)
+        element["image_url"] = url
+        element["image_variants"] = None
+        element["image_atlas"] = {
+            "x": x,
+            "y": y,
+            "width": width,
+            "height": height,
+            "atlas_width": atlas["width"],
+            "atlas_height": atlas["height"]
+        }
@@ -1,48 +1,482 @@
 """Database service for storing parsed paper data."""
+import asyncio
+import hashlib
 import uuid
-from typing import Dict, Any, List
-from datetime import datetime
-from supabase import create_client, Client
+from typing import Dict, Any, Awaitable, Iterator, List, Optional, Tuple
+from datetime import datetime, timedelta
 from app.config import get_settings
+from app.services.atlas import apply_atlas, build_atlases, is_sprite_candidate
+from app.services.image_pipeline import get_image_processor, primary_variant, process_images
+from app.services.ingest_pipeline import Pipeline
+from app.services.minhash import band_keys, estimate_similarity, minhash_signature
+from app.services.span_layer import encode_layer
+from app.services.styles import STYLE_FIELDS, apply_style
+from app.utils.pagination import encode_cursor, decode_cursor
+from app.utils.resilience import call_with_retry
 from app.utils.storage import StorageService
+from app.utils.supabase_client import get_async_client
+
+
+# Sort order of the paper listing, matching the Paper catalogue index
+PAPER_LIST_ORDER = {"exam_board": str, "year": int, "session": str, "paper_number": int, "id": str}
+
+# Paper IDs fetched per request by list_paper_ids
+PAPER_ID_PAGE_SIZE = 1000
+
+# Nullable QuestionContent columns, each used by some content types only
+CONTENT_FIELDS = (
+    "text", "style_id", "font_size", "font_family",
+    "x", "y", "width", "height",
+    "image_url", "image_variants", "image_atlas", "image_width", "image_height", "alt_text",
+    "table_data"
+)
+
+# Namespace for deterministic paper IDs, so a retried ingest reuses its rows
+INGEST_NAMESPACE = uuid.UUID("5b0e3a56-2c4f-4d8e-9a51-7f3c1e2d9b60")
+
+
+def _question_id(paper_id: str, sequence_order: int) -> str:
+    """Deterministic ID of a paper's question at a sequence position."""
+    return str(uuid.uuid5(uuid.UUID(paper_id), f"question/{sequence_order}"))
+
+
+def _content_id(question_id: str, sequence: int) -> str:
+    """Deterministic ID of a question's content row at a sequence position."""
+    return str(uuid.uuid5(uuid.UUID(question_id), f"content/{sequence}"))
 
 
 class DatabaseService:
-    """Service for database operations via Supabase."""
+    """
+    Service for database operations via Supabase.
+    
+    Queries go through the shared async Supabase client, so requests
+    waiting on the database do not block the event loop. Each query has a
+    timeout, idempotent ones are retried on transient failures, and all
+    share the "database" circuit breaker.
+    """
     
     def __init__(self):
-        """Initialize Supabase client and storage service."""
+        """Initialize the storage service; the Supabase client is shared."""
         settings = get_settings()
-        self.client: Client = create_client(
-            settings.supabase_url,
-            settings.supabase_service_key
-        )
         self.storage = StorageService()
+        self.image_processor = get_image_processor()
+        self.batch_size = settings.db_insert_batch_size
+        self.queue_size = settings.ingest_queue_size
+        self.timeout = settings.db_timeout
+        self.atlas_max_image = settings.image_atlas_max_image if settings.image_atlas else 0
+        self.atlas_size = settings.image_atlas_size
     
     async def store_parsed_paper(
         self, 
         parsed_data: Dict[str, Any],
-        metadata: Dict[str, Any]
+        metadata: Dict[str, Any],
+        pdf_bytes: Optional[bytes] = None
     ) -> Dict[str, Any]:
         """
         Store a complete parsed paper in the database.
         
+        The paper row is written first with ``ingest_status`` "pending".
+        Questions are then written in batches, and the paper's
+        ``ingest_checkpoint`` advances after each one. Row IDs are derived
+        from the PDF and metadata, so retrying a failed ingest of the same
+        paper resumes after the last checkpoint and overwrites any batch
+        that was only partly written. Images of batches already written
+        take their URLs from the stored rows; other images live at
+        content-addressed paths and are only sent if not already stored.
+        
         Args:
             parsed_data: Parsed PDF data from PDFParser
             metadata: Paper metadata (exam board, year, etc.)
+            pdf_bytes: Source PDF, kept in storage for page rendering
+            
+        Returns:
+            Created paper record with ID
+        """
+        paper_record = await self._build_paper_record(metadata, pdf_bytes)
+        return await self._store_paper(paper_record, parsed_data)
+    
+    async def ingest_paper(
+        self,
+        parse: Awaitable[Dict[str, Any]],
+        metadata: Dict[str, Any],
+        pdf_bytes: bytes
+    ) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+        """
+        Parse and store a paper, uploading the source PDF while it parses.
+        
+        Args:
+            parse: Awaitable giving the parsed data, e.g. ParseExecutor.parse
+            metadata: Paper metadata (exam board, year, etc.)
+            pdf_bytes: Source PDF, kept in storage for page rendering
+            
+        Returns:
+            Tuple of (paper record, parsed data)
+        """
+        paper_record = asyncio.ensure_future(self._build_paper_record(metadata, pdf_bytes))
+        try:
+            parsed_data = await parse
+        except BaseException:
+            paper_record.cancel()
+            await asyncio.gather(paper_record, return_exceptions=True)
+            raise
+        return await self._store_paper(await paper_record, parsed_data), parsed_data
+    
+    async def _store_paper(
+        self,
+        paper_record: Dict[str, Any],
+        parsed_data: Dict[str, Any]
+    ) -> Dict[str, Any]:
+        """
+        Write a paper and its questions, resuming a pending ingest (see store_parsed_paper).
+        
+        Question batches flow through two pipeline stages: one uploads a
+        batch's images and builds its rows while the other writes the
+        previous batch. Styles are written and, once every image has its
+        URL, the span layer is stored alongside them.
+        
+        Args:
+            paper_record: Record from _build_paper_record
+            parsed_data: Parsed PDF data from PDFParser
             
         Returns:
             Created paper record with ID
         """
-        # Generate paper ID
-        paper_id = str(uuid.uuid4())
+        paper_id = paper_record["id"]
+        
+        existing = await self._get_ingest_state(paper_id)
+        if existing is not None and existing["ingest_status"] == "complete":
+            return existing
+        
+        # 1. Insert paper record, or pick up a pending one where it stopped.
+        #    A concurrent ingest of the same PDF may insert it first, so the
+        #    insert does nothing on conflict and the row is read back.
+        if existing is None:
+            client = await get_async_client()
+            await self._execute(client.table("Paper").upsert(
+                paper_record, on_conflict="id", ignore_duplicates=True
+            ))
+            existing = await self._get_ingest_state(paper_id)
+            if existing["ingest_status"] == "complete":
+                return existing
+        checkpoint = existing["ingest_checkpoint"]
+        if checkpoint is None:
+            checkpoint = -1
+        
+        # 2. Upload images and write rows batch by batch, the two overlapping
+        async def upload_images(
+            questions: List[Dict[str, Any]]
+        ) -> Optional[Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]]:
+            # Batches already written take their image URLs from their rows,
+            # so the span layer gets them without uploading anything again
+            if (
+                questions[-1]["sequence_order"] <= checkpoint
+                and await self._restore_image_urls(paper_id, questions)
+            ):
+                return None
+            return await self._build_batch_rows(paper_id, questions)
+        
+        async def write_rows(rows: Optional[Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]]):
+            if rows is None:
+                return
+            questions, contents = rows
+            last_sequence = questions[-1]["sequence_order"]
+            if last_sequence <= checkpoint:
+                return
+            await self._upsert_batched("Question", questions)
+            await self._upsert_batched("QuestionContent", contents)
+            await self._upsert_batched("QuestionBand", self._build_band_records(questions))
+            await self._update_ingest_state(paper_id, ingest_checkpoint=last_sequence)
+        
+        pipeline = Pipeline(self.queue_size)
+        images = pipeline.add_stage("upload_images", upload_images)
+        pipeline.add_stage("write_rows", write_rows)
+        
+        # 3. Keep the span layer so questions can be re-segmented later
+        async def store_span_layer():
+            await images.done.wait()
+            await self._store_span_layer(paper_id, parsed_data)
+        
+        await self._pack_atlases([
+            question for question in parsed_data["questions"]
+            if question["sequence_order"] > checkpoint
+        ])
+        await pipeline.run(
+            self._checkpoint_batches(parsed_data["questions"]),
+            alongside=[
+                self._upsert_batched(
+                    "PaperStyle", self._build_style_records(paper_id, parsed_data["styles"])
+                ),
+                store_span_layer()
+            ]
+        )
+        
+        await self._update_ingest_state(paper_id, ingest_status="complete")
+        paper_record.update(ingest_status="complete", ingest_checkpoint=None)
+        return paper_record
+    
+    async def _get_ingest_state(self, paper_id: str) -> Optional[Dict[str, Any]]:
+        """Fetch a paper row if it exists, including its ingest status."""
+        client = await get_async_client()
+        response = await self._execute(client.table("Paper").select("*").eq("id", paper_id))
+        return response.data[0] if response.data else None
+    
+    async def _update_ingest_state(self, paper_id: str, **fields: Any):
+        """Record ingest progress on the paper row."""
+        fields["ingest_updated_at"] = datetime.utcnow().isoformat()
+        client = await get_async_client()
+        await self._execute(client.table("Paper").update(fields).eq("id", paper_id))
+    
+    async def _execute(self, query: Any, idempotent: bool = True) -> Any:
+        """
+        Run a PostgREST query with a timeout, retries and the database circuit breaker.
+        
+        Args:
+            query: Query builder, executed afresh on each attempt
+            idempotent: Whether the query may be repeated after a timeout
+            
+        Returns:
+            Query response
+        """
+        return await call_with_retry(
+            "database", query.execute, timeout=self.timeout, idempotent=idempotent
+        )
+    
+    async def _restore_image_urls(
+        self,
+        paper_id: str,
+        questions: List[Dict[str, Any]]
+    ) -> bool:
+        """
+        Copy image URLs from already written content rows onto these questions' images.
+        
+        Args:
+            paper_id: Parent paper UUID
+            questions: Questions whose rows an earlier attempt committed
+            
+        Returns:
+            False if any image has no stored row, leaving every image untouched
+        """
+        images = {}
+        for question in questions:
+            question_id = _question_id(paper_id, question["sequence_order"])
+            for sequence, content_item in enumerate(question["content"]):
+                if content_item["type"] in ("IMAGE", "DIAGRAM"):
+                    images[_content_id(question_id, sequence)] = content_item["data"]
+        if not images:
+            return True
+        
+        client = await get_async_client()
+        response = await self._execute(
+            client.table("QuestionContent")
+            .select("id, image_url, image_variants, image_atlas")
+            .in_("id", list(images))
+        )
+        rows = {row["id"]: row for row in response.data if row["image_url"]}
+        if len(rows) < len(images):
+            return False
+        
+        for content_id, data in images.items():
+            row = rows[content_id]
+            data["image_url"] = row["image_url"]
+            data["image_variants"] = row["image_variants"]
+            if row["image_atlas"]:
+                data["image_atlas"] = row["image_atlas"]
+            data.pop("image_bytes", None)
+        return True
+    
+    def _checkpoint_batches(
+        self,
+        questions: List[Dict[str, Any]]
+    ) -> Iterator[List[Dict[str, Any]]]:
+        """
+        Group whole questions into batches of about ``batch_size`` content rows.
         
+        Args:
+            questions: Segmented questions in sequence order
+            
+        Yields:
+            Lists of questions
+        """
+        batch: List[Dict[str, Any]] = []
+        rows = 0
+        for question in questions:
+            batch.append(question)
+            rows += len(question["content"])
+            if rows >= self.batch_size:
+                yield batch
+                batch, rows = [], 0
+        if batch:
+            yield batch
+    
+    async def collect_abandoned_ingests(self, older_than: timedelta) -> List[str]:
+        """
+        Delete papers whose ingest stopped making progress.
+        
+        Questions, content and bands go with the paper through ON DELETE
+        CASCADE. The span layer is removed, and so is the source PDF when no
+        other paper uses it. Content-addressed images are left in place,
+        since other papers may share them.
+        
+        Args:
+            older_than: Minimum time since the ingest last checkpointed
+            
+        Returns:
+            IDs of the deleted papers
+        """
+        cutoff = (datetime.utcnow() - older_than).isoformat()
+        client = await get_async_client()
+        response = await self._execute(
+            client.table("Paper")
+            .select("id, pdf_hash")
+            .eq("ingest_status", "pending")
+            .lt("ingest_updated_at", cutoff)
+        )
+        
+        removed = []
+        for paper in response.data:
+            await self._execute(client.table("Paper").delete().eq("id", paper["id"]))
+            await self._remove_paper_files(paper["id"], paper["pdf_hash"])
+            removed.append(paper["id"])
+        return removed
+    
+    async def _remove_paper_files(self, paper_id: str, pdf_hash: Optional[str]):
+        """Remove a deleted paper's span layer, and its PDF if now unreferenced."""
+        await self.storage.delete_span_layer(paper_id)
+        if pdf_hash and await self.get_paper_id_by_pdf_hash(pdf_hash) is None:
+            await self.storage.delete_pdf(pdf_hash)
+    
+    async def get_paper_id_by_pdf_hash(self, pdf_hash: str) -> Optional[str]:
+        """
+        Find any paper stored from the given PDF.
+        
+        Args:
+            pdf_hash: SHA-256 hex digest of the PDF
+            
+        Returns:
+            A paper UUID, or None if no paper uses the PDF
+        """
+        client = await get_async_client()
+        response = await self._execute(
+            client.table("Paper")
+            .select("id")
+            .eq("pdf_hash", pdf_hash)
+            .limit(1)
+        )
+        return response.data[0]["id"] if response.data else None
+    
+    async def replace_questions(
+        self,
+        paper_id: str,
+        parsed_data: Dict[str, Any]
+    ) -> int:
+        """
+        Replace a paper's questions and content with newly segmented ones.
+        
+        New rows are upserted over the old ones first (row IDs follow
+        sequence numbers), then rows the new segmentation no longer has are
+        removed, so a failure part way never leaves the paper without
+        questions. Uses the ``prune_questions`` function from
+        prisma/sql/question_segmentation.sql.
+        
+        Args:
+            paper_id: Paper UUID
+            parsed_data: Data with ``questions`` whose images are already uploaded
+            
+        Returns:
+            Number of questions written
+        """
+        question_records, content_records = await self._build_question_rows(
+            paper_id, parsed_data
+        )
+        band_records = self._build_band_records(question_records)
+        
+        await self._upsert_batched("Question", question_records)
+        await self._upsert_batched("QuestionContent", content_records)
+        await self._upsert_batched("QuestionBand", band_records)
+        
+        client = await get_async_client()
+        await self._execute(client.rpc("prune_questions", {
+            "paper": paper_id,
+            "question_ids": [record["id"] for record in question_records],
+            "content_ids": [record["id"] for record in content_records],
+            "band_question_ids": [record["question_id"] for record in band_records],
+            "bands": [record["band"] for record in band_records]
+        }))
+        
+        return len(question_records)
+    
+    async def _store_span_layer(self, paper_id: str, parsed_data: Dict[str, Any]):
+        """
+        Persist the parsed span and image layer for later re-segmentation.
+        
+        Args:
+            paper_id: Paper UUID
+            parsed_data: Parsed PDF data whose images have been uploaded
+        """
+        await self.storage.upload_span_layer(paper_id, encode_layer(parsed_data))
+    
+    async def list_paper_ids(self) -> List[str]:
+        """
+        List the IDs of all stored papers.
+        
+        Returns:
+            Paper UUIDs
+        """
+        client = await get_async_client()
+        paper_ids: List[str] = []
+        while True:
+            # PostgREST caps each response (max-rows), so walk the IDs in pages
+            query = (
+                client.table("Paper")
+                .select("id")
+                .eq("ingest_status", "complete")
+                .order("id")
+                .limit(PAPER_ID_PAGE_SIZE)
+            )
+            if paper_ids:
+                query = query.gt("id", paper_ids[-1])
+            response = await self._execute(query)
+            if not response.data:
+                return paper_ids
+            paper_ids.extend(row["id"] for row in response.data)
+    
+    async def _build_paper_record(
+        self,
+        metadata: Dict[str, Any],
+        pdf_bytes: Optional[bytes] = None
+    ) -> Dict[str, Any]:
+        """
+        Build the row for a paper, pending until its ingest completes.
+        
+        The ID is derived from the PDF hash and the metadata that identify
+        the paper, so the same upload always maps to the same row. Without
+        a PDF a random ID is used.
+        
+        Args:
+            metadata: Paper metadata (exam board, year, etc.)
+            pdf_bytes: Source PDF to upload, if it should be kept
+            
+        Returns:
+            Paper record ready for insertion
+        """
         # Create title if not provided
         title = metadata.get("title") or self._generate_title(metadata)
         
-        # 1. Insert paper record
-        paper_record = {
-            "id": paper_id,
+        pdf_hash, pdf_url = None, None
+        paper_id = uuid.uuid4()
+        if pdf_bytes is not None:
+            pdf_hash, pdf_url = await self.storage.upload_pdf(pdf_bytes)
+            paper_id = uuid.uuid5(INGEST_NAMESPACE, "/".join([
+                pdf_hash,
+                metadata["exam_board"],
+                str(metadata["year"]),
+                metadata["session"],
+                str(metadata["paper_number"])
+            ]))
+        
+        now = datetime.utcnow().isoformat()
+        return {
+            "id": str(paper_id),
             "title": title,
             "exam_board": metadata["exam_board"],
             "subject": metadata.get("subject", "Economics"),
@@ -51,69 +485,240 @@ class DatabaseService:
             "session": metadata["session"],
             "paper_number": metadata["paper_number"],
             "total_marks": metadata.get("total_marks"),
-            "uploaded_at": datetime.utcnow().isoformat()
+            "pdf_url": pdf_url,
+            "pdf_hash": pdf_hash,
+            "uploaded_at": now,
+            "ingest_status": "pending",
+            "ingest_checkpoint": None,
+            "ingest_updated_at": now
         }
+    
+    async def _build_question_rows(
+        self,
+        paper_id: str,
+        parsed_data: Dict[str, Any]
+    ) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]:
+        """
+        Build question and content rows for a parsed paper.
+        
+        Args:
+            paper_id: Parent paper UUID
+            parsed_data: Parsed PDF data from PDFParser
+            
+        Returns:
+            Tuple of (question records, content records)
+        """
+        await self._pack_atlases(parsed_data["questions"])
+        return await self._build_batch_rows(paper_id, parsed_data["questions"])
+    
+    def _pending_images(self, questions: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Image data in these questions still to be uploaded, with ``hash`` set."""
+        pending_images = [
+            content_item["data"]
+            for question in questions
+            for content_item in question["content"]
+            if content_item["type"] in ("IMAGE", "DIAGRAM")
+            and "image_bytes" in content_item["data"]
+        ]
+        # Content-addressed paths make uploads safe to repeat on a retried ingest
+        for data in pending_images:
+            data.setdefault("hash", hashlib.sha256(data["image_bytes"]).hexdigest())
+        return pending_images
+    
+    async def _pack_atlases(self, questions: List[Dict[str, Any]]):
+        """Pack the paper's small images into sprite atlases, if enabled."""
+        if self.atlas_max_image:
+            await self._store_atlases([
+                data for data in self._pending_images(questions)
+                if is_sprite_candidate(data, self.atlas_max_image)
+            ])
+    
+    async def _build_batch_rows(
+        self,
+        paper_id: str,
+        questions: List[Dict[str, Any]]
+    ) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]:
+        """
+        Upload the images of some questions and build their rows.
+        
+        Args:
+            paper_id: Parent paper UUID
+            questions: Segmented questions
+            
+        Returns:
+            Tuple of (question records, content records)
+        """
+        # Transcode every image of these questions concurrently before uploading
+        await process_images(self.image_processor, self._pending_images(questions))
+        
+        question_records = []
+        content_records = []
+        for question in questions:
+            question_record = self._build_question_record(paper_id, question)
+            question_records.append(question_record)
+            
+            for sequence, content_item in enumerate(question["content"]):
+                content_records.append(await self._build_content_record(
+                    question_record["id"],
+                    content_item,
+                    sequence,
+                    question["question_number"]
+                ))
+        
+        return question_records, content_records
+    
+    async def _store_atlases(self, images: List[Dict[str, Any]]):
+        """
+        Pack small images into sprite atlases and upload them.
+        
+        Packed images get the atlas URL and their region (see
+        atlas.apply_atlas); the rest keep their bytes for normal upload.
+        
+        Args:
+            images: Image data with ``image_bytes`` and ``hash``
+        """
+        if len(images) < 2:
+            return
+        atlases = await asyncio.to_thread(
+            build_atlases, images, self.image_processor, self.atlas_size
+        )
+        for atlas in atlases:
+            url = await self.storage.upload_shared_image(
+                image_bytes=atlas["bytes"],
+                format=atlas["format"],
+                content_hash=atlas["hash"],
+                variant="atlas"
+            )
+            apply_atlas(atlas, url)
+    
+    async def _upsert_batched(self, table: str, records: List[Dict[str, Any]]):
+        """
+        Upsert rows in chunks of ``db_insert_batch_size`` per request.
         
-        paper_response = self.client.table("Paper").insert(paper_record).execute()
+        Rows carry deterministic IDs, so writing a chunk again (after a
+        failure part-way through) replaces it instead of duplicating it.
         
-        # 2. Process and store questions
-        for question in parsed_data["questions"]:
-            await self._store_question(paper_id, question)
+        Args:
+            table: Table name
+            records: Rows to insert
+        """
+        # Bulk inserts need every row to carry the same columns
+        columns = {}
+        for record in records:
+            columns.update(dict.fromkeys(record))
+        records = [{column: record.get(column) for column in columns} for record in records]
         
-        return paper_response.data[0] if paper_response.data else paper_record
+        client = await get_async_client()
+        batch_size = self.batch_size
+        for start in range(0, len(records), batch_size):
+            await self._execute(client.table(table).upsert(records[start:start + batch_size]))
     
-    async def _store_question(self, paper_id: str, question_data: Dict[str, Any]):
+    def _build_style_records(
+        self,
+        paper_id: str,
+        styles: List[Dict[str, Any]]
+    ) -> List[Dict[str, Any]]:
         """
-        Store a single question with its content.
+        Build the rows of a paper's style table.
         
         Args:
             paper_id: Parent paper UUID
-            question_data: Question data with content elements
+            styles: Style table from the parser, indexed by style ID
+            
+        Returns:
+            PaperStyle records, one per distinct text style
         """
-        question_id = str(uuid.uuid4())
+        return [
+            {"paper_id": paper_id, "style_id": style_id, **style}
+            for style_id, style in enumerate(styles)
+        ]
+    
+    def _build_question_record(
+        self, 
+        paper_id: str, 
+        question_data: Dict[str, Any]
+    ) -> Dict[str, Any]:
+        """
+        Build the row for a single question.
         
-        # Insert question record
-        question_record = {
-            "id": question_id,
+        Args:
+            paper_id: Parent paper UUID
+            question_data: Question data with content elements
+            
+        Returns:
+            Question record ready for insertion
+        """
+        plain_text = self._question_plain_text(question_data)
+        return {
+            # Derived from the paper so a retried ingest rewrites the same row
+            "id": _question_id(paper_id, question_data["sequence_order"]),
             "paper_id": paper_id,
             "question_number": question_data["question_number"],
             "sequence_order": question_data["sequence_order"],
-            "marks": question_data.get("marks")
+            "marks": question_data.get("marks"),
+            "plain_text": plain_text,
+            "minhash": minhash_signature(plain_text)
         }
+    
+    def _build_band_records(self, question_records: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        Build LSH band rows for questions with a MinHash signature.
         
-        self.client.table("Question").insert(question_record).execute()
+        Args:
+            question_records: Question records from _build_question_record
+            
+        Returns:
+            QuestionBand records, one per band per question
+        """
+        return [
+            {"band": band, "question_id": record["id"]}
+            for record in question_records
+            if record["minhash"]
+            for band in band_keys(record["minhash"])
+        ]
+    
+    def _question_plain_text(self, question_data: Dict[str, Any]) -> str:
+        """
+        Join a question's text spans and table cells into whitespace-normalized plain text.
         
-        # Insert content elements
-        sequence = 0
+        Args:
+            question_data: Question data with content elements
+            
+        Returns:
+            Plain text used for search indexing
+        """
+        parts = []
         for content_item in question_data["content"]:
-            await self._store_content(
-                question_id, 
-                content_item, 
-                sequence,
-                paper_id,
-                question_data["question_number"]
-            )
-            sequence += 1
+            if content_item["type"] == "TEXT":
+                parts.append(content_item["data"]["text"])
+            elif content_item["type"] == "TABLE":
+                parts.extend(
+                    cell for row in content_item["data"]["rows"] for cell in row if cell
+                )
+        return " ".join(" ".join(parts).split())
     
-    async def _store_content(
+    async def _build_content_record(
         self, 
         question_id: str, 
         content_item: Dict[str, Any],
         sequence: int,
-        paper_id: str,
         question_num: str
-    ):
+    ) -> Dict[str, Any]:
         """
-        Store a content element (text or image).
+        Build the row for a content element (text, table or image).
+        
+        Images are uploaded to storage here so the row can carry their URL.
         
         Args:
             question_id: Parent question UUID
             content_item: Content data
             sequence: Order within question
-            paper_id: Paper ID for image organization
-            question_num: Question number for image naming
+            question_num: Question number for alt text
+            
+        Returns:
+            Content record ready for insertion
         """
-        content_id = str(uuid.uuid4())
+        content_id = _content_id(question_id, sequence)
         content_type = content_item["type"]
         data = content_item["data"]
         
@@ -121,47 +726,124 @@ class DatabaseService:
             "id": content_id,
             "question_id": question_id,
             "sequence_order": sequence,
-            "content_type": content_type
+            "content_type": content_type,
+            # Upserts only write the columns a record has, so every one is set:
+            # re-segmentation may give an existing ID a different content type
+            **dict.fromkeys(CONTENT_FIELDS),
+            "is_bold": False,
+            "is_italic": False
         }
         
         if content_type == "TEXT":
-            # Store text content with formatting
+            # Store text content; formatting is in the paper's style table
             content_record.update({
                 "text": data["text"],
+                "x": data.get("x"),
+                "y": data.get("y"),
+                "width": data.get("width"),
+                "height": data.get("height")
+            })
+            if data.get("style_id") is not None:
+                content_record["style_id"] = data["style_id"]
+            else:
+                # Span layers stored before styles were interned
+                content_record.update({
+                    "font_size": data.get("font_size"),
+                    "font_family": data.get("font_family"),
+                    "is_bold": data.get("is_bold", False),
+                    "is_italic": data.get("is_italic", False)
+                })
+        
+        elif content_type == "TABLE":
+            # One row holds the whole table instead of a row per cell span
+            content_record.update({
+                "table_data": {
+                    key: data[key]
+                    for key in ("rows", "cells", "column_x", "row_y", "header_row")
+                },
                 "font_size": data.get("font_size"),
-                "font_family": data.get("font_family"),
-                "is_bold": data.get("is_bold", False),
-                "is_italic": data.get("is_italic", False),
                 "x": data.get("x"),
                 "y": data.get("y"),
                 "width": data.get("width"),
                 "height": data.get("height")
             })
         
-        elif content_type == "IMAGE":
+        elif content_type in ("IMAGE", "DIAGRAM"):
             # Upload image to storage
-            image_url = await self.storage.upload_image(
-                image_bytes=data["image_bytes"],
-                format=data["format"],
-                paper_id=paper_id,
-                question_num=question_num,
-                img_index=data["img_index"]
-            )
+            image_url, image_variants = await self._upload_image_variants(data)
             
             # Store image metadata
             content_record.update({
                 "image_url": image_url,
+                "image_variants": image_variants,
+                "image_atlas": data.get("image_atlas"),
                 "image_width": data["width"],
                 "image_height": data["height"],
                 "x": data.get("x"),
                 "y": data.get("y"),
                 "width": data.get("bbox_width"),
                 "height": data.get("bbox_height"),
-                "alt_text": f"Image {data['img_index']} for question {question_num}"
+                "alt_text": (
+                    f"{content_type.capitalize()} {data['img_index']} "
+                    f"for question {question_num}"
+                )
+            })
+        
+        return content_record
+    
+    async def _upload_image_variants(
+        self,
+        data: Dict[str, Any]
+    ) -> Tuple[str, Optional[List[Dict[str, Any]]]]:
+        """
+        Upload an image's transcoded variants, or the original if it has none.
+        
+        Images are stored under shared paths derived from their content
+        ``hash``, so an image reused across papers, or by a retried ingest,
+        is uploaded once. The resulting URLs are recorded on ``data`` and its bytes released;
+        elements that already carry an ``image_url`` (e.g. from a stored
+        span layer) are not uploaded again.
+        
+        Args:
+            data: Image data, with ``variants`` from the image pipeline
+            
+        Returns:
+            Tuple of (primary image URL, variant records or None)
+        """
+        if data.get("image_url"):
+            return data["image_url"], data.get("image_variants")
+        
+        async def upload(image_bytes: bytes, format: str, variant: Optional[str] = None) -> str:
+            return await self.storage.upload_shared_image(
+                image_bytes=image_bytes,
+                format=format,
+                content_hash=data["hash"],
+                variant=variant
+            )
+        
+        if not data.get("variants"):
+            # Packed documents hand images over as memoryviews
+            data["image_url"] = await upload(bytes(data["image_bytes"]), data["format"])
+            data["image_variants"] = None
+            del data["image_bytes"]
+            return data["image_url"], None
+        
+        variant_records = []
+        for variant in data["variants"]:
+            url = await upload(variant["bytes"], variant["format"], variant["label"])
+            variant_records.append({
+                "label": variant["label"],
+                "format": variant["format"],
+                "width": variant["width"],
+                "height": variant["height"],
+                "url": url
             })
         
-        # Insert content record
-        self.client.table("QuestionContent").insert(content_record).execute()
+        primary = primary_variant(variant_records)
+        data["image_url"] = primary["url"]
+        data["image_variants"] = variant_records
+        del data["variants"]
+        return primary["url"], variant_records
     
     def _generate_title(self, metadata: Dict[str, Any]) -> str:
         """Generate a title from metadata."""
@@ -171,18 +853,237 @@ class DatabaseService:
             f"{metadata['session']} {metadata['year']}"
         )
     
-    async def get_paper(self, paper_id: str) -> Dict[str, Any]:
+    async def list_papers(
+        self,
+        exam_board: Optional[str] = None,
+        year: Optional[int] = None,
+        session: Optional[str] = None,
+        paper_number: Optional[int] = None,
+        limit: int = 50,
+        cursor: Optional[str] = None
+    ) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+        """
+        List paper summaries one page at a time.
+        
+        Uses the ``list_papers`` function from prisma/sql/paper_catalogue.sql.
+        
+        Args:
+            exam_board: Only list papers from this exam board
+            year: Only list papers from this year
+            session: Only list papers from this session
+            paper_number: Only list papers with this number
+            limit: Maximum number of papers on the page
+            cursor: Cursor returned with the previous page
+            
+        Returns:
+            Tuple of (paper summaries, cursor for the next page or None)
+            
+        Raises:
+            ValueError: If the cursor is malformed
+        """
+        params = self._list_papers_params(
+            exam_board, year, session, paper_number, limit, cursor
+        )
+        client = await get_async_client()
+        response = await self._execute(client.rpc("list_papers", params))
+        return self._paginate_papers(response.data, limit)
+    
+    def _list_papers_params(
+        self,
+        exam_board: Optional[str],
+        year: Optional[int],
+        session: Optional[str],
+        paper_number: Optional[int],
+        limit: int,
+        cursor: Optional[str]
+    ) -> Dict[str, Any]:
+        """Build list_papers arguments, fetching one extra row to detect a next page."""
+        after = (
+            decode_cursor(cursor, list(PAPER_LIST_ORDER.values())) if cursor
+            else [None] * len(PAPER_LIST_ORDER)
+        )
+        params = {
+            "exam_board_filter": exam_board,
+            "year_filter": year,
+            "session_filter": session,
+            "paper_number_filter": paper_number,
+            "page_size": limit + 1
+        }
+        for column, value in zip(PAPER_LIST_ORDER, after):
+            params[f"after_{column}"] = value
+        return params
+    
+    def _paginate_papers(
+        self,
+        rows: List[Dict[str, Any]],
+        limit: int
+    ) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+        """Trim the look-ahead row and build the next cursor from the last summary."""
+        if len(rows) <= limit:
+            return rows, None
+        rows = rows[:limit]
+        return rows, encode_cursor([rows[-1][column] for column in PAPER_LIST_ORDER])
+    
+    async def find_similar_questions(
+        self,
+        question_id: str,
+        threshold: float,
+        limit: int
+    ) -> List[Dict[str, Any]]:
+        """
+        Find near-duplicates of a question across the corpus.
+        
+        Candidates are questions sharing an LSH band with this one; only
+        those are scored, by comparing MinHash signatures.
+        
+        Args:
+            question_id: Question UUID
+            threshold: Minimum estimated Jaccard similarity
+            limit: Maximum number of results
+            
+        Returns:
+            Similar questions with paper metadata, most similar first
+            
+        Raises:
+            ValueError: If the question does not exist
+        """
+        client = await get_async_client()
+        response = await self._execute(
+            client.table("Question")
+            .select("minhash")
+            .eq("id", question_id)
+        )
+        if not response.data:
+            raise ValueError(f"Question {question_id} not found")
+        
+        signature = response.data[0]["minhash"]
+        if not signature:
+            return []
+        
+        band_response = await self._execute(
+            client.table("QuestionBand")
+            .select("question_id")
+            .in_("band", band_keys(signature))
+            .limit(get_settings().similarity_max_candidates)
+        )
+        candidate_ids = {row["question_id"] for row in band_response.data} - {question_id}
+        if not candidate_ids:
+            return []
+        
+        candidates_response = await self._execute(
+            client.table("Question")
+            .select(
+                "id, question_number, marks, paper_id, minhash, "
+                "paper:Paper(title, exam_board, year, session, paper_number, ingest_status)"
+            )
+            .in_("id", list(candidate_ids))
+        )
+        candidates = []
+        for row in candidates_response.data:
+            paper = row.pop("paper")
+            if paper["ingest_status"] != "complete":
+                continue
+            row.update({
+                "paper_title": paper["title"],
+                "exam_board": paper["exam_board"],
+                "year": paper["year"],
+                "session": paper["session"],
+                "paper_number": paper["paper_number"]
+            })
+            candidates.append(row)
+        return self._rank_similar(signature, candidates, threshold, limit)
+    
+    def _rank_similar(
+        self,
+        signature: List[int],
+        candidates: List[Dict[str, Any]],
+        threshold: float,
+        limit: int
+    ) -> List[Dict[str, Any]]:
+        """Score candidate rows against a signature and keep the best matches."""
+        results = []
+        for candidate in candidates:
+            similarity = estimate_similarity(signature, candidate.pop("minhash"))
+            if similarity >= threshold:
+                candidate["question_id"] = candidate.pop("id")
+                candidate["similarity"] = similarity
+                results.append(candidate)
+        results.sort(key=lambda result: (-result["similarity"], result["question_id"]))
+        return results[:limit]
+    
+    async def search_questions(
+        self,
+        query: str,
+        exam_board: Optional[str] = None,
+        year: Optional[int] = None,
+        limit: int = 20,
+        offset: int = 0
+    ) -> List[Dict[str, Any]]:
+        """
+        Full-text search over question text, ranked by relevance.
+        
+        Uses the ``search_questions`` function from prisma/sql/question_search.sql.
+        
+        Args:
+            query: Search terms (web search syntax: quotes, OR, -exclude)
+            exam_board: Only return questions from this exam board
+            year: Only return questions from this year
+            limit: Maximum number of hits
+            offset: Number of hits to skip
+            
+        Returns:
+            Ranked hits with question and paper metadata
+        """
+        client = await get_async_client()
+        response = await self._execute(client.rpc("search_questions", {
+            "query": query,
+            "exam_board_filter": exam_board,
+            "year_filter": year,
+            "result_limit": limit,
+            "result_offset": offset
+        }))
+        return response.data
+    
+    async def get_paper_pdf_hash(self, paper_id: str) -> Optional[str]:
+        """
+        Look up the content hash of a paper's stored source PDF.
+        
+        Args:
+            paper_id: Paper UUID
+            
+        Returns:
+            SHA-256 hex digest, or None if the PDF was not kept
+        """
+        client = await get_async_client()
+        response = await self._execute(
+            client.table("Paper")
+            .select("pdf_hash")
+            .eq("id", paper_id)
+        )
+        
+        if not response.data:
+            raise ValueError(f"Paper {paper_id} not found")
+        
+        return response.data[0]["pdf_hash"]
+    
+    async def get_paper(self, paper_id: str, expand_styles: bool = False) -> Dict[str, Any]:
         """
         Retrieve a paper with all questions and content.
         
+        Text content references the paper's ``styles`` by ``style_id``.
+        
         Args:
             paper_id: Paper UUID
+            expand_styles: Also copy each style's fields onto its content
+                rows, for clients that predate the style table
             
         Returns:
             Complete paper data
         """
+        client = await get_async_client()
+        
         # Get paper
-        paper_response = self.client.table("Paper").select("*").eq("id", paper_id).execute()
+        paper_response = await self._execute(client.table("Paper").select("*").eq("id", paper_id))
         
         if not paper_response.data:
             raise ValueError(f"Paper {paper_id} not found")
@@ -190,27 +1091,79 @@ class DatabaseService:
         paper = paper_response.data[0]
         
         # Get questions
-        questions_response = (
-            self.client.table("Question")
+        questions_response = await self._execute(
+            client.table("Question")
             .select("*")
             .eq("paper_id", paper_id)
             .order("sequence_order")
-            .execute()
         )
         
-        questions = []
-        for question in questions_response.data:
-            # Get content for each question
-            content_response = (
-                self.client.table("QuestionContent")
+        async def fetch_content(question: Dict[str, Any]) -> List[Dict[str, Any]]:
+            response = await self._execute(
+                client.table("QuestionContent")
                 .select("*")
                 .eq("question_id", question["id"])
                 .order("sequence_order")
-                .execute()
             )
-            
-            question["content"] = content_response.data
-            questions.append(question)
+            return response.data
+        
+        # Fetch every question's content concurrently
+        questions = questions_response.data
+        contents = await asyncio.gather(*(fetch_content(question) for question in questions))
+        for question, content in zip(questions, contents):
+            question["content"] = content
+        
+        styles_response = await self._execute(
+            client.table("PaperStyle")
+            .select("*")
+            .eq("paper_id", paper_id)
+            .order("style_id")
+        )
         
         paper["questions"] = questions
+        return self._attach_styles(paper, styles_response.data, expand_styles)
+    
+    def _attach_styles(
+        self,
+        paper: Dict[str, Any],
+        style_rows: List[Dict[str, Any]],
+        expand_styles: bool
+    ) -> Dict[str, Any]:
+        """
+        Add a paper's style table, optionally expanding it into its content.
+        
+        Args:
+            paper: Paper with questions and content
+            style_rows: PaperStyle rows ordered by style ID
+            expand_styles: Copy style fields onto content rows with a style ID
+            
+        Returns:
+            The same paper dict
+        """
+        styles = [
+            {field: row[field] for field in STYLE_FIELDS} for row in style_rows
+        ]
+        paper["styles"] = [
+            {"style_id": row["style_id"], **style} for row, style in zip(style_rows, styles)
+        ]
+        if expand_styles:
+            for question in paper["questions"]:
+                for content in question["content"]:
+                    apply_style(content, styles)
         return paper
+
+
+def get_database_service() -> DatabaseService:
+    """
+    Get the database service for the configured backend.
+    
+    Returns:
+        PostgresDatabaseService when DB_BACKEND is "postgres",
+        otherwise the Supabase-backed DatabaseService
+    """
+    settings = get_settings()
+    if settings.db_backend == "postgres":
+        # Imported lazily so psycopg is only required for this backend
+        from app.services.pg_service import PostgresDatabaseService
+        return PostgresDatabaseService()
+    return DatabaseService()
@@ -0,0 +1,430 @@
+"""
+Compact binary intermediate format for parsed documents.
+
+A packed document is a single buffer laid out as::
+
+    header   magic, version, element counts
+    table    (offset, length) of every section, 8-byte aligned
+    META     PDF metadata, parse stats, the style table, page types and
+             sprite atlas regions by image row, as UTF-8 JSON
+    PAGES    fixed-size page records
+    SPAN_*   one column per span field (text id, style id, x, ...)
+    STR_*    string table: uint32 end offsets + UTF-8 data
+    IMAGES   fixed-size image/diagram records pointing into BLOB, or
+             carrying the URL of an image already uploaded during parsing
+    QUESTIONS, REFS  segmented questions and their content references
+    BLOB     raw image bytes
+    TABLES   table elements as UTF-8 JSON (cell text and geometry)
+
+Every section is a flat array of fixed-width little-endian values, so a
+reader can map the buffer (bytes, mmap or shared memory) and view columns
+and image bytes as memoryview slices without copying or unpickling.
+"""
+import json
+import mmap
+import os
+import struct
+from array import array
+from typing import Dict, Any, List, Optional, Tuple
+
+
+MAGIC = b"PPDOC\x00\x00\x01"
+VERSION = 5
+
+_HEADER = struct.Struct("<8sIIIIIII")
+_SECTION = struct.Struct("<QQ")
+_PAGE = struct.Struct("<IffIIII")
+_IMAGE = struct.Struct("<IIIIIIffffIIIIQQ")
+_QUESTION = struct.Struct("<IIiIII")
+
+# Section order; the section table in the header follows this order
+(
+    META, PAGES,
+    SPAN_TEXT, SPAN_STYLE,
+    SPAN_X, SPAN_Y, SPAN_W, SPAN_H,
+    STR_OFFSETS, STR_DATA,
+    IMAGES, QUESTIONS, REFS, BLOB, TABLES,
+) = range(15)
+SECTION_COUNT = 15
+
+# Image record kinds
+KIND_IMAGE = 0
+KIND_DIAGRAM = 1
+
+# Content references: high bit set means an IMAGES row, the next bit a
+# TABLES entry, otherwise a span
+_REF_IMAGE = 1 << 31
+_REF_TABLE = 1 << 30
+
+_NO_STRING = 0xFFFFFFFF
+
+
+class _StringTable:
+    """Interns strings and serializes them as offsets plus UTF-8 data."""
+
+    def __init__(self):
+        self.ids: Dict[str, int] = {}
+        self.data = bytearray()
+        self.ends = array("I")
+
+    def add(self, value: Optional[str]) -> int:
+        if value is None:
+            return _NO_STRING
+        string_id = self.ids.get(value)
+        if string_id is None:
+            string_id = len(self.ends)
+            self.ids[value] = string_id
+            self.data += value.encode("utf-8")
+            self.ends.append(len(self.data))
+        return string_id
+
+
+def pack_document(parsed_data: Dict[str, Any]) -> bytes:
+    """
+    Serialize PDFParser output into the packed format.
+
+    Args:
+        parsed_data: Parsed PDF data with pages and segmented questions
+
+    Returns:
+        Packed document bytes
+    """
+    strings = _StringTable()
+    pages = bytearray()
+    columns = {
+        SPAN_TEXT: array("I"), SPAN_STYLE: array("I"),
+        SPAN_X: array("f"), SPAN_Y: array("f"), SPAN_W: array("f"), SPAN_H: array("f"),
+    }
+    images = bytearray()
+    blob = bytearray()
+
+    # Map element identity to its row so questions can reference it
+    span_rows: Dict[int, int] = {}
+    image_rows: Dict[int, int] = {}
+    table_rows: Dict[int, int] = {}
+    tables: List[Dict[str, Any]] = []
+    sprites: Dict[int, Dict[str, Any]] = {}
+
+    for page_index, page in enumerate(parsed_data["pages"]):
+        span_start = len(columns[SPAN_TEXT])
+        for element in page["text_elements"]:
+            span_rows[id(element)] = len(columns[SPAN_TEXT])
+            columns[SPAN_TEXT].append(strings.add(element["text"]))
+            # Formatting lives in the paper's style table
+            columns[SPAN_STYLE].append(element["style_id"])
+            columns[SPAN_X].append(element["x"])
+            columns[SPAN_Y].append(element["y"])
+            columns[SPAN_W].append(element["width"])
+            columns[SPAN_H].append(element["height"])
+
+        image_start = len(image_rows)
+        typed_images = (
+            [(KIND_IMAGE, e) for e in page["image_elements"]]
+            + [(KIND_DIAGRAM, e) for e in page.get("diagram_elements", [])]
+        )
+        for kind, element in typed_images:
+            if element.get("image_atlas"):
+                sprites[len(image_rows)] = element["image_atlas"]
+            image_rows[id(element)] = len(image_rows)
+            # Streamed uploads leave a URL and variants instead of bytes
+            image_bytes = element.get("image_bytes", b"")
+            variants = element.get("image_variants")
+            images += _IMAGE.pack(
+                kind,
+                page_index,
+                strings.add(element["format"]),
+                strings.add(element.get("hash")),
+                element["width"],
+                element["height"],
+                element["x"],
+                element["y"],
+                element["bbox_width"],
+                element["bbox_height"],
+                element["img_index"],
+                element.get("xref", 0),
+                strings.add(element.get("image_url")),
+                strings.add(None if variants is None else json.dumps(variants)),
+                len(blob),
+                len(image_bytes)
+            )
+            blob += image_bytes
+
+        for element in page.get("table_elements", []):
+            table_rows[id(element)] = len(tables)
+            tables.append(element)
+
+        pages += _PAGE.pack(
+            page["page_number"],
+            page["width"],
+            page["height"],
+            span_start,
+            len(columns[SPAN_TEXT]) - span_start,
+            image_start,
+            len(image_rows) - image_start
+        )
+
+    questions = bytearray()
+    refs = array("I")
+    for question in parsed_data["questions"]:
+        ref_start = len(refs)
+        for item in question["content"]:
+            element_id = id(item["data"])
+            if item["type"] == "TEXT":
+                refs.append(span_rows[element_id])
+            elif item["type"] == "TABLE":
+                refs.append(_REF_TABLE | table_rows[element_id])
+            else:
+                refs.append(_REF_IMAGE | image_rows[element_id])
+        marks = question.get("marks")
+        questions += _QUESTION.pack(
+            strings.add(question["question_number"]),
+            question["sequence_order"],
+            -1 if marks is None else marks,
+            question.get("page_number", 0),
+            ref_start,
+            len(refs) - ref_start
+        )
+
+    sections = [b""] * SECTION_COUNT
+    sections[META] = json.dumps({
+        "metadata": parsed_data.get("metadata", {}),
+        "stats": parsed_data.get("stats", {}),
+        "styles": parsed_data["styles"],
+        "page_types": [page["page_type"] for page in parsed_data["pages"]],
+        "sprites": sprites
+    }).encode("utf-8")
+    sections[PAGES] = bytes(pages)
+    for section, column in columns.items():
+        sections[section] = column.tobytes()
+    sections[STR_OFFSETS] = strings.ends.tobytes()
+    sections[STR_DATA] = bytes(strings.data)
+    sections[IMAGES] = bytes(images)
+    sections[QUESTIONS] = bytes(questions)
+    sections[REFS] = refs.tobytes()
+    sections[BLOB] = bytes(blob)
+    sections[TABLES] = json.dumps(tables, separators=(",", ":")).encode("utf-8")
+
+    header = _HEADER.pack(
+        MAGIC, VERSION,
+        len(parsed_data["pages"]),
+        len(columns[SPAN_TEXT]),
+        len(image_rows),
+        len(parsed_data["questions"]),
+        len(refs),
+        len(strings.ends)
+    )
+
+    out = bytearray(header)
+    table_offset = len(out)
+    out += bytes(_SECTION.size * SECTION_COUNT)
+    table = []
+    for data in sections:
+        out += bytes(-len(out) % 8)
+        table.append((len(out), len(data)))
+        out += data
+    for index, (offset, length) in enumerate(table):
+        _SECTION.pack_into(out, table_offset + index * _SECTION.size, offset, length)
+
+    return bytes(out)
+
+
+class PackedDocument:
+    """
+    Read-only view over a packed document buffer.
+
+    Column accessors and image bytes are memoryview slices of the
+    underlying buffer, so nothing is copied until a value is used.
+    """
+
+    def __init__(self, buffer: Any):
+        """
+        Wrap a buffer (bytes, mmap or SharedMemory.buf).
+
+        Args:
+            buffer: Object supporting the buffer protocol
+        """
+        self._buffer = buffer
+        self._view = memoryview(buffer)
+
+        (magic, version, self.page_count, self.span_count, self.image_count,
+         self.question_count, self.ref_count, self.string_count) = _HEADER.unpack_from(self._view)
+        if magic != MAGIC:
+            raise ValueError("Not a packed document")
+        if version != VERSION:
+            raise ValueError(f"Unsupported packed document version: {version}")
+
+        self._sections = [
+            _SECTION.unpack_from(self._view, _HEADER.size + index * _SECTION.size)
+            for index in range(SECTION_COUNT)
+        ]
+        self._string_ends = self.section(STR_OFFSETS).cast("I")
+        self._string_data = self.section(STR_DATA)
+
+    @classmethod
+    def open(cls, path: str, delete: bool = False) -> "PackedDocument":
+        """
+        Memory-map a packed document file.
+
+        Args:
+            path: File holding pack_document output
+            delete: Remove the file once mapped; the mapping stays valid
+
+        Returns:
+            Document backed by the mapping
+        """
+        with open(path, "rb") as f:
+            mapping = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        if delete:
+            try:
+                os.remove(path)
+            except PermissionError:
+                # Windows cannot remove a mapped file; it stays in the temp dir
+                pass
+        return cls(mapping)
+
+    def section(self, index: int) -> memoryview:
+        """Raw bytes of a section, without copying."""
+        offset, length = self._sections[index]
+        return self._view[offset:offset + length]
+
+    def column(self, index: int) -> memoryview:
+        """A span column as a typed memoryview."""
+        fmt = {SPAN_X: "f", SPAN_Y: "f", SPAN_W: "f", SPAN_H: "f"}.get(index, "I")
+        return self.section(index).cast(fmt)
+
+    def string(self, string_id: int) -> Optional[str]:
+        """Look up an interned string."""
+        if string_id == _NO_STRING:
+            return None
+        start = self._string_ends[string_id - 1] if string_id else 0
+        return bytes(self._string_data[start:self._string_ends[string_id]]).decode("utf-8")
+
+    def image_bytes(self, image_index: int) -> memoryview:
+        """Bytes of one image or diagram, as a view into the blob section."""
+        record = _IMAGE.unpack_from(self.section(IMAGES), image_index * _IMAGE.size)
+        blob_offset, blob_length = record[14], record[15]
+        return self.section(BLOB)[blob_offset:blob_offset + blob_length]
+
+    def to_parsed_data(self) -> Dict[str, Any]:
+        """
+        Rebuild the dictionary shape produced by PDFParser.parse_pdf.
+
+        Image bytes are memoryview slices of this document, so the buffer
+        stays alive for as long as they are referenced. Images uploaded
+        during parsing carry ``image_url`` and ``image_variants`` instead,
+        plus ``image_atlas`` when drawn from a sprite atlas.
+
+        Returns:
+            Parsed PDF data with pages and segmented questions
+        """
+        meta = json.loads(bytes(self.section(META)))
+        styles = meta["styles"]
+        # JSON object keys are strings
+        sprites = meta.get("sprites", {})
+        text = self.column(SPAN_TEXT)
+        style = self.column(SPAN_STYLE)
+        xs, ys = self.column(SPAN_X), self.column(SPAN_Y)
+        ws, hs = self.column(SPAN_W), self.column(SPAN_H)
+
+        spans = [
+            {
+                "text": self.string(text[i]),
+                "style_id": style[i],
+                **styles[style[i]],
+                "x": round(xs[i], 2),
+                "y": round(ys[i], 2),
+                "width": round(ws[i], 2),
+                "height": round(hs[i], 2)
+            }
+            for i in range(self.span_count)
+        ]
+
+        images: List[Tuple[int, Dict[str, Any]]] = []
+        image_section = self.section(IMAGES)
+        for index in range(self.image_count):
+            (kind, page_index, format_id, hash_id, width, height,
+             x, y, bbox_width, bbox_height, img_index, xref,
+             url_id, variants_id, _, _) = _IMAGE.unpack_from(
+                image_section, index * _IMAGE.size
+            )
+            element = {
+                "format": self.string(format_id),
+                "width": width,
+                "height": height,
+                "x": round(x, 2),
+                "y": round(y, 2),
+                "bbox_width": round(bbox_width, 2),
+                "bbox_height": round(bbox_height, 2),
+                "page_num": page_index,
+                "img_index": img_index
+            }
+            if kind == KIND_IMAGE:
+                element["xref"] = xref
+            content_hash = self.string(hash_id)
+            if content_hash is not None:
+                element["hash"] = content_hash
+            image_url = self.string(url_id)
+            if image_url is not None:
+                element["image_url"] = image_url
+                variants = self.string(variants_id)
+                element["image_variants"] = None if variants is None else json.loads(variants)
+                if str(index) in sprites:
+                    element["image_atlas"] = sprites[str(index)]
+            else:
+                element["image_bytes"] = self.image_bytes(index)
+            images.append((kind, element))
+
+        tables = json.loads(bytes(self.section(TABLES)))
+        tables_by_page: Dict[int, List[Dict[str, Any]]] = {}
+        for table in tables:
+            tables_by_page.setdefault(table["page_num"], []).append(table)
+
+        pages = []
+        page_section = self.section(PAGES)
+        for index in range(self.page_count):
+            (page_number, width, height, span_start, span_count,
+             image_start, image_count) = _PAGE.unpack_from(page_section, index * _PAGE.size)
+            page_images = images[image_start:image_start + image_count]
+            pages.append({
+                "page_number": page_number,
+                "page_type": meta["page_types"][index],
+                "width": round(width, 4),
+                "height": round(height, 4),
+                "text_elements": spans[span_start:span_start + span_count],
+                "image_elements": [e for kind, e in page_images if kind == KIND_IMAGE],
+                "diagram_elements": [e for kind, e in page_images if kind == KIND_DIAGRAM],
+                "table_elements": tables_by_page.get(index, [])
+            })
+
+        refs = self.section(REFS).cast("I")
+        questions = []
+        question_section = self.section(QUESTIONS)
+        for index in range(self.question_count):
+            (number_id, sequence_order, marks, page_number,
+             ref_start, ref_count) = _QUESTION.unpack_from(question_section, index * _QUESTION.size)
+            content = []
+            for ref in refs[ref_start:ref_start + ref_count]:
+                if ref & _REF_IMAGE:
+                    kind, element = images[ref & ~_REF_IMAGE]
+                    content_type = "DIAGRAM" if kind == KIND_DIAGRAM else "IMAGE"
+                    content.append({"type": content_type, "data": element})
+                elif ref & _REF_TABLE:
+                    content.append({"type": "TABLE", "data": tables[ref & ~_REF_TABLE]})
+                else:
+                    content.append({"type": "TEXT", "data": spans[ref]})
+            questions.append({
+                "question_number": self.string(number_id),
+                "sequence_order": sequence_order,
+                "marks": None if marks < 0 else marks,
+                "content": content,
+                "page_number": page_number
+            })
+
+        return {
+            "metadata": meta["metadata"],
+            "pages": pages,
+            "all_images": [],
+            "questions": questions,
+            "styles": styles,
+            "stats": meta["stats"]
+        }
@@ -0,0 +1,239 @@
+"""Image transcoding and thumbnail generation for extracted images."""
+import asyncio
+import io
+import math
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Any, List, Optional, Tuple
+
+from PIL import Image
+
+from app.config import get_settings
+
+
+# PDF user space is 72 points per inch; CSS pixels are 96 per inch
+POINTS_PER_INCH = 72
+CSS_DPI = 96
+
+# Pillow save formats by variant file extension
+_PIL_FORMATS = {"webp": "WEBP", "avif": "AVIF"}
+
+_pool: Optional[ThreadPoolExecutor] = None
+
+
+class ImageProcessor:
+    """
+    Transcodes extracted images into web formats at display-derived sizes.
+
+    Each image gets a ``1x`` variant sized to its on-page placement at CSS
+    resolution, a ``2x`` variant at ``target_dpi``, and a ``thumb`` variant
+    bounded by ``thumbnail_size``. Variants are never upscaled beyond the
+    source image, and sizes that collapse to the same dimensions are only
+    encoded once.
+    """
+
+    def __init__(
+        self,
+        formats: List[str],
+        target_dpi: int = 192,
+        thumbnail_size: int = 160,
+        quality: int = 80
+    ):
+        """Initialize the processor, dropping formats Pillow cannot encode."""
+        Image.init()
+        self.formats = [
+            fmt for fmt in formats
+            if fmt in _PIL_FORMATS and _PIL_FORMATS[fmt] in Image.SAVE
+        ] or ["webp"]
+        self.target_dpi = target_dpi
+        self.thumbnail_size = thumbnail_size
+        self.quality = quality
+
+    def process(
+        self,
+        image_bytes: bytes,
+        bbox_width: float,
+        bbox_height: float
+    ) -> List[Dict[str, Any]]:
+        """
+        Produce all variants for one image.
+
+        Args:
+            image_bytes: Original image data as extracted from the PDF
+            bbox_width: Placement width on the page in points
+            bbox_height: Placement height on the page in points
+
+        Returns:
+            List of variants with label, format, width, height and bytes
+        """
+        with Image.open(io.BytesIO(image_bytes)) as source:
+            image = self._normalize_mode(source)
+
+        sizes = [
+            ("thumb", self._fit(image.size, (self.thumbnail_size, self.thumbnail_size))),
+            ("1x", self._display_size(image.size, bbox_width, bbox_height, CSS_DPI)),
+            ("2x", self._display_size(image.size, bbox_width, bbox_height, self.target_dpi)),
+        ]
+
+        variants = []
+        seen_sizes = set()
+        for label, size in sizes:
+            if size in seen_sizes:
+                continue
+            seen_sizes.add(size)
+
+            resized = image if size == image.size else image.resize(size, Image.LANCZOS)
+            for fmt in self.formats:
+                buffer = io.BytesIO()
+                resized.save(buffer, format=_PIL_FORMATS[fmt], quality=self.quality)
+                variants.append({
+                    "label": label,
+                    "format": fmt,
+                    "width": size[0],
+                    "height": size[1],
+                    "bytes": buffer.getvalue()
+                })
+
+        return variants
+
+    def sprite(
+        self,
+        image_bytes: bytes,
+        bbox_width: float,
+        bbox_height: float
+    ) -> Image.Image:
+        """
+        Decode an image at its ``2x`` size for drawing into an atlas.
+
+        Args:
+            image_bytes: Original image data as extracted from the PDF
+            bbox_width: Placement width on the page in points
+            bbox_height: Placement height on the page in points
+
+        Returns:
+            RGB or RGBA image
+        """
+        with Image.open(io.BytesIO(image_bytes)) as source:
+            image = self._normalize_mode(source)
+        size = self._display_size(image.size, bbox_width, bbox_height, self.target_dpi)
+        return image if size == image.size else image.resize(size, Image.LANCZOS)
+
+    def encode(self, image: Image.Image) -> Tuple[bytes, str]:
+        """
+        Encode an image in the first configured format.
+
+        Returns:
+            Tuple of (image bytes, format)
+        """
+        fmt = self.formats[0]
+        buffer = io.BytesIO()
+        image.save(buffer, format=_PIL_FORMATS[fmt], quality=self.quality)
+        return buffer.getvalue(), fmt
+
+    def _normalize_mode(self, image: Image.Image) -> Image.Image:
+        """Convert to RGB or RGBA, which every target encoder accepts."""
+        has_alpha = image.mode in ("RGBA", "LA", "PA") or (
+            image.mode == "P" and "transparency" in image.info
+        )
+        return image.convert("RGBA" if has_alpha else "RGB")
+
+    def _display_size(
+        self,
+        source_size: Tuple[int, int],
+        bbox_width: float,
+        bbox_height: float,
+        dpi: int
+    ) -> Tuple[int, int]:
+        """Pixel size needed to show the image at its page placement and dpi."""
+        if not bbox_width or not bbox_height:
+            return source_size
+        scale = dpi / POINTS_PER_INCH
+        bounds = (math.ceil(bbox_width * scale), math.ceil(bbox_height * scale))
+        return self._fit(source_size, bounds)
+
+    def _fit(self, size: Tuple[int, int], bounds: Tuple[int, int]) -> Tuple[int, int]:
+        """Scale ``size`` down to fit within ``bounds``, keeping aspect ratio."""
+        ratio = min(bounds[0] / size[0], bounds[1] / size[1], 1.0)
+        return max(1, round(size[0] * ratio)), max(1, round(size[1] * ratio))
+
+
+def primary_variant(variant_records: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    Pick the variant used as an image's default URL.
+
+    Args:
+        variant_records: Uploaded variants, in the order ImageProcessor made them
+
+    Returns:
+        The largest variant in the first configured format
+    """
+    return max(
+        (v for v in variant_records if v["format"] == variant_records[0]["format"]),
+        key=lambda v: v["width"] * v["height"]
+    )
+
+
+def get_image_processor() -> ImageProcessor:
+    """Create an image processor from settings."""
+    settings = get_settings()
+    return ImageProcessor(
+        formats=[fmt.strip().lower() for fmt in settings.image_formats.split(",") if fmt.strip()],
+        target_dpi=settings.image_target_dpi,
+        thumbnail_size=settings.image_thumbnail_size,
+        quality=settings.image_quality
+    )
+
+
+def get_image_pool() -> ThreadPoolExecutor:
+    """Get the shared image worker pool; Pillow releases the GIL while coding."""
+    global _pool
+    if _pool is None:
+        _pool = ThreadPoolExecutor(
+            max_workers=get_settings().image_workers,
+            thread_name_prefix="image"
+        )
+    return _pool
+
+
+async def process_images(
+    processor: ImageProcessor,
+    image_elements: List[Dict[str, Any]]
+):
+    """
+    Transcode image elements concurrently on the image pool.
+
+    Each element gains a ``variants`` list and loses its original
+    ``image_bytes``. Elements that fail to transcode keep their original
+    bytes and are uploaded unchanged.
+
+    Args:
+        processor: Image processor to use
+        image_elements: Image data dictionaries from PDFParser
+    """
+    loop = asyncio.get_running_loop()
+    pool = get_image_pool()
+
+    results = await asyncio.gather(*[
+        loop.run_in_executor(
+            pool,
+            processor.process,
+            element["image_bytes"],
+            element.get("bbox_width"),
+            element.get("bbox_height")
+        )
+        for element in image_elements
+    ], return_exceptions=True)
+
+    for element, result in zip(image_elements, results):
+        if isinstance(result, Exception):
+            print(f"Warning: Could not transcode image {element.get('img_index')}: {result}")
+            continue
+        element["variants"] = result
+        del element["image_bytes"]
+
+
+def shutdown_image_pool():
+    """Shut down the image worker pool if it was started."""
+    global _pool
+    if _pool is not None:
+        _pool.shutdown(wait=True)
+        _pool = None
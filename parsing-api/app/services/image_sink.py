@@ -0,0 +1,172 @@
+"""Upload extracted images while parsing continues, with bounded buffering."""
+import hashlib
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Dict, Any, List, Optional, Tuple
+
+from app.services.atlas import apply_atlas, build_atlases, is_sprite_candidate
+from app.services.image_pipeline import ImageProcessor, primary_variant
+from app.utils.storage import StorageService
+
+
+class ImageUploadSink:
+    """
+    Takes images from the parser as they are extracted and uploads them.
+
+    Each submitted element gives up its ``image_bytes`` immediately; the
+    bytes are transcoded and uploaded to content-addressed paths on a small
+    thread pool. ``submit`` blocks while more than ``max_buffer_bytes`` of
+    extracted images are waiting or uploading, so the parser cannot run
+    ahead of storage. Images repeated within a document (same content
+    hash) are uploaded once. After ``close`` every element carries
+    ``image_url`` and ``image_variants`` instead of bytes.
+
+    With ``atlas_max_image`` set, images placed no larger than that are
+    held back instead and packed into sprite atlases on ``close``; those
+    elements get the atlas URL and an ``image_atlas`` region. A small
+    placement can still carry a large image, so held images count against
+    the buffer too, and are packed early when they would overflow it.
+    """
+
+    def __init__(
+        self,
+        storage: StorageService,
+        processor: ImageProcessor,
+        max_buffer_bytes: int,
+        max_workers: int,
+        atlas_max_image: float = 0,
+        atlas_size: int = 2048
+    ):
+        """Initialize the sink and its upload threads; ``atlas_max_image`` 0 disables atlases."""
+        self.storage = storage
+        self.processor = processor
+        self.max_buffer_bytes = max_buffer_bytes
+        self.atlas_max_image = atlas_max_image
+        self.atlas_size = atlas_size
+        self.buffered_bytes = 0
+        self.peak_buffered_bytes = 0
+        self._held_bytes = 0
+        self._condition = threading.Condition()
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="image-upload")
+        self._uploads: Dict[str, Future] = {}
+        self._pending: List[Tuple[Dict[str, Any], Future]] = []
+        self._sprites: List[Dict[str, Any]] = []
+
+    def submit(self, element: Dict[str, Any]):
+        """
+        Queue an image element for upload, blocking while the buffer is full.
+
+        Args:
+            element: Image or diagram element with ``image_bytes``
+        """
+        if self.atlas_max_image and is_sprite_candidate(element, self.atlas_max_image):
+            size = len(element["image_bytes"])
+            element.setdefault("hash", hashlib.sha256(element["image_bytes"]).hexdigest())
+            self._reserve(size)
+            self._held_bytes += size
+            self._sprites.append(element)
+            return
+        self._submit_standalone(element)
+
+    def _reserve(self, size: int):
+        """Count bytes against the buffer, waiting for room; held images are packed first if needed."""
+        if self._sprites and self.buffered_bytes + size > self.max_buffer_bytes:
+            self._pack_sprites()
+        with self._condition:
+            # A single image larger than the budget is still let through alone
+            while self.buffered_bytes and self.buffered_bytes + size > self.max_buffer_bytes:
+                self._condition.wait()
+            self.buffered_bytes += size
+            self.peak_buffered_bytes = max(self.peak_buffered_bytes, self.buffered_bytes)
+
+    def _release(self, size: int):
+        """Return bytes to the buffer, waking a blocked ``submit``."""
+        with self._condition:
+            self.buffered_bytes -= size
+            self._condition.notify_all()
+
+    def _submit_standalone(self, element: Dict[str, Any]):
+        """Queue an image for transcoding and upload on its own."""
+        image_bytes = element.pop("image_bytes")
+        content_hash = element.setdefault("hash", hashlib.sha256(image_bytes).hexdigest())
+
+        upload = self._uploads.get(content_hash)
+        if upload is None:
+            size = len(image_bytes)
+            self._reserve(size)
+            upload = self._pool.submit(
+                self._upload, image_bytes, element["format"], content_hash,
+                element.get("bbox_width"), element.get("bbox_height"), size
+            )
+            self._uploads[content_hash] = upload
+
+        self._pending.append((element, upload))
+
+    def _upload(
+        self,
+        image_bytes: bytes,
+        format: str,
+        content_hash: str,
+        bbox_width: Optional[float],
+        bbox_height: Optional[float],
+        size: int
+    ) -> Tuple[str, Optional[List[Dict[str, Any]]]]:
+        """Transcode and upload one image; returns (primary URL, variant records)."""
+        try:
+            try:
+                variants = self.processor.process(image_bytes, bbox_width, bbox_height)
+            except Exception as e:
+                print(f"Warning: Could not transcode image {content_hash[:12]}: {e}")
+                url = self.storage.put_shared_image(image_bytes, format, content_hash)
+                return url, None
+
+            variant_records = []
+            for variant in variants:
+                url = self.storage.put_shared_image(
+                    variant["bytes"], variant["format"], content_hash, variant["label"]
+                )
+                variant_records.append({
+                    "label": variant["label"],
+                    "format": variant["format"],
+                    "width": variant["width"],
+                    "height": variant["height"],
+                    "url": url
+                })
+            return primary_variant(variant_records)["url"], variant_records
+        finally:
+            self._release(size)
+
+    def _pack_sprites(self):
+        """Pack and upload the held images, storing any that fit no atlas on their own."""
+        sprites, self._sprites = self._sprites, []
+        held, self._held_bytes = self._held_bytes, 0
+        try:
+            for atlas in build_atlases(sprites, self.processor, self.atlas_size):
+                url = self.storage.put_shared_image(
+                    atlas["bytes"], atlas["format"], atlas["hash"], "atlas"
+                )
+                apply_atlas(atlas, url)
+        finally:
+            self._release(held)
+        # Images left out of every atlas are stored on their own
+        for element in sprites:
+            if "image_bytes" in element:
+                self._submit_standalone(element)
+
+    def close(self):
+        """
+        Wait for all uploads and record their URLs on the submitted elements.
+
+        Raises:
+            Exception: The first upload error
+        """
+        if self._sprites:
+            self._pack_sprites()
+
+        for element, upload in self._pending:
+            element["image_url"], element["image_variants"] = upload.result()
+        self._pending = []
+
+    def shutdown(self):
+        """Stop the upload threads, dropping uploads that have not started."""
+        self._pool.shutdown(wait=True, cancel_futures=True)
@@ -0,0 +1,187 @@
+"""Concurrent ingest stages connected by bounded queues."""
+import asyncio
+import time
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Optional, Sequence
+
+
+# Marks the end of a stage's input
+_DONE = object()
+
+
+class StageMetrics:
+    """
+    Process-wide counters for one stage, summed over concurrent ingests.
+
+    ``queued`` is the number of items waiting in the stage's input queues
+    right now. ``blocked_seconds`` is time the stage spent waiting for room
+    in the next stage's queue: a stage that blocks a lot is faster than the
+    one after it, and the stage with the deepest queue is the bottleneck.
+    Only touched from the event loop, so no locking is needed.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self.queued = 0
+        self.peak_queued = 0
+        self.active = 0
+        self.processed = 0
+        self.failed = 0
+        self.busy_seconds = 0.0
+        self.blocked_seconds = 0.0
+
+    def stats(self) -> Dict[str, Any]:
+        """Get queue depth and throughput counters."""
+        return {
+            "queued": self.queued,
+            "peak_queued": self.peak_queued,
+            "active": self.active,
+            "processed": self.processed,
+            "failed": self.failed,
+            "busy_seconds": round(self.busy_seconds, 3),
+            "blocked_seconds": round(self.blocked_seconds, 3)
+        }
+
+
+_metrics: Dict[str, StageMetrics] = {}
+
+
+def get_stage_metrics(name: str) -> StageMetrics:
+    """Get the process-wide metrics for a stage, creating them on first use."""
+    metrics = _metrics.get(name)
+    if metrics is None:
+        metrics = _metrics[name] = StageMetrics(name)
+    return metrics
+
+
+def pipeline_stats() -> Dict[str, Dict[str, Any]]:
+    """Get the counters of every ingest stage used so far in this process."""
+    return {name: metrics.stats() for name, metrics in _metrics.items()}
+
+
+class Stage:
+    """One step of a Pipeline; ``done`` is set once it has handled every item."""
+
+    def __init__(self, name: str, handler: Callable[[Any], Awaitable[Any]], queue_size: int):
+        self.name = name
+        self.handler = handler
+        self.queue: "asyncio.Queue[Any]" = asyncio.Queue(maxsize=queue_size)
+        self.metrics = get_stage_metrics(name)
+        self.done = asyncio.Event()
+        # Items this run has put on the queue and not yet taken off
+        self.pending = 0
+
+
+class Pipeline:
+    """
+    Runs items through a chain of async stages, each fed by a bounded queue.
+
+    Every stage works on its own item at the same time, so total time
+    approaches that of the slowest stage rather than the sum of all of
+    them, while the bounded queues stop a fast stage from running far
+    ahead of a slow one. Each stage has a single worker, so items reach
+    every stage in the order they were given. The first failure cancels
+    the whole run.
+    """
+
+    def __init__(self, queue_size: int):
+        """
+        Initialize an empty pipeline.
+
+        Args:
+            queue_size: Items each stage may have waiting before the stage
+                feeding it blocks
+        """
+        self.queue_size = max(1, queue_size)
+        self.stages: List[Stage] = []
+
+    def add_stage(self, name: str, handler: Callable[[Any], Awaitable[Any]]) -> Stage:
+        """
+        Append a stage; its handler's result is passed on to the next stage.
+
+        Args:
+            name: Stage name in the metrics
+            handler: Coroutine function called with each item
+
+        Returns:
+            The stage, whose ``done`` event later work can wait on
+        """
+        stage = Stage(name, handler, self.queue_size)
+        self.stages.append(stage)
+        return stage
+
+    async def run(self, items: Iterable[Any], alongside: Sequence[Awaitable[Any]] = ()):
+        """
+        Feed items through every stage and wait for all of them to finish.
+
+        Args:
+            items: Inputs for the first stage, consumed lazily
+            alongside: Other work to run concurrently and cancel with the
+                pipeline on failure (e.g. work waiting on a stage's ``done``)
+
+        Raises:
+            Exception: The first failure of a stage or of ``alongside``
+        """
+        tasks = [asyncio.ensure_future(self._feed(items))]
+        for index, stage in enumerate(self.stages):
+            following = self.stages[index + 1] if index + 1 < len(self.stages) else None
+            tasks.append(asyncio.ensure_future(self._work(stage, following)))
+        tasks.extend(asyncio.ensure_future(work) for work in alongside)
+
+        try:
+            await asyncio.gather(*tasks)
+        except BaseException:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            raise
+        finally:
+            # Items abandoned in the queues no longer count as queued
+            for stage in self.stages:
+                stage.metrics.queued -= stage.pending
+                stage.pending = 0
+
+    async def _put(self, stage: Stage, item: Any):
+        """Queue an item for a stage, counting it while it waits."""
+        await stage.queue.put(item)
+        if item is not _DONE:
+            stage.pending += 1
+            stage.metrics.queued += 1
+            stage.metrics.peak_queued = max(stage.metrics.peak_queued, stage.metrics.queued)
+
+    async def _feed(self, items: Iterable[Any]):
+        """Put every input on the first stage's queue."""
+        first = self.stages[0]
+        for item in items:
+            await self._put(first, item)
+        await self._put(first, _DONE)
+
+    async def _work(self, stage: Stage, following: Optional[Stage]):
+        """Handle a stage's items until its input ends, passing results on."""
+        metrics = stage.metrics
+        while True:
+            item = await stage.queue.get()
+            if item is _DONE:
+                break
+            stage.pending -= 1
+            metrics.queued -= 1
+
+            metrics.active += 1
+            start = time.perf_counter()
+            try:
+                result = await stage.handler(item)
+            except Exception:
+                metrics.failed += 1
+                raise
+            finally:
+                metrics.active -= 1
+                metrics.busy_seconds += time.perf_counter() - start
+            metrics.processed += 1
+
+            if following is not None:
+                start = time.perf_counter()
+                await self._put(following, result)
+                metrics.blocked_seconds += time.perf_counter() - start
+
+        stage.done.set()
+        if following is not None:
+            await self._put(following, _DONE)
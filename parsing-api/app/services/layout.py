@@ -0,0 +1,138 @@
+"""Column detection and position lookup for assigning elements to questions."""
+from bisect import bisect_right, insort
+from typing import Dict, Any, List, Optional, Tuple
+
+# Spans wider than this fraction of the page (titles, full-width lines)
+# say nothing about columns
+_NARROW_SPAN = 0.6
+# Minimum gutter width between two columns, in points
+_MIN_GUTTER = 12
+# A gutter must be clear of all but this fraction of narrow spans
+_MAX_CROSSING = 0.05
+
+
+def detect_columns(
+    text_elements: List[Dict[str, Any]],
+    page_width: float
+) -> List[Tuple[float, float]]:
+    """
+    Split a page into one or two text columns.
+
+    Looks for a vertical gutter in the middle of the page that almost no
+    narrow text span crosses, with text on both sides.
+
+    Args:
+        text_elements: Text spans of the page
+        page_width: Page width in points
+
+    Returns:
+        Column x-ranges, left to right
+    """
+    single = [(0.0, page_width)]
+    spans = [
+        (e["x"], e["x"] + e["width"]) for e in text_elements
+        if e["width"] < _NARROW_SPAN * page_width
+    ]
+    if len(spans) < 10:
+        return single
+
+    # Gaps between merged span intervals inside the middle third of the page
+    spans.sort()
+    best: Optional[Tuple[float, float]] = None
+    covered_to = spans[0][1]
+    for x0, x1 in spans[1:]:
+        if x0 - covered_to >= _MIN_GUTTER:
+            gap = (covered_to, x0)
+            center = (gap[0] + gap[1]) / 2
+            if page_width / 3 <= center <= 2 * page_width / 3:
+                if best is None or gap[1] - gap[0] > best[1] - best[0]:
+                    best = gap
+        covered_to = max(covered_to, x1)
+
+    if best is None:
+        return single
+
+    split = (best[0] + best[1]) / 2
+    left = sum(1 for x0, x1 in spans if x1 <= split)
+    right = sum(1 for x0, x1 in spans if x0 >= split)
+    crossing = len(spans) - left - right
+    if min(left, right) < 5 or crossing > _MAX_CROSSING * len(spans):
+        return single
+    return [(0.0, split), (split, page_width)]
+
+
+class PageAnchors:
+    """
+    Question start positions on a page, in reading order.
+
+    Reading order is column by column, top to bottom. Anchors are kept as
+    a sorted list of (column, y) keys, so the question an element belongs
+    to (the last one starting before it) is found by binary search. An
+    element above the first anchor belongs to the question carried over
+    from the previous page.
+    """
+
+    def __init__(
+        self,
+        page_number: int,
+        columns: List[Tuple[float, float]],
+        carried: Optional[Dict[str, Any]]
+    ):
+        """
+        Initialize anchors for a page.
+
+        Args:
+            page_number: Page number (1-indexed)
+            columns: Column x-ranges from detect_columns
+            carried: Question in progress at the top of the page, if any
+        """
+        self.page_number = page_number
+        self.columns = columns
+        self.carried = carried
+        self._keys: List[Tuple[int, float]] = []
+        self._questions: List[Dict[str, Any]] = []
+
+    def reading_key(self, element: Dict[str, Any]) -> Tuple[int, int, float]:
+        """
+        Position of an element in document reading order.
+
+        Elements wider than a column, such as figures spanning the page,
+        are read with the first column at their height.
+
+        Args:
+            element: Element with x, y and a width or bbox_width
+
+        Returns:
+            (page number, column index, top y)
+        """
+        # Images and diagrams carry their page extent as bbox_width
+        width = element.get("bbox_width", element.get("width", 0))
+        column = 0
+        # Full-width elements cross the gutter; read them with the first column
+        if width < _NARROW_SPAN * self.columns[-1][1]:
+            center = element["x"] + width / 2
+            for index, (x0, _) in enumerate(self.columns):
+                if center >= x0:
+                    column = index
+        return self.page_number, column, element["y"]
+
+    def add(self, element: Dict[str, Any], question: Dict[str, Any]):
+        """Record that ``question`` starts at ``element``."""
+        _, column, y = self.reading_key(element)
+        index = bisect_right(self._keys, (column, y))
+        self._keys.insert(index, (column, y))
+        self._questions.insert(index, question)
+
+    def locate(self, element: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """
+        Find the question an element on this page belongs to.
+
+        Args:
+            element: Image, diagram or table element
+
+        Returns:
+            The question, or None before the first question of the document
+        """
+        _, column, y = self.reading_key(element)
+        index = bisect_right(self._keys, (column, y)) - 1
+        return self._questions[index] if index >= 0 else self.carried
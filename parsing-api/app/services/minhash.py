@@ -0,0 +1,149 @@
+"""MinHash signatures and LSH banding for near-duplicate question lookup."""
+import hashlib
+import random
+import re
+from typing import Dict, Iterable, List, Optional, Set
+
+# 16 bands of 4 rows: pairs with Jaccard similarity ~0.5 share a band about
+# half the time, and pairs at ~0.8 almost always do
+NUM_PERMUTATIONS = 64
+NUM_BANDS = 16
+ROWS_PER_BAND = NUM_PERMUTATIONS // NUM_BANDS
+
+SHINGLE_SIZE = 3
+# Shorter questions ("1 (a)", "Answer all parts") match everything
+MIN_TOKENS = 8
+
+_MERSENNE_PRIME = (1 << 61) - 1
+_TOKEN_PATTERN = re.compile(r"[a-z]+")
+
+# Fixed seed: signatures are stored, so the permutations must never change
+_rng = random.Random(0x5EED)
+_PERMUTATIONS = [
+    (_rng.randrange(1, _MERSENNE_PRIME), _rng.randrange(0, _MERSENNE_PRIME))
+    for _ in range(NUM_PERMUTATIONS)
+]
+
+
+def shingles(text: str) -> Set[int]:
+    """
+    Hash the word n-grams of a question's text.
+
+    Text is lowercased and reduced to alphabetic words, so question numbers,
+    marks and changed figures do not make reworded questions look different.
+
+    Args:
+        text: Question plain text
+
+    Returns:
+        64-bit shingle hashes, empty if the text is too short to compare
+    """
+    tokens = _TOKEN_PATTERN.findall(text.lower())
+    if len(tokens) < MIN_TOKENS:
+        return set()
+    return {
+        int.from_bytes(
+            hashlib.blake2b(" ".join(tokens[i:i + SHINGLE_SIZE]).encode("utf-8"), digest_size=8).digest(),
+            "little"
+        )
+        for i in range(len(tokens) - SHINGLE_SIZE + 1)
+    }
+
+
+def minhash_signature(text: str) -> Optional[List[int]]:
+    """
+    Compute the MinHash signature of a question's text.
+
+    Args:
+        text: Question plain text
+
+    Returns:
+        NUM_PERMUTATIONS minimum hash values, or None for too-short text
+    """
+    hashes = shingles(text)
+    if not hashes:
+        return None
+    return [
+        min((a * h + b) % _MERSENNE_PRIME for h in hashes)
+        for a, b in _PERMUTATIONS
+    ]
+
+
+def band_keys(signature: List[int]) -> List[str]:
+    """
+    Split a signature into LSH band keys.
+
+    Two questions become candidates when they share any key.
+
+    Args:
+        signature: MinHash signature
+
+    Returns:
+        One ``"<band>:<hash>"`` key per band
+    """
+    keys = []
+    for band in range(NUM_BANDS):
+        rows = signature[band * ROWS_PER_BAND:(band + 1) * ROWS_PER_BAND]
+        digest = hashlib.blake2b(
+            b"".join(value.to_bytes(8, "little") for value in rows), digest_size=8
+        ).hexdigest()
+        keys.append(f"{band}:{digest}")
+    return keys
+
+
+def estimate_similarity(a: List[int], b: List[int]) -> float:
+    """Estimate the Jaccard similarity of two signatures."""
+    return sum(x == y for x, y in zip(a, b)) / NUM_PERMUTATIONS
+
+
+class LSHIndex:
+    """
+    In-memory band index over signatures.
+
+    The database keeps the same band keys in the QuestionBand table; this
+    class is the equivalent for offline use and benchmarking.
+    """
+
+    def __init__(self):
+        """Initialize an empty index."""
+        self.signatures: Dict[str, List[int]] = {}
+        self._buckets: Dict[str, List[str]] = {}
+
+    def add(self, key: str, signature: List[int]):
+        """Index a signature under ``key``."""
+        self.signatures[key] = signature
+        for band in band_keys(signature):
+            self._buckets.setdefault(band, []).append(key)
+
+    def candidates(self, signature: List[int]) -> Set[str]:
+        """Keys sharing at least one band with ``signature``."""
+        found: Set[str] = set()
+        for band in band_keys(signature):
+            found.update(self._buckets.get(band, ()))
+        return found
+
+    def query(
+        self,
+        signature: List[int],
+        threshold: float = 0.5,
+        exclude: Iterable[str] = ()
+    ) -> List[tuple]:
+        """
+        Find indexed signatures similar to ``signature``.
+
+        Args:
+            signature: Query signature
+            threshold: Minimum estimated Jaccard similarity
+            exclude: Keys to leave out (e.g. the query itself)
+
+        Returns:
+            (key, similarity) pairs, most similar first
+        """
+        excluded = set(exclude)
+        hits = []
+        for key in self.candidates(signature) - excluded:
+            similarity = estimate_similarity(signature, self.signatures[key])
+            if similarity >= threshold:
+                hits.append((key, similarity))
+        hits.sort(key=lambda hit: (-hit[1], hit[0]))
+        return hits
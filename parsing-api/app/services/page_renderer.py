@@ -0,0 +1,346 @@
+"""On-demand page raster tiles backed by a size-bounded on-disk LRU cache."""
+import asyncio
+import math
+import multiprocessing
+import os
+import tempfile
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Any, Awaitable, Callable, List, Optional, Tuple
+
+import fitz  # PyMuPDF
+
+from app.config import get_settings
+
+
+def render_tile(
+    pdf_path: str,
+    page_number: int,
+    zoom: float,
+    tile_x: int,
+    tile_y: int,
+    tile_size: int
+) -> bytes:
+    """
+    Render one tile of a page to PNG inside a worker process.
+
+    Args:
+        pdf_path: Path to the PDF on local disk
+        page_number: Page number (1-indexed)
+        zoom: Scale factor relative to 72 dpi
+        tile_x: Tile column
+        tile_y: Tile row
+        tile_size: Tile edge length in pixels
+
+    Returns:
+        PNG bytes
+    """
+    with fitz.open(pdf_path) as doc:
+        page = doc[page_number - 1]
+        # Tile edge in page points at this zoom
+        span = tile_size / zoom
+        clip = fitz.Rect(
+            tile_x * span, tile_y * span,
+            (tile_x + 1) * span, (tile_y + 1) * span
+        ) & page.rect
+        pixmap = page.get_pixmap(matrix=fitz.Matrix(zoom, zoom), clip=clip)
+        return pixmap.tobytes("png")
+
+
+def read_page_sizes(pdf_path: str) -> List[Tuple[float, float]]:
+    """Read the (width, height) in points of every page of a PDF."""
+    with fitz.open(pdf_path) as doc:
+        return [(page.rect.width, page.rect.height) for page in doc]
+
+
+class DiskLRUCache:
+    """
+    Files on local disk evicted least-recently-used once over ``max_bytes``.
+
+    Recency is kept in memory and mirrored to file modification times, so
+    the order survives a restart. Writes go through a temporary file and
+    an atomic rename, so concurrent processes never see partial files.
+    """
+
+    def __init__(self, directory: str, max_bytes: int):
+        """Initialize the cache, indexing any files already on disk."""
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.total_bytes = 0
+        self._entries: "OrderedDict[str, int]" = OrderedDict()
+
+        os.makedirs(directory, exist_ok=True)
+        existing = []
+        for root, _, files in os.walk(directory):
+            for name in files:
+                path = os.path.join(root, name)
+                stat = os.stat(path)
+                existing.append((stat.st_mtime, os.path.relpath(path, directory), stat.st_size))
+        for _, key, size in sorted(existing):
+            self._entries[key] = size
+            self.total_bytes += size
+
+    def path(self, key: str) -> str:
+        """Absolute path for a cache key."""
+        return os.path.join(self.directory, key)
+
+    def get(self, key: str) -> Optional[bytes]:
+        """
+        Read a cached entry and mark it most recently used.
+
+        Args:
+            key: Relative path within the cache
+
+        Returns:
+            File contents, or None on a miss
+        """
+        if not self.touch(key):
+            return None
+        with open(self.path(key), "rb") as f:
+            return f.read()
+
+    def touch(self, key: str) -> bool:
+        """Mark an entry most recently used; returns False if it is absent."""
+        if key not in self._entries:
+            return False
+        try:
+            os.utime(self.path(key))
+        except FileNotFoundError:
+            # Removed by another process sharing the directory
+            self.total_bytes -= self._entries.pop(key)
+            return False
+        self._entries.move_to_end(key)
+        return True
+
+    def put(self, key: str, data: bytes):
+        """
+        Store an entry, evicting the least recently used ones if needed.
+
+        Args:
+            key: Relative path within the cache
+            data: File contents
+        """
+        path = self.path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path))
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+
+        if key in self._entries:
+            self.total_bytes -= self._entries.pop(key)
+        self._entries[key] = len(data)
+        self.total_bytes += len(data)
+        self._evict(keep=key)
+
+    def _evict(self, keep: str):
+        """Remove least recently used entries until within budget."""
+        while self.total_bytes > self.max_bytes and len(self._entries) > 1:
+            key, size = next(iter(self._entries.items()))
+            if key == keep:
+                break
+            del self._entries[key]
+            self.total_bytes -= size
+            try:
+                os.remove(self.path(key))
+            except FileNotFoundError:
+                pass
+
+
+class PageRenderer:
+    """
+    Serves page tiles, rendering each at most once while it stays cached.
+
+    Tiles are keyed by PDF hash, page, zoom and tile position. Concurrent
+    requests for the same uncached tile (or PDF download) share a single
+    in-flight future, so only one render happens.
+    """
+
+    def __init__(
+        self,
+        cache: DiskLRUCache,
+        zooms: List[float],
+        tile_size: int,
+        max_workers: int
+    ):
+        """Initialize the renderer and its worker pool."""
+        self.cache = cache
+        self.zooms = zooms
+        self.tile_size = tile_size
+        self._pool = ProcessPoolExecutor(
+            max_workers=max_workers,
+            mp_context=multiprocessing.get_context("spawn")
+        )
+        self._inflight: Dict[str, asyncio.Future] = {}
+        self._page_sizes: "OrderedDict[str, List[Tuple[float, float]]]" = OrderedDict()
+
+    async def get_page_info(
+        self,
+        pdf_hash: str,
+        load_pdf: Callable[[], Awaitable[bytes]],
+        page_number: int
+    ) -> Dict[str, Any]:
+        """
+        Describe the tile grid of a page at every zoom level.
+
+        Args:
+            pdf_hash: SHA-256 of the stored PDF
+            load_pdf: Coroutine factory that downloads the PDF on a cache miss
+            page_number: Page number (1-indexed)
+
+        Returns:
+            Page size in points with columns and rows per zoom level
+        """
+        width, height = await self._page_size(pdf_hash, load_pdf, page_number)
+        return {
+            "page_number": page_number,
+            "width": width,
+            "height": height,
+            "tile_size": self.tile_size,
+            "zoom_levels": [
+                {
+                    "zoom": zoom,
+                    "columns": math.ceil(width * zoom / self.tile_size),
+                    "rows": math.ceil(height * zoom / self.tile_size)
+                }
+                for zoom in self.zooms
+            ]
+        }
+
+    async def get_tile(
+        self,
+        pdf_hash: str,
+        load_pdf: Callable[[], Awaitable[bytes]],
+        page_number: int,
+        zoom: float,
+        tile_x: int,
+        tile_y: int
+    ) -> bytes:
+        """
+        Get a PNG tile, rendering it on a cache miss.
+
+        Args:
+            pdf_hash: SHA-256 of the stored PDF
+            load_pdf: Coroutine factory that downloads the PDF on a cache miss
+            page_number: Page number (1-indexed)
+            zoom: One of the configured zoom levels
+            tile_x: Tile column
+            tile_y: Tile row
+
+        Returns:
+            PNG bytes
+
+        Raises:
+            ValueError: If the zoom, page or tile is out of range
+        """
+        if zoom not in self.zooms:
+            raise ValueError(f"Zoom must be one of {self.zooms}")
+
+        width, height = await self._page_size(pdf_hash, load_pdf, page_number)
+        columns = math.ceil(width * zoom / self.tile_size)
+        rows = math.ceil(height * zoom / self.tile_size)
+        if not (0 <= tile_x < columns and 0 <= tile_y < rows):
+            raise ValueError(f"Tile ({tile_x}, {tile_y}) is outside the {columns}x{rows} grid")
+
+        key = f"tiles/{pdf_hash[:2]}/{pdf_hash}/p{page_number}_z{zoom:g}_{tile_x}_{tile_y}.png"
+        cached = self.cache.get(key)
+        if cached is not None:
+            return cached
+
+        async def render() -> bytes:
+            pdf_path = await self._pdf_path(pdf_hash, load_pdf)
+            loop = asyncio.get_running_loop()
+            data = await loop.run_in_executor(
+                self._pool, render_tile,
+                pdf_path, page_number, zoom, tile_x, tile_y, self.tile_size
+            )
+            self.cache.put(key, data)
+            return data
+
+        return await self._coalesce(key, render)
+
+    async def _page_size(
+        self,
+        pdf_hash: str,
+        load_pdf: Callable[[], Awaitable[bytes]],
+        page_number: int
+    ) -> Tuple[float, float]:
+        """Get a page's size, reading and remembering all sizes for the PDF."""
+        sizes = self._page_sizes.get(pdf_hash)
+        if sizes is None:
+            pdf_path = await self._pdf_path(pdf_hash, load_pdf)
+            sizes = await asyncio.to_thread(read_page_sizes, pdf_path)
+            self._page_sizes[pdf_hash] = sizes
+            if len(self._page_sizes) > 1024:
+                self._page_sizes.popitem(last=False)
+
+        if not 1 <= page_number <= len(sizes):
+            raise ValueError(f"Page {page_number} is outside 1-{len(sizes)}")
+        return sizes[page_number - 1]
+
+    async def _pdf_path(
+        self,
+        pdf_hash: str,
+        load_pdf: Callable[[], Awaitable[bytes]]
+    ) -> str:
+        """Ensure the PDF is in the local cache and return its path."""
+        key = f"pdfs/{pdf_hash}.pdf"
+        if self.cache.touch(key):
+            return self.cache.path(key)
+
+        async def download() -> str:
+            self.cache.put(key, await load_pdf())
+            return self.cache.path(key)
+
+        return await self._coalesce(key, download)
+
+    async def _coalesce(self, key: str, produce: Callable[[], Awaitable[Any]]) -> Any:
+        """
+        Run ``produce`` once per key, sharing its result with concurrent callers.
+
+        The work runs in its own task, so a caller that is cancelled (e.g. on
+        client disconnect) stops waiting without cancelling it for the others.
+        """
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(produce())
+            self._inflight[key] = task
+
+            def forget(done: asyncio.Future):
+                if self._inflight.get(key) is done:
+                    del self._inflight[key]
+                # Mark retrieved so a failure with no waiters is not logged as unhandled
+                if not done.cancelled():
+                    done.exception()
+
+            task.add_done_callback(forget)
+        return await asyncio.shield(task)
+
+    def shutdown(self):
+        """Shut down the render workers."""
+        self._pool.shutdown(wait=True, cancel_futures=True)
+
+
+_renderer: Optional[PageRenderer] = None
+
+
+def get_page_renderer() -> PageRenderer:
+    """Get the shared page renderer, creating it on first use."""
+    global _renderer
+    if _renderer is None:
+        settings = get_settings()
+        _renderer = PageRenderer(
+            cache=DiskLRUCache(settings.page_cache_dir, settings.page_cache_max_bytes),
+            zooms=[float(zoom) for zoom in settings.page_render_zooms.split(",")],
+            tile_size=settings.page_tile_size,
+            max_workers=settings.render_workers
+        )
+    return _renderer
+
+
+def shutdown_page_renderer():
+    """Shut down the page renderer if it was started."""
+    global _renderer
+    if _renderer is not None:
+        _renderer.shutdown()
+        _renderer = None
@@ -0,0 +1,250 @@
+"""Worker pool for running CPU-bound PDF parsing outside the event loop."""
+import asyncio
+import contextlib
+import multiprocessing
+import os
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Any, Callable, List, Optional
+
+from app.config import get_settings
+from app.services.docpack import PackedDocument
+from app.services.image_pipeline import get_image_processor
+from app.services.image_sink import ImageUploadSink
+from app.services.pdf_parser import PDFParser
+from app.services.scheduler import SlotScheduler, estimate_parse_cost
+from app.services.span_layer import decode_layer
+from app.utils.profiling import memory_profile
+from app.utils.storage import StorageService
+
+
+def _remove_spool(path: str) -> None:
+    """Delete a packed document file if it is still on disk."""
+    with contextlib.suppress(FileNotFoundError):
+        os.remove(path)
+
+
+def _remove_spool_result(job: "asyncio.Future[str]") -> None:
+    """Delete the file written by a spool job whose caller went away."""
+    if not job.cancelled() and job.exception() is None:
+        _remove_spool(job.result())
+
+
+class ParserBusyError(Exception):
+    """Raised when the parse queue is full and new work is rejected."""
+
+    def __init__(self, message: str, retry_after: int):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+def parse_pdf_to_spool(pdf_bytes: bytes, spool_dir: Optional[str]) -> str:
+    """
+    Parse a PDF in a worker process and write the packed result to a file.
+
+    Returning a path instead of the parsed dictionary avoids pickling
+    every span back through the pool's result pipe; the caller maps the
+    file instead. Images are uploaded to storage from the worker while
+    parsing, so only their URLs reach the packed document.
+
+    Args:
+        pdf_bytes: PDF file as bytes
+        spool_dir: Directory for the packed file (system temp dir if None)
+
+    Returns:
+        Path of the packed document
+    """
+    settings = get_settings()
+    # Images are uploaded as they are extracted instead of being packed
+    sink = ImageUploadSink(
+        storage=StorageService(),
+        processor=get_image_processor(),
+        max_buffer_bytes=settings.image_upload_buffer_bytes,
+        max_workers=settings.image_workers,
+        atlas_max_image=settings.image_atlas_max_image if settings.image_atlas else 0,
+        atlas_size=settings.image_atlas_size
+    )
+    profiling = memory_profile() if settings.memory_profiling else contextlib.nullcontext()
+    try:
+        with profiling:
+            parser = PDFParser(diagram_dpi=settings.diagram_dpi, image_sink=sink)
+            packed = parser.parse_pdf_packed(pdf_bytes)
+    finally:
+        sink.shutdown()
+
+    fd, path = tempfile.mkstemp(suffix=".ppdoc", dir=spool_dir)
+    with os.fdopen(fd, "wb") as f:
+        f.write(packed)
+    return path
+
+
+def segment_span_layer(layer_bytes: bytes) -> List[Dict[str, Any]]:
+    """
+    Re-run question segmentation on a stored span layer in a worker process.
+
+    Args:
+        layer_bytes: Bytes from span_layer.encode_layer
+
+    Returns:
+        Segmented questions, shaped like PDFParser output
+    """
+    layer = decode_layer(layer_bytes)
+    return PDFParser()._segment_questions(layer["pages"])
+
+
+class ParseExecutor:
+    """
+    Process pool for parsing with admission control.
+
+    At most ``max_concurrency`` parses run at once. Up to ``max_queue``
+    further requests may wait for a slot; beyond that, or when a request
+    has waited longer than ``queue_timeout`` seconds, work is rejected with
+    ParserBusyError instead of piling up in memory. Waiting requests are
+    started by a SlotScheduler, smallest PDFs first, so a long booklet
+    does not hold up the short papers queued behind it.
+    """
+
+    def __init__(
+        self,
+        max_workers: int,
+        max_concurrency: int,
+        max_queue: int,
+        queue_timeout: float,
+        retry_after: int,
+        aging_rate: float,
+        spool_dir: Optional[str] = None
+    ):
+        """Initialize the process pool and admission state."""
+        # Spawn rather than fork: the API process runs an event loop and
+        # client threads that must not be duplicated into workers.
+        self._pool = ProcessPoolExecutor(
+            max_workers=max_workers,
+            mp_context=multiprocessing.get_context("spawn")
+        )
+        self._scheduler = SlotScheduler(max_concurrency, aging_rate)
+        self.max_concurrency = max_concurrency
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.retry_after = retry_after
+        self.spool_dir = spool_dir
+        self.rejected = 0
+
+    @property
+    def running(self) -> int:
+        """Number of jobs holding a slot."""
+        return self._scheduler.running
+
+    @property
+    def waiting(self) -> int:
+        """Number of jobs waiting for a slot."""
+        return self._scheduler.waiting
+
+    async def parse(self, pdf_bytes: bytes, client: str = "") -> Dict[str, Any]:
+        """
+        Parse a PDF on the pool once a slot is free.
+
+        Args:
+            pdf_bytes: PDF file as bytes
+            client: Identity of the requesting client, for fair scheduling
+
+        Returns:
+            Parsed PDF data from PDFParser
+
+        Raises:
+            ParserBusyError: If the wait queue is full or the wait timed out
+        """
+        cost = await asyncio.to_thread(estimate_parse_cost, pdf_bytes)
+        job = asyncio.ensure_future(self.run(
+            parse_pdf_to_spool, pdf_bytes, self.spool_dir, cost=cost, client=client
+        ))
+        try:
+            path = await asyncio.shield(job)
+        except asyncio.CancelledError:
+            # The worker keeps going; remove its file once it has been written
+            job.add_done_callback(_remove_spool_result)
+            raise
+        try:
+            return PackedDocument.open(path, delete=True).to_parsed_data()
+        finally:
+            _remove_spool(path)
+
+    async def run(
+        self,
+        fn: Callable[..., Any],
+        *args: Any,
+        cost: float = 1.0,
+        client: str = ""
+    ) -> Any:
+        """
+        Run a picklable function on the pool, subject to admission control.
+
+        Args:
+            fn: Module-level function to call in a worker process
+            *args: Arguments for ``fn``
+            cost: Estimated cost in page-equivalents, for scheduling
+            client: Identity of the requesting client, for fair scheduling
+
+        Returns:
+            Return value of ``fn``
+
+        Raises:
+            ParserBusyError: If the wait queue is full or the wait timed out
+        """
+        if self.running + self.waiting >= self.max_concurrency + self.max_queue:
+            self.rejected += 1
+            raise ParserBusyError("Parse queue is full", self.retry_after)
+
+        try:
+            await self._scheduler.acquire(cost, client, timeout=self.queue_timeout)
+        except asyncio.TimeoutError:
+            self.rejected += 1
+            raise ParserBusyError("Timed out waiting for a parse slot", self.retry_after)
+
+        try:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self._pool, fn, *args)
+        finally:
+            self._scheduler.release(client)
+
+    def stats(self) -> Dict[str, Any]:
+        """Get current admission counters and queue metrics."""
+        return {
+            "running": self.running,
+            "waiting": self.waiting,
+            "rejected": self.rejected,
+            "max_concurrency": self.max_concurrency,
+            "max_queue": self.max_queue,
+            **self._scheduler.stats()
+        }
+
+    def shutdown(self):
+        """Shut down the worker processes."""
+        self._pool.shutdown(wait=True, cancel_futures=True)
+
+
+_executor: Optional[ParseExecutor] = None
+
+
+def get_parse_executor() -> ParseExecutor:
+    """Get the shared parse executor, creating it on first use."""
+    global _executor
+    if _executor is None:
+        settings = get_settings()
+        _executor = ParseExecutor(
+            max_workers=settings.parse_workers,
+            max_concurrency=settings.parse_max_concurrency or settings.parse_workers,
+            max_queue=settings.parse_queue_size,
+            queue_timeout=settings.parse_queue_timeout,
+            retry_after=settings.parse_retry_after,
+            aging_rate=settings.parse_aging_rate,
+            spool_dir=settings.parse_spool_dir or None
+        )
+    return _executor
+
+
+def shutdown_parse_executor():
+    """Shut down the parse executor if it was started."""
+    global _executor
+    if _executor is not None:
+        _executor.shutdown()
+        _executor = None
@@ -1,22 +1,128 @@
 """Core PDF parsing service using PyMuPDF."""
 import fitz  # PyMuPDF
+import hashlib
 import io
 import re
 from PIL import Image
-from typing import List, Dict, Any, Tuple
+from typing import List, Dict, Any, Optional, Tuple
 from datetime import datetime
 
+from app.services.docpack import pack_document
+from app.services.image_sink import ImageUploadSink
+from app.services.layout import PageAnchors, detect_columns
+from app.services.styles import StyleTable
+from app.utils.profiling import current_profile, profile_stage
+
+
+# Page types from the classification pre-pass; only QUESTION pages are extracted
+PAGE_QUESTION = "question"
+PAGE_BLANK = "blank"
+PAGE_COVER = "cover"
+PAGE_INSTRUCTIONS = "instructions"
+PAGE_ADDITIONAL = "additional"
+
+# Phrases (lowercase, whitespace-normalized) that identify non-question pages
+_BLANK_PHRASES = ("blank page", "this page is intentionally left blank")
+_ADDITIONAL_PHRASES = (
+    "additional page",
+    "additional answer space",
+    "write the question numbers in the left-hand margin",
+)
+_INSTRUCTION_PHRASES = (
+    "answer all questions",
+    "use black ink",
+    "the marks for questions are shown in brackets",
+    "time allowed",
+    "candidate number",
+    "centre number",
+    "candidate signature",
+    "for examiner's use",
+    "do not open this",
+)
+# Instruction pages only appear at the front of a paper
+_INSTRUCTION_MAX_PAGE = 1
+# Pages with a blank phrase and at most this much other text count as empty
+_BLANK_MAX_CHARS = 80
+# Mark allocations: [6 marks], (4 marks), [3], (5); only on question pages
+_MARK_PATTERNS = [
+    re.compile(r'\[(\d+)\s*marks?\]', re.IGNORECASE),
+    re.compile(r'\((\d+)\s*marks?\)', re.IGNORECASE),
+    re.compile(r'\[(\d+)\]'),
+    re.compile(r'\((\d+)\)')
+]
+# Mark allocations as papers print them for page classification: at the
+# end of a line, or a bare (5) on its own right-aligned line. A bare
+# number in brackets elsewhere is usually numbering, e.g. "(1)"
+_PAGE_MARK_PATTERN = re.compile(r'(?:\[\d+\s*(?:marks?)?\]|\(\d+\s*marks?\))$')
+_BARE_MARK_PATTERN = re.compile(r'\(\d+\)')
+# Left edge, as a fraction of page width, of a right-aligned bare mark
+_RIGHT_ALIGNED = 0.6
+# Lines at the top of a page that may carry an additional page header
+_HEADER_LINES = 3
+
+
+def _is_header_row(header: List[Dict[str, Any]], body: List[Dict[str, Any]]) -> bool:
+    """
+    Decide whether a table's first row is a header.
+
+    PyMuPDF treats the first row of every ruled table as its header, so
+    the first row only counts as one when it is set apart from the body:
+    all bold over a non-bold body, or in a larger font.
+
+    Args:
+        header: Text spans in the first row
+        body: Text spans in the other rows
+
+    Returns:
+        True if the first row is styled as a header
+    """
+    if not header or not body:
+        return False
+    if all(e["is_bold"] for e in header) and not any(e["is_bold"] for e in body):
+        return True
+    return min(e["font_size"] for e in header) > max(e["font_size"] for e in body)
+
 
 class PDFParser:
     """Parser for extracting content from PDF past papers."""
     
-    def __init__(self):
-        """Initialize the PDF parser."""
+    def __init__(
+        self,
+        diagram_dpi: int = 192,
+        diagram_min_size: float = 40,
+        diagram_min_paths: int = 3,
+        diagram_gap: float = 8,
+        image_sink: Optional[ImageUploadSink] = None,
+        detect_tables: bool = True,
+        classify_pages: bool = True
+    ):
+        """
+        Initialize the PDF parser.
+        
+        Args:
+            diagram_dpi: Resolution for rasterizing vector diagrams
+            diagram_min_size: Minimum width and height (points) of a diagram
+            diagram_min_paths: Minimum number of drawing paths in a diagram
+            diagram_gap: Distance (points) within which drawings are clustered
+            image_sink: Uploads images as they are extracted; without one,
+                images keep their ``image_bytes`` in the parsed output
+            detect_tables: Replace the spans of ruled tables with TABLE elements
+            classify_pages: Skip extraction on blank, cover, instruction and
+                additional answer pages
+        """
         # Question number pattern: matches "1", "2a", "2b(i)", "3(c)(ii)", etc.
         self.question_pattern = re.compile(
             r'^(\d+)(\s*\([a-z]\))?(\s*\([ivxIVX]+\))?\s*'
         )
+        self.diagram_dpi = diagram_dpi
+        self.diagram_min_size = diagram_min_size
+        self.diagram_min_paths = diagram_min_paths
+        self.diagram_gap = diagram_gap
+        self.image_sink = image_sink
+        self.detect_tables = detect_tables
+        self.classify_pages = classify_pages
     
+    @profile_stage("parse_pdf")
     def parse_pdf(self, pdf_bytes: bytes) -> Dict[str, Any]:
         """
         Parse a PDF and extract all content with layout preservation.
@@ -33,21 +139,60 @@ class PDFParser:
             "metadata": self._extract_metadata(doc),
             "pages": [],
             "all_images": [],
-            "questions": []
+            "questions": [],
+            "styles": [],
+            "stats": {}
         }
         
-        # Parse each page
+        # Parse each page, interning text styles across the whole paper
+        styles = StyleTable()
         for page_num in range(len(doc)):
             page = doc[page_num]
-            page_data = self._parse_page(page, page_num)
+            page_data = self._parse_page(page, page_num, styles)
             parsed_data["pages"].append(page_data)
+        parsed_data["styles"] = styles.to_list()
+        
+        # Wait for streamed uploads so every image element carries its URL
+        if self.image_sink is not None:
+            self.image_sink.close()
         
         # Segment into questions
         parsed_data["questions"] = self._segment_questions(parsed_data["pages"])
         
+        # Only tables inside a question are stored; each stands in for all
+        # of its cell spans as a single content row
+        stored_tables = [
+            item["data"] for question in parsed_data["questions"]
+            for item in question["content"] if item["type"] == "TABLE"
+        ]
+        parsed_data["stats"] = {
+            "tables": sum(len(page["table_elements"]) for page in parsed_data["pages"]),
+            "table_rows_saved": sum(t["spans_replaced"] - 1 for t in stored_tables),
+            "pages_skipped": sum(
+                1 for page in parsed_data["pages"] if page["page_type"] != PAGE_QUESTION
+            )
+        }
+        
         doc.close()
         return parsed_data
     
+    def parse_pdf_packed(self, pdf_bytes: bytes) -> bytes:
+        """
+        Parse a PDF and emit the packed binary intermediate format.
+        
+        Args:
+            pdf_bytes: PDF file as bytes
+            
+        Returns:
+            Packed document bytes (see app.services.docpack)
+        """
+        parsed_data = self.parse_pdf(pdf_bytes)
+        profile = current_profile()
+        if profile is not None:
+            # Carried back to the API process in the packed metadata
+            parsed_data["stats"]["memory"] = profile.to_list()
+        return pack_document(parsed_data)
+    
     def _extract_metadata(self, doc: fitz.Document) -> Dict[str, Any]:
         """Extract metadata from PDF."""
         metadata = doc.metadata
@@ -59,13 +204,19 @@ class PDFParser:
             "creator": metadata.get("creator", "")
         }
     
-    def _parse_page(self, page: fitz.Page, page_num: int) -> Dict[str, Any]:
+    def _parse_page(
+        self,
+        page: fitz.Page,
+        page_num: int,
+        styles: StyleTable
+    ) -> Dict[str, Any]:
         """
         Parse a single page and extract text and images with positions.
         
         Args:
             page: PyMuPDF page object
             page_num: Page number (0-indexed)
+            styles: Style table for the paper
             
         Returns:
             Dictionary with page content
@@ -73,26 +224,124 @@ class PDFParser:
         # Get page dimensions
         page_rect = page.rect
         
+        page_type = self._classify_page(page, page_num) if self.classify_pages else PAGE_QUESTION
+        if page_type != PAGE_QUESTION:
+            return {
+                "page_number": page_num + 1,
+                "page_type": page_type,
+                "width": page_rect.width,
+                "height": page_rect.height,
+                "text_elements": [],
+                "image_elements": [],
+                "diagram_elements": [],
+                "table_elements": []
+            }
+        
         # Extract text with detailed formatting
-        text_elements = self._extract_text_with_formatting(page)
+        text_elements = self._extract_text_with_formatting(page, styles)
         
         # Extract images
         image_elements = self._extract_images(page, page_num)
         
+        drawings = page.get_drawings()
+        
+        # Replace the cell spans of ruled tables with one element per table
+        table_elements, text_elements = self._extract_tables(
+            page, page_num, text_elements, drawings
+        )
+        
+        # Rasterize vector diagrams, absorbing the labels drawn inside them;
+        # table rulings are not diagrams
+        diagram_elements, text_elements = self._extract_diagrams(
+            page, page_num, text_elements, drawings,
+            exclude=[(t["x"], t["y"], t["x"] + t["width"], t["y"] + t["height"]) for t in table_elements]
+        )
+        
         return {
             "page_number": page_num + 1,
+            "page_type": PAGE_QUESTION,
             "width": page_rect.width,
             "height": page_rect.height,
             "text_elements": text_elements,
-            "image_elements": image_elements
+            "image_elements": image_elements,
+            "diagram_elements": diagram_elements,
+            "table_elements": table_elements
         }
     
-    def _extract_text_with_formatting(self, page: fitz.Page) -> List[Dict[str, Any]]:
+    def _classify_page(self, page: fitz.Page, page_num: int) -> str:
+        """
+        Classify a page from cheap signals before full extraction.
+        
+        Uses plain text blocks (much cheaper than the span dictionary), a
+        set of known phrases, the number of embedded images and, for pages
+        with almost no text, the number of vector drawings. A page that
+        shows a mark allocation is always a question page, an additional
+        page must say so in its heading, and only a page saying it is
+        blank is skipped as blank.
+        
+        Args:
+            page: PyMuPDF page object
+            page_num: Page number (0-indexed)
+            
+        Returns:
+            One of the PAGE_* types
+        """
+        # Text blocks top to bottom, as (left edge, normalized line) pairs
+        lines = []
+        for x0, _, _, _, block_text, _, block_type in page.get_text("blocks", sort=True):
+            if block_type != 0:
+                continue
+            for line in block_text.splitlines():
+                line = " ".join(line.split()).lower()
+                if line:
+                    lines.append((x0, line))
+        text = " ".join(line for _, line in lines)
+        
+        right_edge = _RIGHT_ALIGNED * page.rect.width
+        if any(
+            _PAGE_MARK_PATTERN.search(line)
+            or (x0 >= right_edge and _BARE_MARK_PATTERN.fullmatch(line))
+            for x0, line in lines
+        ):
+            return PAGE_QUESTION
+        
+        # Only as a heading: question pages may point to the additional pages
+        if any(line.startswith(_ADDITIONAL_PHRASES) for _, line in lines[:_HEADER_LINES]):
+            return PAGE_ADDITIONAL
+        
+        if any(phrase in text for phrase in _BLANK_PHRASES):
+            remaining = text
+            for phrase in _BLANK_PHRASES:
+                remaining = remaining.replace(phrase, "")
+            # A figure under a stray "blank page" footer is still content
+            if (
+                len(remaining.strip()) <= _BLANK_MAX_CHARS
+                and not page.get_images()
+                and len(page.get_drawings()) < self.diagram_min_paths
+            ):
+                return PAGE_BLANK
+        
+        instruction_hits = sum(1 for phrase in _INSTRUCTION_PHRASES if phrase in text)
+        if page_num <= _INSTRUCTION_MAX_PAGE and instruction_hits >= 3:
+            return PAGE_COVER if page_num == 0 else PAGE_INSTRUCTIONS
+        
+        return PAGE_QUESTION
+    
+    @profile_stage("extract_text")
+    def _extract_text_with_formatting(
+        self,
+        page: fitz.Page,
+        styles: StyleTable
+    ) -> List[Dict[str, Any]]:
         """
         Extract text with font, size, position, and formatting info.
         
+        Each span's formatting is interned in ``styles`` and the span
+        records its ``style_id`` alongside the formatting fields.
+        
         Args:
             page: PyMuPDF page object
+            styles: Style table for the paper
             
         Returns:
             List of text elements with formatting
@@ -116,14 +365,20 @@ class PDFParser:
                     flags = span.get("flags", 0)
                     is_bold = bool(flags & 2**4)  # Bit 4 indicates bold
                     is_italic = bool(flags & 2**1)  # Bit 1 indicates italic
+                    font_family = span.get("font", "unknown")
+                    font_size = round(span.get("size", 12), 2)
+                    color = span.get("color", 0)
                     
                     text_elements.append({
                         "text": span["text"],
-                        "font_family": span.get("font", "unknown"),
-                        "font_size": round(span.get("size", 12), 2),
+                        "style_id": styles.intern(
+                            font_family, font_size, is_bold, is_italic, color
+                        ),
+                        "font_family": font_family,
+                        "font_size": font_size,
                         "is_bold": is_bold,
                         "is_italic": is_italic,
-                        "color": span.get("color", 0),
+                        "color": color,
                         "x": round(bbox[0], 2),
                         "y": round(bbox[1], 2),
                         "width": round(bbox[2] - bbox[0], 2),
@@ -132,6 +387,7 @@ class PDFParser:
         
         return text_elements
     
+    @profile_stage("extract_images")
     def _extract_images(self, page: fitz.Page, page_num: int) -> List[Dict[str, Any]]:
         """
         Extract images from a page with position and metadata.
@@ -165,7 +421,7 @@ class PDFParser:
                     # Load image to get dimensions
                     pil_image = Image.open(io.BytesIO(image_bytes))
                     
-                    image_elements.append({
+                    element = {
                         "image_bytes": image_bytes,
                         "format": image_ext,
                         "width": pil_image.width,
@@ -177,7 +433,10 @@ class PDFParser:
                         "xref": xref,
                         "page_num": page_num,
                         "img_index": img_index
-                    })
+                    }
+                    if self.image_sink is not None:
+                        self.image_sink.submit(element)
+                    image_elements.append(element)
             except Exception as e:
                 # Skip problematic images
                 print(f"Warning: Could not extract image {img_index} on page {page_num}: {e}")
@@ -185,11 +444,228 @@ class PDFParser:
         
         return image_elements
     
+    @profile_stage("extract_tables")
+    def _extract_tables(
+        self,
+        page: fitz.Page,
+        page_num: int,
+        text_elements: List[Dict[str, Any]],
+        drawings: List[Dict[str, Any]]
+    ) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]:
+        """
+        Detect ruled tables and turn each into a single structured element.
+        
+        Text spans whose centre lies inside a table are replaced by the
+        table's cell text, cell rectangles, and column and row boundaries.
+        
+        Args:
+            page: PyMuPDF page object
+            page_num: Page number for naming
+            text_elements: Text elements extracted from the page
+            drawings: Vector drawings on the page
+            
+        Returns:
+            Tuple of (table data dictionaries, remaining text elements)
+        """
+        # Table detection looks for ruling lines, so pages without drawings have none
+        if not self.detect_tables or not drawings:
+            return [], text_elements
+        
+        try:
+            tables = page.find_tables().tables
+        except Exception as e:
+            print(f"Warning: Could not detect tables on page {page_num}: {e}")
+            return [], text_elements
+        
+        table_elements = []
+        absorbed = set()
+        for table in tables:
+            if table.row_count < 2 or table.col_count < 2:
+                continue
+            
+            x0, y0, x1, y1 = table.bbox
+            inside = [
+                i for i, element in enumerate(text_elements)
+                if i not in absorbed
+                and x0 <= element["x"] + element["width"] / 2 <= x1
+                and y0 <= element["y"] + element["height"] / 2 <= y1
+            ]
+            if not inside:
+                continue
+            absorbed.update(inside)
+            
+            font_sizes = sorted(text_elements[i]["font_size"] for i in inside)
+            first_row_bottom = table.rows[0].bbox[3]
+            header_spans, body_spans = [], []
+            for i in inside:
+                element = text_elements[i]
+                in_first_row = element["y"] + element["height"] / 2 <= first_row_bottom
+                (header_spans if in_first_row else body_spans).append(element)
+            cells = [
+                [None if cell is None else [round(v, 2) for v in cell] for cell in row.cells]
+                for row in table.rows
+            ]
+            table_elements.append({
+                # Merged cells are None; empty cells are ""
+                "rows": table.extract(),
+                "cells": cells,
+                "column_x": sorted(
+                    {round(cell[0], 1) for row in cells for cell in row if cell} | {round(x1, 1)}
+                ),
+                "row_y": [round(row.bbox[1], 2) for row in table.rows] + [round(y1, 2)],
+                "header_row": _is_header_row(header_spans, body_spans),
+                "font_size": font_sizes[len(font_sizes) // 2],
+                "x": round(x0, 2),
+                "y": round(y0, 2),
+                "width": round(x1 - x0, 2),
+                "height": round(y1 - y0, 2),
+                "page_num": page_num,
+                "table_index": len(table_elements),
+                "spans_replaced": len(inside)
+            })
+        
+        remaining = [
+            element for i, element in enumerate(text_elements) if i not in absorbed
+        ]
+        return table_elements, remaining
+    
+    @profile_stage("extract_diagrams")
+    def _extract_diagrams(
+        self,
+        page: fitz.Page,
+        page_num: int,
+        text_elements: List[Dict[str, Any]],
+        drawings: List[Dict[str, Any]],
+        exclude: List[Tuple[float, float, float, float]] = ()
+    ) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]:
+        """
+        Detect vector diagrams and render each one to a PNG.
+        
+        Drawing paths are clustered by proximity; clusters that are large
+        enough and contain enough paths are treated as diagrams. Short text
+        spans touching a diagram (axis labels, tick values) are drawn into
+        the render and removed from the text elements.
+        
+        Args:
+            page: PyMuPDF page object
+            page_num: Page number for naming
+            text_elements: Text elements extracted from the page
+            drawings: Vector drawings on the page
+            exclude: Regions (x0, y0, x1, y1) whose drawings are ignored
+            
+        Returns:
+            Tuple of (diagram data dictionaries, remaining text elements)
+        """
+        page_area = page.rect.width * page.rect.height
+        rects = []
+        for drawing in drawings:
+            rect = drawing["rect"]
+            # Page borders and background fills are not diagrams
+            if rect.width * rect.height > 0.5 * page_area:
+                continue
+            center_x, center_y = (rect.x0 + rect.x1) / 2, (rect.y0 + rect.y1) / 2
+            if any(x0 <= center_x <= x1 and y0 <= center_y <= y1 for x0, y0, x1, y1 in exclude):
+                continue
+            rects.append((rect.x0, rect.y0, rect.x1, rect.y1))
+        
+        clusters = [
+            cluster for cluster in self._cluster_rects(rects, self.diagram_gap)
+            if cluster[4] >= self.diagram_min_paths
+            and cluster[2] - cluster[0] >= self.diagram_min_size
+            and cluster[3] - cluster[1] >= self.diagram_min_size
+        ]
+        if not clusters:
+            return [], text_elements
+        
+        diagram_elements = []
+        absorbed = set()
+        gap = self.diagram_gap
+        for diagram_index, (x0, y0, x1, y1, _) in enumerate(clusters):
+            clip = fitz.Rect(x0, y0, x1, y1)
+            
+            for i, element in enumerate(text_elements):
+                if len(element["text"].strip()) > 12:
+                    continue
+                if (element["x"] <= x1 + gap and element["x"] + element["width"] >= x0 - gap
+                        and element["y"] <= y1 + gap and element["y"] + element["height"] >= y0 - gap):
+                    absorbed.add(i)
+                    clip |= fitz.Rect(
+                        element["x"], element["y"],
+                        element["x"] + element["width"], element["y"] + element["height"]
+                    )
+            
+            clip = (clip + (-2, -2, 2, 2)) & page.rect
+            pixmap = page.get_pixmap(clip=clip, dpi=self.diagram_dpi)
+            image_bytes = pixmap.tobytes("png")
+            
+            element = {
+                "image_bytes": image_bytes,
+                "format": "png",
+                "hash": hashlib.sha256(image_bytes).hexdigest(),
+                "width": pixmap.width,
+                "height": pixmap.height,
+                "x": round(clip.x0, 2),
+                "y": round(clip.y0, 2),
+                "bbox_width": round(clip.width, 2),
+                "bbox_height": round(clip.height, 2),
+                "page_num": page_num,
+                "img_index": diagram_index
+            }
+            if self.image_sink is not None:
+                self.image_sink.submit(element)
+            diagram_elements.append(element)
+        
+        remaining = [
+            element for i, element in enumerate(text_elements) if i not in absorbed
+        ]
+        return diagram_elements, remaining
+    
+    def _cluster_rects(
+        self,
+        rects: List[Tuple[float, float, float, float]],
+        gap: float
+    ) -> List[Tuple[float, float, float, float, int]]:
+        """
+        Merge rectangles that lie within ``gap`` of each other.
+        
+        Args:
+            rects: Rectangles as (x0, y0, x1, y1)
+            gap: Merge distance in points
+            
+        Returns:
+            Cluster bounding boxes as (x0, y0, x1, y1, member count)
+        """
+        clusters: List[List[float]] = []
+        for x0, y0, x1, y1 in sorted(rects, key=lambda r: r[1]):
+            merged = [x0, y0, x1, y1, 1]
+            # Fold in every existing cluster this rectangle touches; a merge
+            # can bridge clusters that were previously separate
+            kept = []
+            for cluster in clusters:
+                if (cluster[0] <= merged[2] + gap and cluster[2] >= merged[0] - gap
+                        and cluster[1] <= merged[3] + gap and cluster[3] >= merged[1] - gap):
+                    merged = [
+                        min(merged[0], cluster[0]), min(merged[1], cluster[1]),
+                        max(merged[2], cluster[2]), max(merged[3], cluster[3]),
+                        merged[4] + cluster[4]
+                    ]
+                else:
+                    kept.append(cluster)
+            kept.append(merged)
+            clusters = kept
+        
+        return [tuple(cluster) for cluster in clusters]
+    
+    @profile_stage("segment_questions")
     def _segment_questions(self, pages: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
         """
         Segment pages into individual questions.
         
         Uses pattern matching to identify question numbers and group content.
+        Images, diagrams and tables are assigned by position: each goes to
+        the last question starting before it in reading order (column by
+        column on two-column pages), and is placed among that question's
+        text at the point where it appears.
         
         Args:
             pages: List of parsed page data
@@ -199,10 +675,19 @@ class PDFParser:
         """
         questions = []
         current_question = None
-        sequence_order = 0
+        # Reading-order keys of each question's text items, and its
+        # positioned non-text items, keyed by sequence order
+        text_keys: Dict[int, List[Tuple[int, int, float]]] = {}
+        placed: Dict[int, List[Tuple[Tuple[int, int, float], Dict[str, Any]]]] = {}
         
         for page in pages:
-            for element in page["text_elements"]:
+            columns = detect_columns(page["text_elements"], page["width"])
+            anchors = PageAnchors(page["page_number"], columns, carried=current_question)
+            text_elements = page["text_elements"]
+            if len(columns) > 1:
+                text_elements = sorted(text_elements, key=anchors.reading_key)
+            
+            for element in text_elements:
                 text = element["text"].strip()
                 
                 # Check if this looks like a question number
@@ -210,20 +695,19 @@ class PDFParser:
                 
                 # Must be a match and reasonably sized (not tiny text)
                 if match and element["font_size"] >= 9:
-                    # Save previous question
-                    if current_question:
-                        questions.append(current_question)
-                        sequence_order += 1
-                    
                     # Start new question
                     question_number = match.group(0).strip()
                     current_question = {
                         "question_number": question_number,
-                        "sequence_order": sequence_order,
+                        "sequence_order": len(questions),
                         "marks": self._extract_marks(text),
                         "content": [],
                         "page_number": page["page_number"]
                     }
+                    questions.append(current_question)
+                    text_keys[current_question["sequence_order"]] = []
+                    placed[current_question["sequence_order"]] = []
+                    anchors.add(element, current_question)
                 
                 # Add content to current question
                 if current_question:
@@ -231,18 +715,37 @@ class PDFParser:
                         "type": "TEXT",
                         "data": element
                     })
+                    text_keys[current_question["sequence_order"]].append(
+                        anchors.reading_key(element)
+                    )
             
-            # Add images from this page to current question
-            if current_question:
-                for img_element in page["image_elements"]:
-                    current_question["content"].append({
-                        "type": "IMAGE",
-                        "data": img_element
-                    })
+            # Find the question each image, diagram and table belongs to
+            for content_type, key in (
+                ("IMAGE", "image_elements"),
+                ("DIAGRAM", "diagram_elements"),
+                ("TABLE", "table_elements")
+            ):
+                for element in page.get(key, []):
+                    question = anchors.locate(element)
+                    if question is not None:
+                        placed[question["sequence_order"]].append(
+                            (anchors.reading_key(element), {"type": content_type, "data": element})
+                        )
         
-        # Don't forget the last question
-        if current_question:
-            questions.append(current_question)
+        # Merge positioned items into each question's text in reading order
+        for question in questions:
+            items = sorted(placed[question["sequence_order"]], key=lambda item: item[0])
+            if not items:
+                continue
+            content = []
+            next_item = 0
+            for text_key, text_item in zip(text_keys[question["sequence_order"]], question["content"]):
+                while next_item < len(items) and items[next_item][0] < text_key:
+                    content.append(items[next_item][1])
+                    next_item += 1
+                content.append(text_item)
+            content.extend(item for _, item in items[next_item:])
+            question["content"] = content
         
         return questions
     
@@ -258,16 +761,8 @@ class PDFParser:
         Returns:
             Number of marks, or None if not found
         """
-        # Pattern: [6 marks], (4 marks), [3], (5), etc.
-        mark_patterns = [
-            r'\[(\d+)\s*marks?\]',
-            r'\((\d+)\s*marks?\)',
-            r'\[(\d+)\]',
-            r'\((\d+)\)'
-        ]
-        
-        for pattern in mark_patterns:
-            match = re.search(pattern, text, re.IGNORECASE)
+        for pattern in _MARK_PATTERNS:
+            match = pattern.search(text)
             if match:
                 try:
                     return int(match.group(1))
@@ -0,0 +1,561 @@
+"""Direct PostgreSQL database service using COPY for bulk ingest."""
+import asyncio
+import threading
+from datetime import datetime, timedelta
+from typing import Dict, Any, Callable, List, Optional, Tuple, TypeVar
+from urllib.parse import urlsplit, urlunsplit, parse_qsl, urlencode
+
+import psycopg
+from psycopg import sql
+from psycopg.rows import dict_row
+from psycopg.types.json import Jsonb
+from psycopg_pool import ConnectionPool
+
+from app.config import get_settings
+from app.services.db_service import DatabaseService
+from app.services.minhash import band_keys
+from app.utils.resilience import call_with_retry_sync
+
+
+# Column order used for COPY, matching the @map names in prisma/schema.prisma
+PAPER_COLUMNS = [
+    "id", "title", "exam_board", "subject", "level", "year", "session",
+    "paper_number", "total_marks", "pdf_url", "pdf_hash", "uploaded_at",
+    "ingest_status", "ingest_checkpoint", "ingest_updated_at"
+]
+QUESTION_COLUMNS = [
+    "id", "paper_id", "question_number", "sequence_order", "marks",
+    "plain_text", "minhash"
+]
+BAND_COLUMNS = ["band", "question_id"]
+STYLE_COLUMNS = [
+    "paper_id", "style_id", "font_family", "font_size", "is_bold", "is_italic", "color"
+]
+CONTENT_COLUMNS = [
+    "id", "question_id", "sequence_order", "content_type",
+    "text", "style_id", "font_size", "font_family", "is_bold", "is_italic",
+    "x", "y", "width", "height",
+    "image_url", "image_variants", "image_atlas", "image_width", "image_height", "alt_text",
+    "table_data"
+]
+
+# Prisma-only URL parameters that libpq rejects
+_PRISMA_URL_PARAMS = {"schema", "pgbouncer", "connection_limit", "pool_timeout"}
+
+T = TypeVar("T")
+
+_pool: Optional[ConnectionPool] = None
+_pool_lock = threading.Lock()
+
+
+def to_libpq_url(database_url: str) -> str:
+    """
+    Strip Prisma-specific query parameters from a DATABASE_URL.
+
+    Args:
+        database_url: Connection string as used by Prisma
+
+    Returns:
+        Connection string accepted by libpq
+    """
+    parts = urlsplit(database_url)
+    query = [
+        (key, value) for key, value in parse_qsl(parts.query)
+        if key not in _PRISMA_URL_PARAMS
+    ]
+    return urlunsplit(parts._replace(query=urlencode(query)))
+
+
+def get_connection_pool(database_url: str) -> ConnectionPool:
+    """
+    Get the process-wide connection pool, opening it on first use.
+
+    Args:
+        database_url: libpq connection string
+
+    Returns:
+        Pool of up to PG_POOL_SIZE connections
+    """
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            settings = get_settings()
+            _pool = ConnectionPool(
+                database_url,
+                min_size=1,
+                max_size=settings.pg_pool_size,
+                # Prepared statements are disabled for PgBouncer
+                kwargs={"prepare_threshold": None},
+                timeout=settings.db_timeout,
+                open=True
+            )
+        return _pool
+
+
+def close_connection_pool():
+    """Close the connection pool's connections, if it was opened."""
+    global _pool
+    with _pool_lock:
+        pool, _pool = _pool, None
+    if pool is not None:
+        pool.close()
+
+
+def _copy_value(value: Any) -> Any:
+    """Adapt a record value for COPY; dicts and lists go to Json columns."""
+    if isinstance(value, (dict, list)):
+        return Jsonb(value)
+    return value
+
+
+class PostgresDatabaseService(DatabaseService):
+    """
+    Service for database operations over a direct Postgres connection.
+
+    Paper, Question and QuestionContent rows for a paper are written in a
+    single transaction with COPY, so a failed ingest leaves nothing behind
+    and the whole transaction is the checkpoint. Images are still uploaded
+    to Supabase Storage.
+
+    Connections come from a process-wide pool. Each operation runs in a
+    worker thread with a statement timeout, and transient failures are
+    retried under the same "database" circuit breaker as the Supabase
+    backend.
+    """
+
+    def __init__(self):
+        """Initialize connection settings and the shared service state."""
+        settings = get_settings()
+        if not settings.database_url:
+            raise ValueError("DATABASE_URL must be set when DB_BACKEND=postgres")
+
+        super().__init__()
+        self.database_url = to_libpq_url(settings.database_url)
+
+    async def _run(
+        self,
+        operation: Callable[[psycopg.Connection], T],
+        idempotent: bool = True
+    ) -> T:
+        """
+        Run an operation in one transaction on a pooled connection, off the event loop.
+
+        Args:
+            operation: Takes the connection; called afresh on each attempt
+            idempotent: Whether the operation may be repeated after a failure
+
+        Returns:
+            The operation's result
+        """
+        def attempt() -> T:
+            with get_connection_pool(self.database_url).connection() as conn:
+                # Transaction-scoped, so it also holds behind PgBouncer
+                conn.execute(
+                    "SELECT set_config('statement_timeout', %s, true)",
+                    (str(int(self.timeout * 1000)),)
+                )
+                return operation(conn)
+
+        return await asyncio.to_thread(call_with_retry_sync, "database", attempt, idempotent)
+
+    async def _store_paper(
+        self,
+        paper_record: Dict[str, Any],
+        parsed_data: Dict[str, Any]
+    ) -> Dict[str, Any]:
+        """
+        Store a complete parsed paper in one COPY transaction.
+
+        Args:
+            paper_record: Record from _build_paper_record
+            parsed_data: Parsed PDF data from PDFParser
+
+        Returns:
+            Created paper record with ID
+        """
+        existing = await self._fetch_one(
+            'SELECT * FROM "Paper" WHERE id = %s', (paper_record["id"],)
+        )
+        if existing is not None and existing["ingest_status"] == "complete":
+            existing["uploaded_at"] = existing["uploaded_at"].isoformat()
+            return existing
+
+        # Images are uploaded while building rows, before the transaction opens
+        question_records, content_records = await self._build_question_rows(
+            paper_record["id"], parsed_data
+        )
+
+        # The span layer goes first so a committed paper always has one
+        await self._store_span_layer(paper_record["id"], parsed_data)
+        paper_record["ingest_status"] = "complete"
+        style_records = self._build_style_records(paper_record["id"], parsed_data["styles"])
+        await self._run(lambda conn: self._copy_paper(
+            conn, paper_record, style_records, question_records, content_records
+        ))
+        return paper_record
+
+    async def replace_questions(
+        self,
+        paper_id: str,
+        parsed_data: Dict[str, Any]
+    ) -> int:
+        """
+        Replace a paper's questions and content in one transaction.
+
+        Args:
+            paper_id: Paper UUID
+            parsed_data: Data with ``questions`` whose images are already uploaded
+
+        Returns:
+            Number of questions written
+        """
+        question_records, content_records = await self._build_question_rows(
+            paper_id, parsed_data
+        )
+        await self._run(lambda conn: self._replace_questions(
+            conn, paper_id, question_records, content_records
+        ))
+        return len(question_records)
+
+    def _replace_questions(
+        self,
+        conn: psycopg.Connection,
+        paper_id: str,
+        question_records: List[Dict[str, Any]],
+        content_records: List[Dict[str, Any]]
+    ):
+        """Delete and re-copy a paper's question rows in the connection's transaction."""
+        with conn.cursor() as cur:
+            cur.execute('DELETE FROM "Question" WHERE paper_id = %s', (paper_id,))
+            self._copy_rows(cur, "Question", QUESTION_COLUMNS, question_records)
+            self._copy_rows(cur, "QuestionContent", CONTENT_COLUMNS, content_records)
+            self._copy_rows(
+                cur, "QuestionBand", BAND_COLUMNS,
+                self._build_band_records(question_records)
+            )
+
+    async def list_paper_ids(self) -> List[str]:
+        """
+        List the IDs of all stored papers.
+
+        Returns:
+            Paper UUIDs
+        """
+        def fetch(conn: psycopg.Connection) -> List[str]:
+            return [
+                row[0] for row in
+                conn.execute('SELECT id FROM "Paper" WHERE ingest_status = %s', ("complete",))
+            ]
+
+        return await self._run(fetch)
+
+    def _copy_paper(
+        self,
+        conn: psycopg.Connection,
+        paper_record: Dict[str, Any],
+        style_records: List[Dict[str, Any]],
+        question_records: List[Dict[str, Any]],
+        content_records: List[Dict[str, Any]]
+    ):
+        """Write all rows for a paper in the connection's transaction."""
+        with conn.cursor() as cur:
+            # Concurrent ingests of the same PDF take turns, and the later one
+            # leaves the paper the earlier one completed alone
+            cur.execute(
+                "SELECT pg_advisory_xact_lock(hashtextextended(%s, 0))", (paper_record["id"],)
+            )
+            cur.execute('SELECT ingest_status FROM "Paper" WHERE id = %s', (paper_record["id"],))
+            row = cur.fetchone()
+            if row is not None and row[0] == "complete":
+                return
+            # Clears a pending row left by an interrupted ingest, with its children
+            cur.execute('DELETE FROM "Paper" WHERE id = %s', (paper_record["id"],))
+            self._copy_rows(cur, "Paper", PAPER_COLUMNS, [paper_record])
+            self._copy_rows(cur, "PaperStyle", STYLE_COLUMNS, style_records)
+            self._copy_rows(cur, "Question", QUESTION_COLUMNS, question_records)
+            self._copy_rows(cur, "QuestionContent", CONTENT_COLUMNS, content_records)
+            self._copy_rows(
+                cur, "QuestionBand", BAND_COLUMNS,
+                self._build_band_records(question_records)
+            )
+
+    def _copy_rows(
+        self,
+        cur: psycopg.Cursor,
+        table: str,
+        columns: List[str],
+        records: List[Dict[str, Any]]
+    ):
+        """
+        Stream rows into a table with COPY FROM STDIN.
+
+        Args:
+            cur: Open cursor inside the ingest transaction
+            table: Table name
+            columns: Columns to write, in order
+            records: Rows keyed by column name; missing keys become NULL
+        """
+        if not records:
+            return
+
+        statement = sql.SQL("COPY {} ({}) FROM STDIN").format(
+            sql.Identifier(table),
+            sql.SQL(", ").join(sql.Identifier(column) for column in columns)
+        )
+        with cur.copy(statement) as copy:
+            for record in records:
+                copy.write_row([_copy_value(record.get(column)) for column in columns])
+
+    async def list_papers(
+        self,
+        exam_board: Optional[str] = None,
+        year: Optional[int] = None,
+        session: Optional[str] = None,
+        paper_number: Optional[int] = None,
+        limit: int = 50,
+        cursor: Optional[str] = None
+    ) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+        """
+        List paper summaries one page at a time.
+
+        Args:
+            exam_board: Only list papers from this exam board
+            year: Only list papers from this year
+            session: Only list papers from this session
+            paper_number: Only list papers with this number
+            limit: Maximum number of papers on the page
+            cursor: Cursor returned with the previous page
+
+        Returns:
+            Tuple of (paper summaries, cursor for the next page or None)
+
+        Raises:
+            ValueError: If the cursor is malformed
+        """
+        params = self._list_papers_params(
+            exam_board, year, session, paper_number, limit, cursor
+        )
+
+        def fetch(conn: psycopg.Connection) -> List[Dict[str, Any]]:
+            with conn.cursor(row_factory=dict_row) as cur:
+                cur.execute(
+                    "SELECT * FROM list_papers("
+                    + ", ".join(f"{name} => %({name})s" for name in params)
+                    + ")",
+                    params
+                )
+                return cur.fetchall()
+
+        rows = await self._run(fetch)
+        for row in rows:
+            row["uploaded_at"] = row["uploaded_at"].isoformat()
+        return self._paginate_papers(rows, limit)
+
+    async def find_similar_questions(
+        self,
+        question_id: str,
+        threshold: float,
+        limit: int
+    ) -> List[Dict[str, Any]]:
+        """
+        Find near-duplicates of a question across the corpus.
+
+        Args:
+            question_id: Question UUID
+            threshold: Minimum estimated Jaccard similarity
+            limit: Maximum number of results
+
+        Returns:
+            Similar questions with paper metadata, most similar first
+
+        Raises:
+            ValueError: If the question does not exist
+        """
+        max_candidates = get_settings().similarity_max_candidates
+
+        def fetch(conn: psycopg.Connection) -> Optional[tuple]:
+            with conn.cursor(row_factory=dict_row) as cur:
+                cur.execute('SELECT minhash FROM "Question" WHERE id = %s', (question_id,))
+                row = cur.fetchone()
+                if row is None:
+                    return None
+                if not row["minhash"]:
+                    return row["minhash"], []
+
+                # Band lookups hit the primary key; only candidates are joined
+                cur.execute(
+                    'SELECT q.id, q.question_number, q.marks, q.paper_id, q.minhash, '
+                    'p.title AS paper_title, p.exam_board, p.year, p.session, p.paper_number '
+                    'FROM (SELECT DISTINCT question_id FROM "QuestionBand" '
+                    '      WHERE band = ANY(%s) AND question_id <> %s LIMIT %s) c '
+                    'JOIN "Question" q ON q.id = c.question_id '
+                    'JOIN "Paper" p ON p.id = q.paper_id '
+                    "WHERE p.ingest_status = 'complete'",
+                    (band_keys(row["minhash"]), question_id, max_candidates)
+                )
+                return row["minhash"], cur.fetchall()
+
+        result = await self._run(fetch)
+        if result is None:
+            raise ValueError(f"Question {question_id} not found")
+        signature, candidates = result
+        return self._rank_similar(signature, candidates, threshold, limit)
+
+    async def search_questions(
+        self,
+        query: str,
+        exam_board: Optional[str] = None,
+        year: Optional[int] = None,
+        limit: int = 20,
+        offset: int = 0
+    ) -> List[Dict[str, Any]]:
+        """
+        Full-text search over question text, ranked by relevance.
+
+        Args:
+            query: Search terms (web search syntax: quotes, OR, -exclude)
+            exam_board: Only return questions from this exam board
+            year: Only return questions from this year
+            limit: Maximum number of hits
+            offset: Number of hits to skip
+
+        Returns:
+            Ranked hits with question and paper metadata
+        """
+        def fetch(conn: psycopg.Connection) -> List[Dict[str, Any]]:
+            with conn.cursor(row_factory=dict_row) as cur:
+                cur.execute(
+                    "SELECT * FROM search_questions(%s, %s, %s, %s, %s)",
+                    (query, exam_board, year, limit, offset)
+                )
+                return cur.fetchall()
+
+        return await self._run(fetch)
+
+    async def collect_abandoned_ingests(self, older_than: timedelta) -> List[str]:
+        """
+        Delete papers whose ingest stopped making progress.
+
+        Args:
+            older_than: Minimum time since the ingest last checkpointed
+
+        Returns:
+            IDs of the deleted papers
+        """
+        cutoff = datetime.utcnow() - older_than
+
+        def delete(conn: psycopg.Connection) -> List[Dict[str, Any]]:
+            with conn.cursor(row_factory=dict_row) as cur:
+                cur.execute(
+                    'DELETE FROM "Paper" WHERE ingest_status = %s AND ingest_updated_at < %s '
+                    'RETURNING id, pdf_hash',
+                    ("pending", cutoff)
+                )
+                return cur.fetchall()
+
+        # Not repeated: a retry after a lost commit would miss the removed files
+        removed = await self._run(delete, idempotent=False)
+        for paper in removed:
+            await self._remove_paper_files(paper["id"], paper["pdf_hash"])
+        return [paper["id"] for paper in removed]
+
+    async def get_paper_id_by_pdf_hash(self, pdf_hash: str) -> Optional[str]:
+        """
+        Find any paper stored from the given PDF.
+
+        Args:
+            pdf_hash: SHA-256 hex digest of the PDF
+
+        Returns:
+            A paper UUID, or None if no paper uses the PDF
+        """
+        row = await self._fetch_one(
+            'SELECT id FROM "Paper" WHERE pdf_hash = %s LIMIT 1', (pdf_hash,)
+        )
+        return row["id"] if row else None
+
+    async def get_paper_pdf_hash(self, paper_id: str) -> Optional[str]:
+        """
+        Look up the content hash of a paper's stored source PDF.
+
+        Args:
+            paper_id: Paper UUID
+
+        Returns:
+            SHA-256 hex digest, or None if the PDF was not kept
+        """
+        row = await self._fetch_one(
+            'SELECT pdf_hash FROM "Paper" WHERE id = %s', (paper_id,)
+        )
+        if row is None:
+            raise ValueError(f"Paper {paper_id} not found")
+        return row["pdf_hash"]
+
+    async def _fetch_one(self, query: str, params: tuple) -> Optional[Dict[str, Any]]:
+        """Run a query and return its first row as a dict."""
+        def fetch(conn: psycopg.Connection) -> Optional[Dict[str, Any]]:
+            with conn.cursor(row_factory=dict_row) as cur:
+                cur.execute(query, params)
+                return cur.fetchone()
+
+        return await self._run(fetch)
+
+    async def get_paper(self, paper_id: str, expand_styles: bool = False) -> Dict[str, Any]:
+        """
+        Retrieve a paper with all questions and content.
+
+        Text content references the paper's ``styles`` by ``style_id``.
+
+        Args:
+            paper_id: Paper UUID
+            expand_styles: Also copy each style's fields onto its content
+                rows, for clients that predate the style table
+
+        Returns:
+            Complete paper data
+        """
+        result = await self._run(lambda conn: self._fetch_paper(conn, paper_id))
+        if result is None:
+            raise ValueError(f"Paper {paper_id} not found")
+        paper, style_rows = result
+        return self._attach_styles(paper, style_rows, expand_styles)
+
+    def _fetch_paper(
+        self,
+        conn: psycopg.Connection,
+        paper_id: str
+    ) -> Optional[Tuple[Dict[str, Any], List[Dict[str, Any]]]]:
+        """Load a paper with its questions and content, and its style rows."""
+        with conn.cursor(row_factory=dict_row) as cur:
+            cur.execute('SELECT * FROM "Paper" WHERE id = %s', (paper_id,))
+            paper = cur.fetchone()
+            if paper is None:
+                return None
+            paper["uploaded_at"] = paper["uploaded_at"].isoformat()
+
+            cur.execute(
+                'SELECT * FROM "Question" WHERE paper_id = %s ORDER BY sequence_order',
+                (paper_id,)
+            )
+            questions = cur.fetchall()
+
+            cur.execute(
+                'SELECT * FROM "QuestionContent" WHERE question_id = ANY(%s) '
+                'ORDER BY question_id, sequence_order',
+                ([question["id"] for question in questions],)
+            )
+            content_by_question: Dict[str, List[Dict[str, Any]]] = {}
+            for content in cur.fetchall():
+                content_by_question.setdefault(content["question_id"], []).append(content)
+
+            cur.execute(
+                'SELECT * FROM "PaperStyle" WHERE paper_id = %s ORDER BY style_id',
+                (paper_id,)
+            )
+            style_rows = cur.fetchall()
+
+        for question in questions:
+            question["content"] = content_by_question.get(question["id"], [])
+
+        paper["questions"] = questions
+        return paper, style_rows
@@ -0,0 +1,56 @@
+"""Rebuild questions from stored span layers without re-reading PDFs."""
+import asyncio
+from typing import Dict, Any, List, Optional
+
+from app.config import get_settings
+from app.services.db_service import DatabaseService
+from app.services.parse_pool import get_parse_executor, segment_span_layer
+
+
+async def resegment_paper(db_service: DatabaseService, paper_id: str) -> int:
+    """
+    Re-segment one paper from its stored span layer.
+
+    Args:
+        db_service: Database service for the configured backend
+        paper_id: Paper UUID
+
+    Returns:
+        Number of questions written
+    """
+    layer_bytes = await db_service.storage.download_span_layer(paper_id)
+    questions = await get_parse_executor().run(
+        segment_span_layer, layer_bytes, client="resegment"
+    )
+    return await db_service.replace_questions(paper_id, {"questions": questions})
+
+
+async def resegment_papers(
+    db_service: DatabaseService,
+    paper_ids: Optional[List[str]] = None
+) -> List[Dict[str, Any]]:
+    """
+    Re-segment many papers in parallel, reporting each one's outcome.
+
+    Args:
+        db_service: Database service for the configured backend
+        paper_ids: Papers to process; all stored papers if None
+
+    Returns:
+        One result per paper with status, question count or error
+    """
+    if paper_ids is None:
+        paper_ids = await db_service.list_paper_ids()
+
+    # One paper per worker at a time keeps room in the parse queue for uploads
+    slots = asyncio.Semaphore(get_settings().parse_workers)
+
+    async def run(paper_id: str) -> Dict[str, Any]:
+        async with slots:
+            try:
+                count = await resegment_paper(db_service, paper_id)
+            except Exception as e:
+                return {"paper_id": paper_id, "status": "error", "error": str(e)}
+        return {"paper_id": paper_id, "status": "success", "questions_count": count}
+
+    return await asyncio.gather(*[run(paper_id) for paper_id in paper_ids])
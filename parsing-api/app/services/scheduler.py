@@ -0,0 +1,174 @@
+"""Size-aware scheduling of parse slots."""
+import asyncio
+import time
+from collections import deque
+from typing import Deque, Dict, List, Optional
+
+import fitz  # PyMuPDF
+
+
+# Bytes that cost about as much to parse as one page; image-heavy PDFs
+# are slow for their page count
+BYTES_PER_PAGE = 256 * 1024
+
+# Recent waits kept for the wait time metrics
+_WAIT_SAMPLES = 256
+
+
+def estimate_parse_cost(pdf_bytes: bytes) -> float:
+    """
+    Estimate the relative cost of parsing a PDF.
+
+    Opening a document only reads its cross-reference table, so the page
+    count is cheap to get. Unreadable PDFs are costed by size alone.
+
+    Args:
+        pdf_bytes: PDF file as bytes
+
+    Returns:
+        Cost in page-equivalents
+    """
+    try:
+        with fitz.open(stream=pdf_bytes, filetype="pdf") as doc:
+            pages = len(doc)
+    except Exception:
+        pages = 0
+    return max(1.0, pages + len(pdf_bytes) / BYTES_PER_PAGE)
+
+
+class _Job:
+    """A request waiting for a slot."""
+
+    __slots__ = ("cost", "client", "enqueued", "future", "granted")
+
+    def __init__(self, cost: float, client: str, future: "asyncio.Future[None]"):
+        self.cost = cost
+        self.client = client
+        self.enqueued = time.monotonic()
+        self.future = future
+        self.granted = False
+
+
+class SlotScheduler:
+    """
+    Hands out a fixed number of slots, cheapest job first.
+
+    When a slot frees up, every waiting job is scored as::
+
+        cost * (1 + running jobs of its client) - aging_rate * seconds waited
+
+    and the lowest score runs next. Small papers overtake large ones
+    (shortest job first), a large paper's score falls the longer it waits
+    so it cannot starve (aging), and a client with work already running
+    pays more per job so one client cannot monopolize the pool with many
+    small jobs (fairness). The queue is bounded by the caller, so scanning
+    it on each release is cheap.
+    """
+
+    def __init__(self, slots: int, aging_rate: float):
+        """
+        Initialize the scheduler.
+
+        Args:
+            slots: Number of jobs that may run at once
+            aging_rate: Cost units a job's score drops per second of waiting
+        """
+        self.slots = slots
+        self.aging_rate = aging_rate
+        self.running = 0
+        self._pending: List[_Job] = []
+        self._running_by_client: Dict[str, int] = {}
+        self._waits: Deque[float] = deque(maxlen=_WAIT_SAMPLES)
+        self.max_wait = 0.0
+
+    @property
+    def waiting(self) -> int:
+        """Number of jobs waiting for a slot."""
+        return len(self._pending)
+
+    async def acquire(self, cost: float, client: str, timeout: float):
+        """
+        Wait for a slot.
+
+        Args:
+            cost: Estimated cost of the job
+            client: Identity of the requesting client
+            timeout: Seconds to wait before giving up
+
+        Raises:
+            asyncio.TimeoutError: If no slot was granted in time
+        """
+        job = _Job(cost, client, asyncio.get_running_loop().create_future())
+        self._pending.append(job)
+        self._dispatch()
+        try:
+            await asyncio.wait_for(asyncio.shield(job.future), timeout=timeout)
+        except BaseException:
+            if job.granted:
+                # Granted just as the wait ended; hand the slot back
+                self.release(client)
+            else:
+                self._pending.remove(job)
+            raise
+
+    def release(self, client: str):
+        """
+        Free a slot and start the next job.
+
+        Args:
+            client: Client the finished job belonged to
+        """
+        self.running -= 1
+        remaining = self._running_by_client[client] - 1
+        if remaining:
+            self._running_by_client[client] = remaining
+        else:
+            del self._running_by_client[client]
+        self._dispatch()
+
+    def _dispatch(self):
+        """Grant free slots to the best-scoring waiting jobs."""
+        while self.running < self.slots and self._pending:
+            now = time.monotonic()
+            job = min(self._pending, key=lambda j: self._score(j, now))
+            self._pending.remove(job)
+
+            waited = now - job.enqueued
+            self._waits.append(waited)
+            self.max_wait = max(self.max_wait, waited)
+
+            self.running += 1
+            self._running_by_client[job.client] = self._running_by_client.get(job.client, 0) + 1
+            job.granted = True
+            job.future.set_result(None)
+
+    def _score(self, job: _Job, now: float) -> float:
+        """Scheduling priority of a waiting job; lower runs first."""
+        running = self._running_by_client.get(job.client, 0)
+        return job.cost * (1 + running) - self.aging_rate * (now - job.enqueued)
+
+    def stats(self) -> Dict[str, float]:
+        """
+        Get queue depth and wait time metrics.
+
+        Wait times are seconds from request to slot over recent grants.
+        """
+        now = time.monotonic()
+        waits = sorted(self._waits)
+        return {
+            "queued_cost": round(sum(job.cost for job in self._pending), 1),
+            "queued_clients": len({job.client for job in self._pending}),
+            "oldest_wait": round(
+                max((now - job.enqueued for job in self._pending), default=0.0), 3
+            ),
+            "wait_p50": round(_percentile(waits, 0.5), 3),
+            "wait_p95": round(_percentile(waits, 0.95), 3),
+            "wait_max": round(self.max_wait, 3)
+        }
+
+
+def _percentile(values: List[float], fraction: float) -> float:
+    """Nearest-rank percentile of sorted values (0 when empty)."""
+    if not values:
+        return 0.0
+    return values[min(len(values) - 1, int(fraction * len(values)))]
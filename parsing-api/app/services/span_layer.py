@@ -0,0 +1,109 @@
+"""Compact persisted form of the parser's span and image layer."""
+import gzip
+import json
+from typing import Dict, Any, List
+
+from app.services.styles import apply_style, strip_style
+
+
+LAYER_VERSION = 1
+
+# Keys holding raw or transcoded image data, which live in storage instead
+_BINARY_KEYS = {"image_bytes", "variants"}
+
+
+def encode_layer(parsed_data: Dict[str, Any]) -> bytes:
+    """
+    Encode the page layer of a parsed paper for storage.
+
+    Text spans are stored column-wise (one list per field) so field names
+    are written once per page, and the whole document is gzip-compressed.
+    Span formatting is stored once in the paper's style table, with each
+    span keeping only its ``style_id``.
+    Image and diagram elements keep their uploaded URLs but drop their
+    bytes.
+
+    Args:
+        parsed_data: Parsed PDF data whose images have been uploaded
+
+    Returns:
+        Compressed layer bytes
+    """
+    pages = []
+    for page in parsed_data["pages"]:
+        pages.append({
+            "page_number": page["page_number"],
+            "page_type": page["page_type"],
+            "width": page["width"],
+            "height": page["height"],
+            "text": _to_columns([strip_style(e) for e in page["text_elements"]]),
+            "images": [_strip_binary(e) for e in page["image_elements"]],
+            "diagrams": [_strip_binary(e) for e in page.get("diagram_elements", [])],
+            "tables": page.get("table_elements", [])
+        })
+
+    document = {
+        "version": LAYER_VERSION,
+        "metadata": parsed_data.get("metadata", {}),
+        "styles": parsed_data["styles"],
+        "pages": pages
+    }
+    return gzip.compress(json.dumps(document, separators=(",", ":")).encode("utf-8"))
+
+
+def decode_layer(data: bytes) -> Dict[str, Any]:
+    """
+    Decode a stored layer back into parser page dictionaries.
+
+    Args:
+        data: Bytes produced by encode_layer
+
+    Returns:
+        Dictionary with ``metadata``, ``styles`` and ``pages`` shaped like
+        PDFParser output
+    """
+    document = json.loads(gzip.decompress(data))
+    if document.get("version") != LAYER_VERSION:
+        raise ValueError(f"Unsupported span layer version: {document.get('version')}")
+
+    # Layers stored before styles were interned keep formatting on each span
+    styles = document.get("styles", [])
+    pages = []
+    for page in document["pages"]:
+        pages.append({
+            "page_number": page["page_number"],
+            # Layers stored before page classification treat every page alike
+            "page_type": page.get("page_type", "question"),
+            "width": page["width"],
+            "height": page["height"],
+            "text_elements": [
+                apply_style(element, styles) for element in _from_columns(page["text"])
+            ],
+            "image_elements": page["images"],
+            "diagram_elements": page["diagrams"],
+            # Layers stored before table extraction have none
+            "table_elements": page.get("tables", [])
+        })
+
+    return {"metadata": document["metadata"], "styles": styles, "pages": pages}
+
+
+def _to_columns(elements: List[Dict[str, Any]]) -> Dict[str, List[Any]]:
+    """Turn a list of dicts into a dict of equal-length lists."""
+    fields: Dict[str, None] = {}
+    for element in elements:
+        fields.update(dict.fromkeys(element))
+    return {field: [element.get(field) for element in elements] for field in fields}
+
+
+def _from_columns(columns: Dict[str, List[Any]]) -> List[Dict[str, Any]]:
+    """Inverse of _to_columns."""
+    if not columns:
+        return []
+    fields = list(columns)
+    return [dict(zip(fields, values)) for values in zip(*columns.values())]
+
+
+def _strip_binary(element: Dict[str, Any]) -> Dict[str, Any]:
+    """Copy an image element without its byte payloads."""
+    return {key: value for key, value in element.items() if key not in _BINARY_KEYS}
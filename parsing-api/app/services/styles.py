@@ -0,0 +1,81 @@
+"""Per-paper interning of text styles."""
+from typing import Dict, Any, List, Optional, Tuple
+
+
+# Formatting fields shared by every span of the same style
+STYLE_FIELDS = ("font_family", "font_size", "is_bold", "is_italic", "color")
+
+
+class StyleTable:
+    """
+    Assigns a small integer ID to each distinct text style in a paper.
+
+    A paper typically uses only a handful of styles, so spans and content
+    rows carry a ``style_id`` and the formatting is stored once here.
+    """
+
+    def __init__(self):
+        """Initialize an empty table."""
+        self._ids: Dict[Tuple[Any, ...], int] = {}
+        self._styles: List[Dict[str, Any]] = []
+
+    def intern(
+        self,
+        font_family: str,
+        font_size: float,
+        is_bold: bool,
+        is_italic: bool,
+        color: int
+    ) -> int:
+        """
+        Look up a style, adding it if it is new.
+
+        Args:
+            font_family: Font name
+            font_size: Font size in points
+            is_bold: Bold text
+            is_italic: Italic text
+            color: sRGB color as an integer
+
+        Returns:
+            Style ID, in order of first use
+        """
+        key = (font_family, font_size, is_bold, is_italic, color)
+        style_id = self._ids.get(key)
+        if style_id is None:
+            style_id = len(self._styles)
+            self._ids[key] = style_id
+            self._styles.append(dict(zip(STYLE_FIELDS, key)))
+        return style_id
+
+    def to_list(self) -> List[Dict[str, Any]]:
+        """Styles indexed by style ID."""
+        return [dict(style) for style in self._styles]
+
+
+def strip_style(element: Dict[str, Any]) -> Dict[str, Any]:
+    """Copy a span without the fields its ``style_id`` stands for."""
+    return {key: value for key, value in element.items() if key not in STYLE_FIELDS}
+
+
+def apply_style(
+    element: Dict[str, Any],
+    styles: List[Dict[str, Any]],
+    style_id: Optional[int] = None
+) -> Dict[str, Any]:
+    """
+    Fill in a span's or content row's formatting from the style table.
+
+    Args:
+        element: Dict with a ``style_id`` (ignored when it is None)
+        styles: Style table from StyleTable.to_list, indexed by style ID
+        style_id: Style to apply instead of ``element["style_id"]``
+
+    Returns:
+        The same dict, updated in place
+    """
+    if style_id is None:
+        style_id = element.get("style_id")
+    if style_id is not None:
+        element.update(styles[style_id])
+    return element
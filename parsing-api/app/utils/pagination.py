@@ -0,0 +1,55 @@
+"""Opaque cursors for keyset pagination."""
+import base64
+import json
+from typing import Any, List, Sequence
+
+# Cursor values are bound to SQL int parameters
+_INT_MIN, _INT_MAX = -2**31, 2**31 - 1
+
+
+def encode_cursor(values: List[Any]) -> str:
+    """
+    Encode the sort key of the last row on a page as an opaque cursor.
+
+    Args:
+        values: Sort column values, in sort order
+
+    Returns:
+        URL-safe cursor string
+    """
+    payload = json.dumps(values, separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(payload).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str, types: Sequence[type]) -> List[Any]:
+    """
+    Decode a cursor produced by encode_cursor.
+
+    Args:
+        cursor: Cursor string from a previous page
+        types: Type of each sort column (str or int), in sort order
+
+    Returns:
+        Sort column values
+
+    Raises:
+        ValueError: If the cursor is malformed
+    """
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+    except (ValueError, UnicodeError):
+        raise ValueError("Invalid cursor")
+
+    if not isinstance(values, list) or len(values) != len(types):
+        raise ValueError("Invalid cursor")
+    for value, expected in zip(values, types):
+        # bool is an int subclass but never a sort key
+        if type(value) is not expected:
+            raise ValueError("Invalid cursor")
+        if expected is int and not _INT_MIN <= value <= _INT_MAX:
+            raise ValueError("Invalid cursor")
+        # PostgreSQL text cannot hold NUL
+        if expected is str and "\x00" in value:
+            raise ValueError("Invalid cursor")
+    return values
@@ -0,0 +1,120 @@
+"""Per-stage peak memory measurement for the parsing pipeline."""
+import contextlib
+import sys
+import tracemalloc
+from contextvars import ContextVar
+from typing import Dict, Any, Iterator, List, Optional
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+
+class MemoryProfile:
+    """
+    Peak memory of each pipeline stage, aggregated over calls.
+
+    ``peak_bytes`` is the largest Python heap growth (tracemalloc) seen
+    during any one call of a stage. ``rss_growth_bytes`` is how far the
+    process's peak RSS rose during the stage, which also covers native
+    allocations such as MuPDF's that tracemalloc cannot see; it only moves
+    when the process reaches a new high-water mark.
+    """
+
+    def __init__(self):
+        """Initialize an empty profile."""
+        self.stages: Dict[str, Dict[str, Any]] = {}
+        # Highest peak seen inside each open stage's children
+        self._open: List[int] = []
+
+    def record(self, name: str, peak_bytes: int, rss_growth_bytes: int, calls: int = 1):
+        """Add a measurement for a stage."""
+        stage = self.stages.setdefault(
+            name, {"stage": name, "calls": 0, "peak_bytes": 0, "rss_growth_bytes": 0}
+        )
+        stage["calls"] += calls
+        stage["peak_bytes"] = max(stage["peak_bytes"], peak_bytes)
+        stage["rss_growth_bytes"] = max(stage["rss_growth_bytes"], rss_growth_bytes)
+
+    def merge(self, stages: List[Dict[str, Any]]):
+        """Add stages measured elsewhere, e.g. in a worker process."""
+        for stage in stages:
+            self.record(stage["stage"], stage["peak_bytes"], stage["rss_growth_bytes"], stage["calls"])
+
+    def to_list(self) -> List[Dict[str, Any]]:
+        """Stages in the order they were first measured."""
+        return [dict(stage) for stage in self.stages.values()]
+
+
+_current: ContextVar[Optional[MemoryProfile]] = ContextVar("memory_profile", default=None)
+
+
+def current_profile() -> Optional[MemoryProfile]:
+    """The profile being recorded in this context, if any."""
+    return _current.get()
+
+
+@contextlib.contextmanager
+def memory_profile() -> Iterator[MemoryProfile]:
+    """
+    Record profile_stage measurements made inside this block.
+
+    Starts tracemalloc if needed, which slows allocation-heavy code
+    noticeably. The heap is process-wide, so stages running concurrently
+    in other requests or threads are counted too.
+
+    Yields:
+        Profile that collects the stages
+    """
+    started = not tracemalloc.is_tracing()
+    if started:
+        tracemalloc.start()
+    profile = MemoryProfile()
+    token = _current.set(profile)
+    try:
+        yield profile
+    finally:
+        _current.reset(token)
+        if started:
+            tracemalloc.stop()
+
+
+@contextlib.contextmanager
+def profile_stage(name: str) -> Iterator[None]:
+    """
+    Measure the peak memory of a block as stage ``name``.
+
+    Does nothing unless a memory_profile is active. Stages may nest; an
+    outer stage's peak includes its inner stages.
+
+    Args:
+        name: Stage name, e.g. "extract_images"
+    """
+    profile = _current.get()
+    if profile is None:
+        yield
+        return
+
+    start_bytes, outer_peak = tracemalloc.get_traced_memory()
+    tracemalloc.reset_peak()
+    start_rss = _max_rss()
+    profile._open.append(0)
+    try:
+        yield
+    finally:
+        _, peak = tracemalloc.get_traced_memory()
+        peak = max(peak, profile._open.pop())
+        profile.record(name, peak - start_bytes, _max_rss() - start_rss)
+        if profile._open:
+            # reset_peak discarded the enclosing stage's peak so far
+            profile._open[-1] = max(profile._open[-1], peak, outer_peak)
+
+
+def _max_rss() -> int:
+    """Peak resident set size of this process in bytes (0 if unknown)."""
+    if resource is None:
+        return 0
+    max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS bytes
+    return max_rss if sys.platform == "darwin" else max_rss * 1024
@@ -0,0 +1,292 @@
+"""Timeouts, retries and circuit breakers for database and storage calls."""
+import asyncio
+import logging
+import random
+import threading
+import time
+from typing import Any, Awaitable, Callable, Dict, TypeVar
+
+import httpx
+from supabase import PostgrestAPIError, StorageException
+from app.config import get_settings
+
+try:
+    import psycopg
+except ImportError:  # Only needed for DB_BACKEND=postgres
+    psycopg = None
+
+
+T = TypeVar("T")
+
+logger = logging.getLogger(__name__)
+
+# Postgres error classes worth retrying: connection exceptions, insufficient
+# resources, operator intervention, statement timeouts, serialization
+# failures and deadlocks
+_TRANSIENT_SQLSTATE_PREFIXES = ("08", "53", "57P", "57014", "40001", "40P01")
+# PostgREST codes for losing its database connection or schema cache
+_TRANSIENT_POSTGREST_CODES = {"PGRST000", "PGRST001", "PGRST002"}
+
+
+class CircuitOpenError(Exception):
+    """Raised without calling the backend while its circuit breaker is open."""
+
+    def __init__(self, message: str, retry_after: int):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+def is_transient(error: BaseException) -> bool:
+    """
+    Whether a failed call may succeed if repeated.
+
+    Timeouts, network errors, 5xx and 429 responses and Postgres errors
+    from a struggling server are transient. Client errors such as a bad
+    query or a constraint violation are not, and do not count against the
+    circuit breaker either, since the backend answered them.
+    """
+    if isinstance(error, (asyncio.TimeoutError, httpx.TransportError, ConnectionError)):
+        return True
+    if psycopg is not None and isinstance(error, psycopg.Error):
+        if error.sqlstate is None:
+            # Lost or refused connection, or no pooled connection in time
+            return isinstance(error, psycopg.OperationalError)
+        return error.sqlstate.startswith(_TRANSIENT_SQLSTATE_PREFIXES)
+    if isinstance(error, PostgrestAPIError):
+        code = error.code
+        if isinstance(code, int):
+            # Non-JSON error body; the code is the HTTP status
+            return code >= 500 or code == 429
+        return bool(code) and (
+            code in _TRANSIENT_POSTGREST_CODES or code.startswith(_TRANSIENT_SQLSTATE_PREFIXES)
+        )
+    if isinstance(error, StorageException):
+        detail = error.args[0] if error.args else None
+        status = detail.get("statusCode") if isinstance(detail, dict) else None
+        try:
+            status = int(status)
+        except (TypeError, ValueError):
+            return False
+        return status >= 500 or status == 429
+    return False
+
+
+class CircuitBreaker:
+    """
+    Fails fast while a backend keeps failing.
+
+    Closed, calls go through. After ``failure_threshold`` consecutive
+    transient failures the breaker opens and calls are rejected with
+    CircuitOpenError for ``reset_timeout`` seconds, so requests do not pile
+    up behind a backend that is down. It then lets one trial call through
+    (half-open): success closes it, failure opens it again.
+
+    Used from the event loop and from worker threads, so state changes
+    are locked.
+    """
+
+    def __init__(self, name: str, failure_threshold: int, reset_timeout: float):
+        """
+        Initialize a closed breaker.
+
+        Args:
+            name: Backend name, used in errors and metrics
+            failure_threshold: Consecutive failures that open the breaker
+            reset_timeout: Seconds to stay open before a trial call
+        """
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = "closed"
+        self.consecutive_failures = 0
+        self.failures = 0
+        self.rejected = 0
+        self.times_opened = 0
+        self._opened_at = 0.0
+        self._probing = False
+        self._lock = threading.Lock()
+
+    def before_call(self):
+        """
+        Admit a call or reject it.
+
+        Raises:
+            CircuitOpenError: If the breaker is open, or half-open with a
+                trial call already in flight
+        """
+        with self._lock:
+            if self.state == "closed":
+                return
+            remaining = self._opened_at + self.reset_timeout - time.monotonic()
+            if self.state == "open" and remaining <= 0:
+                self.state = "half_open"
+            if self.state == "half_open" and not self._probing:
+                self._probing = True
+                return
+            self.rejected += 1
+        raise CircuitOpenError(
+            f"{self.name} is unavailable after repeated failures",
+            retry_after=max(1, int(remaining + 0.999))
+        )
+
+    def record_success(self):
+        """Close the breaker after a call the backend answered."""
+        with self._lock:
+            self.state = "closed"
+            self.consecutive_failures = 0
+            self._probing = False
+
+    def record_failure(self):
+        """Count a transient failure, opening the breaker at the threshold."""
+        with self._lock:
+            self.failures += 1
+            self.consecutive_failures += 1
+            if self.state == "half_open" or self.consecutive_failures >= self.failure_threshold:
+                if self.state != "open":
+                    self.times_opened += 1
+                self.state = "open"
+                self._opened_at = time.monotonic()
+            self._probing = False
+
+    def abandon_call(self):
+        """Forget an admitted call that was cancelled before it finished."""
+        with self._lock:
+            self._probing = False
+
+    def stats(self) -> Dict[str, Any]:
+        """Get breaker state and counters."""
+        with self._lock:
+            retry_in = 0.0
+            if self.state == "open":
+                retry_in = max(0.0, self._opened_at + self.reset_timeout - time.monotonic())
+            return {
+                "state": self.state,
+                "consecutive_failures": self.consecutive_failures,
+                "failures": self.failures,
+                "rejected": self.rejected,
+                "times_opened": self.times_opened,
+                "retry_in": round(retry_in, 1)
+            }
+
+
+_breakers: Dict[str, CircuitBreaker] = {}
+_breakers_lock = threading.Lock()
+
+
+def get_breaker(name: str) -> CircuitBreaker:
+    """Get the process-wide circuit breaker for a backend, creating it on first use."""
+    with _breakers_lock:
+        breaker = _breakers.get(name)
+        if breaker is None:
+            settings = get_settings()
+            breaker = _breakers[name] = CircuitBreaker(
+                name,
+                failure_threshold=settings.circuit_failure_threshold,
+                reset_timeout=settings.circuit_reset_seconds
+            )
+        return breaker
+
+
+def breaker_stats() -> Dict[str, Dict[str, Any]]:
+    """Get the state of every circuit breaker used so far in this process."""
+    with _breakers_lock:
+        breakers = list(_breakers.values())
+    return {breaker.name: breaker.stats() for breaker in breakers}
+
+
+def _backoff(attempt: int) -> float:
+    """Full-jitter exponential delay before retry number ``attempt`` (from 0)."""
+    settings = get_settings()
+    ceiling = min(settings.retry_max_delay, settings.retry_base_delay * 2 ** attempt)
+    return random.uniform(0, ceiling)
+
+
+async def call_with_retry(
+    backend: str,
+    operation: Callable[[], Awaitable[T]],
+    timeout: float,
+    idempotent: bool = True
+) -> T:
+    """
+    Call a backend with a timeout, retrying transient failures.
+
+    Each attempt runs under the backend's circuit breaker. Only idempotent
+    operations are retried, since a timed-out attempt may still have taken
+    effect; others get one attempt.
+
+    Args:
+        backend: Circuit breaker name, e.g. "database" or "storage"
+        operation: Makes a fresh call each time it is invoked
+        timeout: Seconds per attempt
+        idempotent: Whether repeating the call is safe
+
+    Returns:
+        The operation's result
+
+    Raises:
+        CircuitOpenError: If the breaker rejects an attempt
+        Exception: The last failure, once retries are exhausted or for
+            errors that are not transient
+    """
+    settings = get_settings()
+    breaker = get_breaker(backend)
+    attempts = settings.retry_attempts if idempotent else 1
+
+    for attempt in range(attempts):
+        breaker.before_call()
+        try:
+            result = await asyncio.wait_for(operation(), timeout=timeout)
+        except asyncio.CancelledError:
+            breaker.abandon_call()
+            raise
+        except Exception as e:
+            if not is_transient(e):
+                breaker.record_success()
+                raise
+            breaker.record_failure()
+            if attempt == attempts - 1:
+                raise
+            logger.warning("%s call failed (%s: %s), retrying", backend, type(e).__name__, e)
+            await asyncio.sleep(_backoff(attempt))
+        else:
+            breaker.record_success()
+            return result
+
+
+def call_with_retry_sync(
+    backend: str,
+    operation: Callable[[], T],
+    idempotent: bool = True
+) -> T:
+    """
+    Blocking form of call_with_retry, for worker threads.
+
+    There is no per-attempt timeout; the client's own HTTP timeout applies.
+
+    Args:
+        backend: Circuit breaker name
+        operation: Makes a fresh call each time it is invoked
+        idempotent: Whether repeating the call is safe
+
+    Returns:
+        The operation's result
+    """
+    attempts = get_settings().retry_attempts if idempotent else 1
+    breaker = get_breaker(backend)
+
+    for attempt in range(attempts):
+        breaker.before_call()
+        try:
+            result = operation()
+        except Exception as e:
+            if not is_transient(e):
+                breaker.record_success()
+                raise
+            breaker.record_failure()
+            if attempt == attempts - 1:
+                raise
+            logger.warning("%s call failed (%s: %s), retrying", backend, type(e).__name__, e)
+            time.sleep(_backoff(attempt))
+        else:
+            breaker.record_success()
+            return result
@@ -1,62 +1,302 @@
 """Supabase storage utilities for uploading images."""
+import hashlib
+import threading
 import uuid
-from typing import Dict, Any
-from supabase import create_client, Client
+from collections import OrderedDict
+from typing import Dict, Any, Awaitable, Callable, Optional, Tuple, TypeVar
+from supabase import create_client, Client, StorageException
 from app.config import get_settings
+from app.utils.resilience import call_with_retry, call_with_retry_sync
+from app.utils.supabase_client import get_async_client
+
+
+# Folders for content-addressed images shared across papers and source PDFs
+SHARED_PREFIX = "shared"
+PDF_PREFIX = "pdfs"
+
+# Folder for persisted span layers used by re-segmentation
+LAYER_PREFIX = "layers"
+
+# Shared paths already known to exist, most recently used last
+_known_shared: "OrderedDict[str, None]" = OrderedDict()
+_known_shared_lock = threading.Lock()
+_KNOWN_SHARED_LIMIT = 10000
+
+T = TypeVar("T")
 
 
 class StorageService:
-    """Service for managing file uploads to Supabase Storage."""
+    """
+    Service for managing file uploads to Supabase Storage.
+    
+    Async methods go through the shared async client and do not block the
+    event loop. The ``put_*`` methods and ensure_bucket_exists are blocking,
+    for worker threads and processes that have no event loop. Calls are
+    retried on transient failures under the "storage" circuit breaker.
+    """
     
     def __init__(self):
-        """Initialize Supabase client."""
+        """Initialize storage settings; clients are created on first use."""
         settings = get_settings()
-        self.client: Client = create_client(
-            settings.supabase_url,
-            settings.supabase_service_key  # Use service key for admin access
-        )
         self.bucket = settings.storage_bucket
+        self.timeout = settings.storage_timeout
+        self._client: Optional[Client] = None
+    
+    @property
+    def client(self) -> Client:
+        """Blocking Supabase client for the ``put_*`` methods."""
+        if self._client is None:
+            settings = get_settings()
+            self._client = create_client(
+                settings.supabase_url,
+                settings.supabase_service_key  # Use service key for admin access
+            )
+        return self._client
     
-    async def upload_image(
-        self, 
-        image_bytes: bytes, 
+    async def _bucket(self):
+        """Async API for the storage bucket."""
+        return (await get_async_client()).storage.from_(self.bucket)
+    
+    async def _call(
+        self,
+        operation: Callable[[Any], Awaitable[T]],
+        idempotent: bool = True
+    ) -> T:
+        """
+        Run an operation on the bucket with a timeout, retries and the circuit breaker.
+        
+        Args:
+            operation: Takes the bucket API and makes a fresh call each time
+            idempotent: Whether the operation may be repeated after a timeout
+            
+        Returns:
+            The operation's result
+        """
+        bucket = await self._bucket()
+        return await call_with_retry(
+            "storage", lambda: operation(bucket), timeout=self.timeout, idempotent=idempotent
+        )
+    
+    async def upload_shared_image(
+        self,
+        image_bytes: bytes,
         format: str,
-        paper_id: str,
-        question_num: str,
-        img_index: int
+        content_hash: str,
+        variant: Optional[str] = None
     ) -> str:
         """
-        Upload an image to Supabase Storage.
+        Upload an image under a content-addressed path shared across papers.
+        
+        Identical images (e.g. the same diagram reused in several papers)
+        map to the same path and are only uploaded once.
         
         Args:
             image_bytes: Image data as bytes
-            format: Image format (jpg, png, etc.)
-            paper_id: Paper UUID for organizing
-            question_num: Question number
-            img_index: Image index within question
+            format: Image format (png, webp, etc.)
+            content_hash: SHA-256 of the source image
+            variant: Variant label for transcoded copies
             
         Returns:
-            Public URL of uploaded image
+            Public URL of the stored image
+        """
+        suffix = f"_{variant}" if variant else ""
+        return await self._upload_if_absent_async(
+            folder=SHARED_PREFIX,
+            name=f"{content_hash}{suffix}.{format}",
+            data=image_bytes,
+            content_type=f"image/{format}"
+        )
+    
+    def put_shared_image(
+        self,
+        image_bytes: bytes,
+        format: str,
+        content_hash: str,
+        variant: Optional[str] = None
+    ) -> str:
         """
-        # Generate unique filename
-        filename = f"{paper_id}/{question_num}/img_{img_index}.{format}"
+        Blocking form of upload_shared_image, for use from worker threads.
         
-        try:
-            # Upload to Supabase Storage
-            response = self.client.storage.from_(self.bucket).upload(
-                path=filename,
-                file=image_bytes,
-                file_options={"content-type": f"image/{format}"}
-            )
+        Args:
+            image_bytes: Image data as bytes
+            format: Image format (png, webp, etc.)
+            content_hash: SHA-256 of the source image
+            variant: Variant label for transcoded copies
             
-            # Get public URL
-            public_url = self.client.storage.from_(self.bucket).get_public_url(filename)
+        Returns:
+            Public URL of the stored image
+        """
+        suffix = f"_{variant}" if variant else ""
+        return self._upload_if_absent(
+            folder=SHARED_PREFIX,
+            name=f"{content_hash}{suffix}.{format}",
+            data=image_bytes,
+            content_type=f"image/{format}"
+        )
+    
+    async def upload_pdf(self, pdf_bytes: bytes) -> Tuple[str, str]:
+        """
+        Upload a source PDF under a path derived from its content hash.
+        
+        Args:
+            pdf_bytes: PDF file as bytes
             
-            return public_url
+        Returns:
+            Tuple of (SHA-256 hex digest, public URL)
+        """
+        pdf_hash = hashlib.sha256(pdf_bytes).hexdigest()
+        # Not cached: garbage collection may delete PDFs of abandoned ingests
+        url = await self._upload_if_absent_async(
+            folder=PDF_PREFIX,
+            name=f"{pdf_hash}.pdf",
+            data=pdf_bytes,
+            content_type="application/pdf",
+            cache=False
+        )
+        return pdf_hash, url
+    
+    async def download_pdf(self, pdf_hash: str) -> bytes:
+        """
+        Download a source PDF stored by upload_pdf.
+        
+        Args:
+            pdf_hash: SHA-256 hex digest of the PDF
             
-        except Exception as e:
-            print(f"Error uploading image {filename}: {e}")
-            raise
+        Returns:
+            PDF file as bytes
+        """
+        return await self._call(lambda bucket: bucket.download(f"{PDF_PREFIX}/{pdf_hash}.pdf"))
+    
+    async def delete_pdf(self, pdf_hash: str):
+        """
+        Delete a source PDF stored by upload_pdf.
+        
+        Args:
+            pdf_hash: SHA-256 hex digest of the PDF
+        """
+        await self._call(lambda bucket: bucket.remove([f"{PDF_PREFIX}/{pdf_hash}.pdf"]))
+    
+    async def upload_span_layer(self, paper_id: str, data: bytes):
+        """
+        Store (or overwrite) a paper's encoded span layer.
+        
+        Args:
+            paper_id: Paper UUID
+            data: Bytes from span_layer.encode_layer
+        """
+        await self._call(lambda bucket: bucket.upload(
+            path=f"{LAYER_PREFIX}/{paper_id}.json.gz",
+            file=data,
+            file_options={"content-type": "application/gzip", "upsert": "true"}
+        ))
+    
+    async def download_span_layer(self, paper_id: str) -> bytes:
+        """
+        Download a paper's encoded span layer.
+        
+        Args:
+            paper_id: Paper UUID
+            
+        Returns:
+            Bytes for span_layer.decode_layer
+        """
+        return await self._call(lambda bucket: bucket.download(f"{LAYER_PREFIX}/{paper_id}.json.gz"))
+    
+    async def delete_span_layer(self, paper_id: str):
+        """
+        Delete a paper's encoded span layer, if any.
+        
+        Args:
+            paper_id: Paper UUID
+        """
+        await self._call(lambda bucket: bucket.remove([f"{LAYER_PREFIX}/{paper_id}.json.gz"]))
+    
+    def _upload_if_absent(
+        self,
+        folder: str,
+        name: str,
+        data: bytes,
+        content_type: str,
+        cache: bool = True
+    ) -> str:
+        """
+        Upload a content-addressed object unless it is already stored.
+        
+        Existing objects are found with a listing before any bytes are sent.
+        Another ingest may still store the object between the listing and the
+        upload; storage rejects the second object at a path, and that
+        rejection also counts as already stored.
+        
+        Args:
+            folder: Folder within the bucket
+            name: Object name within the folder
+            data: Object contents
+            content_type: MIME type
+            cache: Remember the object exists, skipping the check next time;
+                only safe for objects that are never deleted
+            
+        Returns:
+            Public URL of the object
+        """
+        filename = f"{folder}/{name}"
+        bucket = self.client.storage.from_(self.bucket)
+        
+        def store():
+            # Checked first so a retried ingest does not send the bytes again
+            existing = bucket.list(folder, {"search": name})
+            if any(item["name"] == name for item in existing):
+                return
+            try:
+                bucket.upload(
+                    path=filename,
+                    file=data,
+                    file_options={"content-type": content_type}
+                )
+            except StorageException as e:
+                # Stored by a concurrent ingest, or by an attempt whose response was lost
+                if not _already_exists(e):
+                    raise
+        
+        if not _is_known(filename):
+            call_with_retry_sync("storage", store)
+            if cache:
+                _remember(filename)
+        
+        return bucket.get_public_url(filename)
+    
+    async def _upload_if_absent_async(
+        self,
+        folder: str,
+        name: str,
+        data: bytes,
+        content_type: str,
+        cache: bool = True
+    ) -> str:
+        """Async form of _upload_if_absent, with the same arguments."""
+        filename = f"{folder}/{name}"
+        
+        async def store(bucket):
+            # Checked first so a retried ingest does not send the bytes again
+            existing = await bucket.list(folder, {"search": name})
+            if any(item["name"] == name for item in existing):
+                return
+            try:
+                await bucket.upload(
+                    path=filename,
+                    file=data,
+                    file_options={"content-type": content_type}
+                )
+            except StorageException as e:
+                # Stored by a concurrent ingest, or by an attempt whose response was lost
+                if not _already_exists(e):
+                    raise
+        
+        if not _is_known(filename):
+            await self._call(store)
+            if cache:
+                _remember(filename)
+        
+        return await (await self._bucket()).get_public_url(filename)
     
     def ensure_bucket_exists(self) -> bool:
         """
@@ -83,3 +323,29 @@ class StorageService:
         except Exception as e:
             print(f"Error ensuring bucket exists: {e}")
             return False
+
+
+def _already_exists(error: StorageException) -> bool:
+    """Whether an upload was rejected because the path is already taken."""
+    detail = error.args[0] if error.args else None
+    if not isinstance(detail, dict):
+        return False
+    # The HTTP status may be 400 or 409; the body's error name is stable
+    return detail.get("error") == "Duplicate" or str(detail.get("statusCode")) == "409"
+
+
+def _is_known(filename: str) -> bool:
+    """Whether a shared path is known to exist, marking it recently used."""
+    with _known_shared_lock:
+        known = filename in _known_shared
+        if known:
+            _known_shared.move_to_end(filename)
+    return known
+
+
+def _remember(filename: str):
+    """Record that a shared path exists, evicting the least recently used."""
+    with _known_shared_lock:
+        _known_shared[filename] = None
+        if len(_known_shared) > _KNOWN_SHARED_LIMIT:
+            _known_shared.popitem(last=False)
@@ -0,0 +1,48 @@
+"""Shared asynchronous Supabase client for the service layer."""
+import asyncio
+from typing import Optional
+
+from supabase import AClient, acreate_client
+from app.config import get_settings
+
+
+_client: Optional[AClient] = None
+_client_loop: Optional[asyncio.AbstractEventLoop] = None
+_client_lock: Optional[asyncio.Lock] = None
+
+
+async def get_async_client() -> AClient:
+    """
+    Get the process-wide async Supabase client, creating it on first use.
+
+    Its HTTP connection pool is tied to the event loop it was created on,
+    so a new client is made if called from a different loop (e.g. a second
+    ``asyncio.run`` in a script).
+
+    Returns:
+        Client authenticated with the service key
+    """
+    global _client, _client_loop, _client_lock
+    loop = asyncio.get_running_loop()
+    if _client is not None and _client_loop is loop:
+        return _client
+
+    if _client_loop is not loop:
+        _client, _client_loop, _client_lock = None, loop, asyncio.Lock()
+    async with _client_lock:
+        if _client is None:
+            settings = get_settings()
+            _client = await acreate_client(
+                settings.supabase_url,
+                settings.supabase_service_key  # Use service key for admin access
+            )
+    return _client
+
+
+async def close_async_client():
+    """Close the shared client's connections, if one was created."""
+    global _client, _client_loop
+    client, _client, _client_loop = _client, None, None
+    if client is not None:
+        await client.postgrest.aclose()
+        await client.storage.aclose()
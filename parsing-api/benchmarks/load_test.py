@@ -0,0 +1,293 @@
+"""
+Load-test the parsing API with a mix of uploads and paper reads.
+
+Drives ``POST /api/parse/upload`` and ``GET /api/parse/papers/{id}`` from
+a pool of concurrent virtual clients for a fixed duration, then reports
+throughput, latency percentiles and error rates per endpoint, the
+server's resident memory over time, the state of its database and
+storage circuit breakers, and how busy and backed up each ingest stage was. Uploads are synthetic PDFs whose page
+counts are drawn from a weighted mix; each carries a unique marker so the
+ingest dedup does not short-circuit it. The backend is whatever the app's
+settings select (e.g. DB_BACKEND=postgres against a local database).
+
+Run from parsing-api/, either in-process through the ASGI app::
+
+    python -m benchmarks.load_test --duration 60 --concurrency 8 \\
+        --mix upload=1,read=9 --pages 8=0.8,120=0.2
+
+or over HTTP against a running server (RSS is read from /proc, so pass
+the server's PID on Linux)::
+
+    python -m benchmarks.load_test --url http://localhost:8000 --server-pid 1234
+
+RSS covers the API process only; parse workers are separate processes.
+Uses httpx, which the Supabase client already depends on.
+"""
+import argparse
+import asyncio
+import contextlib
+import json
+import random
+import statistics
+import time
+import uuid
+from typing import Dict, List, Optional, Tuple
+
+import fitz  # PyMuPDF
+import httpx
+
+
+def parse_weights(spec: str) -> List[Tuple[str, float]]:
+    """Parse ``name=weight,name=weight`` into (name, weight) pairs."""
+    pairs = []
+    for part in spec.split(","):
+        name, _, weight = part.partition("=")
+        pairs.append((name.strip(), float(weight or 1)))
+    return pairs
+
+
+def make_pdf(pages: int) -> bytes:
+    """
+    Build a synthetic past paper with ``pages`` pages of questions.
+
+    Each page holds two numbered questions with body text, and every third
+    page a small vector diagram, so parsing exercises text, segmentation
+    and diagram rasterizing.
+    """
+    doc = fitz.open()
+    question = 1
+    for page_index in range(pages):
+        page = doc.new_page()
+        page.insert_text((72, 60), "Load test paper", fontsize=8)
+        for slot in range(2):
+            top = 100 + slot * 340
+            page.insert_text((72, top), f"{question} Explain the effect of policy {question}. [6 marks]", fontsize=11)
+            for line in range(12):
+                page.insert_text(
+                    (72, top + 20 + line * 14),
+                    f"Line {line} of the extract for question {question}, page {page_index + 1}.",
+                    fontsize=10
+                )
+            question += 1
+        if page_index % 3 == 0:
+            for offset in range(4):
+                page.draw_rect(fitz.Rect(350 + offset * 10, 600, 450 + offset * 10, 700))
+    data = doc.tobytes()
+    doc.close()
+    return data
+
+
+def read_rss(pid: Optional[int]) -> Optional[int]:
+    """Resident set size of a process in bytes, from /proc (Linux only)."""
+    path = f"/proc/{pid or 'self'}/status"
+    try:
+        with open(path) as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    return None
+
+
+class Recorder:
+    """Collects request outcomes and memory samples."""
+
+    def __init__(self):
+        self.latencies: Dict[str, List[float]] = {}
+        self.errors: Dict[str, Dict[str, int]] = {}
+        self.rss: List[Tuple[float, int]] = []
+
+    def record(self, endpoint: str, seconds: float, error: Optional[str]):
+        """Record one request; ``error`` is None for a success."""
+        if error is None:
+            self.latencies.setdefault(endpoint, []).append(seconds)
+        else:
+            bucket = self.errors.setdefault(endpoint, {})
+            bucket[error] = bucket.get(error, 0) + 1
+
+    def report(self, elapsed: float):
+        """Print per-endpoint results and the RSS timeline."""
+        print(f"\n{'endpoint':<8} {'ok':>6} {'err':>5} {'req/s':>7} "
+              f"{'p50 ms':>8} {'p90 ms':>8} {'p99 ms':>8} {'max ms':>8}")
+        for endpoint in sorted(set(self.latencies) | set(self.errors)):
+            samples = sorted(self.latencies.get(endpoint, []))
+            errors = sum(self.errors.get(endpoint, {}).values())
+            total = len(samples) + errors
+            row = [percentile(samples, f) * 1000 for f in (0.5, 0.9, 0.99, 1.0)]
+            print(f"{endpoint:<8} {len(samples):>6} {errors:>5} {total / elapsed:>7.2f} "
+                  + " ".join(f"{value:>8.1f}" for value in row))
+        for endpoint, kinds in sorted(self.errors.items()):
+            total = len(self.latencies.get(endpoint, [])) + sum(kinds.values())
+            detail = ", ".join(f"{kind}: {count}" for kind, count in sorted(kinds.items()))
+            print(f"  {endpoint} error rate {sum(kinds.values()) / total:.1%} ({detail})")
+
+        if self.rss:
+            print("\nserver RSS (MiB)")
+            for at, rss in self.rss:
+                print(f"  {at:>6.1f}s {rss / 2**20:>8.1f}")
+            peak = max(rss for _, rss in self.rss)
+            print(f"  peak {peak / 2**20:.1f} MiB, "
+                  f"growth {(self.rss[-1][1] - self.rss[0][1]) / 2**20:+.1f} MiB")
+
+
+def percentile(samples: List[float], fraction: float) -> float:
+    """Nearest-rank percentile of sorted samples (0 when empty)."""
+    if not samples:
+        return 0.0
+    return samples[min(len(samples) - 1, int(fraction * len(samples)))]
+
+
+async def timed(
+    recorder: Recorder,
+    endpoint: str,
+    request
+) -> Optional[httpx.Response]:
+    """Await a request, recording its latency or failure."""
+    start = time.perf_counter()
+    try:
+        response = await request
+    except httpx.HTTPError as e:
+        recorder.record(endpoint, time.perf_counter() - start, type(e).__name__)
+        return None
+    seconds = time.perf_counter() - start
+    recorder.record(endpoint, seconds, None if response.is_success else str(response.status_code))
+    return response
+
+
+async def virtual_client(
+    client: httpx.AsyncClient,
+    recorder: Recorder,
+    deadline: float,
+    mix: List[Tuple[str, float]],
+    pages: List[Tuple[str, float]],
+    paper_ids: List[str],
+    pdf_cache: Dict[int, bytes],
+    rng: random.Random,
+    client_id: str
+):
+    """Issue requests back to back until the deadline."""
+    kinds, kind_weights = zip(*mix)
+    page_counts, page_weights = zip(*pages)
+    while time.monotonic() < deadline:
+        kind = rng.choices(kinds, kind_weights)[0]
+        # Reads need a stored paper, so the first requests are uploads
+        if kind == "read" and paper_ids:
+            paper_id = rng.choice(paper_ids)
+            await timed(recorder, "read", client.get(f"/api/parse/papers/{paper_id}"))
+            continue
+
+        page_count = int(rng.choices(page_counts, page_weights)[0])
+        marker = uuid.uuid4().hex
+        # Pages are reused across uploads; the marker page makes each PDF unique
+        template = pdf_cache.get(page_count)
+        if template is None:
+            template = pdf_cache[page_count] = make_pdf(page_count)
+        doc = fitz.open(stream=template, filetype="pdf")
+        doc.new_page().insert_text((72, 72), f"Marker {marker}", fontsize=8)
+        pdf_bytes = doc.tobytes()
+        doc.close()
+
+        metadata = {
+            "exam_board": "LOADTEST",
+            "year": 2000 + rng.randint(0, 25),
+            "session": marker[:8],
+            "paper_number": rng.randint(1, 3)
+        }
+        response = await timed(recorder, "upload", client.post(
+            "/api/parse/upload",
+            files={"file": (f"{marker}.pdf", pdf_bytes, "application/pdf")},
+            data={"metadata": json.dumps(metadata)},
+            headers={"X-Client-Id": client_id}
+        ))
+        if response is not None and response.is_success:
+            paper_ids.append(response.json()["paper_id"])
+
+
+async def sample_rss(recorder: Recorder, pid: Optional[int], start: float, deadline: float, interval: float):
+    """Record server RSS every ``interval`` seconds until the deadline."""
+    while True:
+        rss = read_rss(pid)
+        if rss is not None:
+            recorder.rss.append((time.monotonic() - start, rss))
+        if time.monotonic() >= deadline:
+            return
+        await asyncio.sleep(interval)
+
+
+async def run(args: argparse.Namespace):
+    """Run the load test and print the report."""
+    rng = random.Random(args.seed)
+    recorder = Recorder()
+    paper_ids: List[str] = list(filter(None, args.paper_ids.split(",")))
+    pdf_cache: Dict[int, bytes] = {}
+
+    async with contextlib.AsyncExitStack() as stack:
+        if args.url:
+            client = httpx.AsyncClient(base_url=args.url, timeout=args.timeout)
+            pid = args.server_pid
+        else:
+            from app.main import app
+            # Runs the app's startup and shutdown handlers around the test
+            await stack.enter_async_context(app.router.lifespan_context(app))
+            client = httpx.AsyncClient(
+                transport=httpx.ASGITransport(app=app),
+                base_url="http://loadtest",
+                timeout=args.timeout
+            )
+            pid = None  # the app runs in this process
+        await stack.enter_async_context(client)
+
+        start = time.monotonic()
+        deadline = start + args.duration
+        await asyncio.gather(
+            sample_rss(recorder, pid, start, deadline, args.rss_interval),
+            *(
+                virtual_client(
+                    client, recorder, deadline, parse_weights(args.mix),
+                    parse_weights(args.pages), paper_ids, pdf_cache,
+                    random.Random(rng.random()), f"loadtest-{index % args.clients}"
+                )
+                for index in range(args.concurrency)
+            )
+        )
+        elapsed = time.monotonic() - start
+        # Circuit breaker state shows whether the database or storage degraded;
+        # ingest stage counters show which stage held uploads up
+        health = (await client.get("/api/parse/health")).json()
+
+    print(f"duration {elapsed:.1f}s, concurrency {args.concurrency}, "
+          f"mix {args.mix}, pages {args.pages}")
+    recorder.report(elapsed)
+    uploads = recorder.latencies.get("upload", [])
+    if uploads:
+        print(f"\nupload mean {statistics.mean(uploads) * 1000:.1f} ms over {len(uploads)} papers")
+    for backend, state in health.get("backends", {}).items():
+        print(f"{backend} circuit {state['state']}: {state['failures']} failures, "
+              f"{state['rejected']} rejected, opened {state['times_opened']} times")
+    for stage, counters in health.get("ingest", {}).items():
+        print(f"ingest {stage}: {counters['processed']} batches, "
+              f"busy {counters['busy_seconds']:.1f}s, blocked {counters['blocked_seconds']:.1f}s, "
+              f"peak queue {counters['peak_queued']}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--url", default="", help="Server base URL; in-process if omitted")
+    parser.add_argument("--server-pid", type=int, default=None, help="Server PID for RSS sampling")
+    parser.add_argument("--duration", type=float, default=30.0, help="Seconds to run")
+    parser.add_argument("--concurrency", type=int, default=4, help="Concurrent virtual clients")
+    parser.add_argument("--clients", type=int, default=2,
+                        help="Distinct X-Client-Id values shared by the virtual clients")
+    parser.add_argument("--mix", default="upload=1,read=4", help="Request weights")
+    parser.add_argument("--pages", default="8=0.8,40=0.15,120=0.05",
+                        help="Page count weights for uploaded PDFs")
+    parser.add_argument("--paper-ids", default="", help="Comma-separated papers to read from the start")
+    parser.add_argument("--timeout", type=float, default=300.0, help="Per-request timeout in seconds")
+    parser.add_argument("--rss-interval", type=float, default=5.0, help="Seconds between RSS samples")
+    parser.add_argument("--seed", type=int, default=1)
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,147 @@
+"""
+Check parsing memory against per-page budgets.
+
+Parses reference PDFs with memory profiling on and fails (exit status 1)
+when any stage's peak exceeds its budget per page. Per-page stages (text,
+image, table and diagram extraction) are compared by their largest single
+call; whole-document stages (parse_pdf, segment_questions) by their peak
+divided by the page count. Without PDF arguments a synthetic reference
+paper is generated. Run from parsing-api/:
+
+    python -m benchmarks.memory_budget papers/ref-2019.pdf \\
+        --budget parse_pdf=4MiB,extract_images=16MiB
+"""
+import argparse
+import sys
+from typing import Any, Dict, List
+
+import fitz  # PyMuPDF
+
+from app.services.pdf_parser import PDFParser
+from app.utils.profiling import memory_profile
+
+
+# Default peak bytes per page for each stage
+DEFAULT_BUDGETS = {
+    "parse_pdf": 4 * 2**20,
+    "extract_text": 2 * 2**20,
+    "extract_images": 16 * 2**20,
+    "extract_tables": 4 * 2**20,
+    "extract_diagrams": 16 * 2**20,
+    "segment_questions": 1 * 2**20,
+}
+
+_UNITS = {"KiB": 2**10, "MiB": 2**20, "GiB": 2**30}
+
+
+def parse_size(value: str) -> int:
+    """Parse a byte count such as ``512KiB`` or ``4MiB``."""
+    for suffix, scale in _UNITS.items():
+        if value.endswith(suffix):
+            return int(float(value[:-len(suffix)]) * scale)
+    return int(value)
+
+
+def reference_pdf(pages: int) -> bytes:
+    """A synthetic paper with text, an embedded image and a diagram per page."""
+    doc = fitz.open()
+    pixmap = fitz.Pixmap(fitz.csRGB, fitz.IRect(0, 0, 600, 400), False)
+    pixmap.set_rect(pixmap.irect, (200, 120, 40))
+    image = pixmap.tobytes("png")
+    for page_index in range(pages):
+        page = doc.new_page()
+        page.insert_text((72, 80), f"{page_index + 1} Analyse the data shown. [9 marks]", fontsize=11)
+        for line in range(20):
+            page.insert_text((72, 100 + line * 14), f"Extract line {line} for page {page_index + 1}.", fontsize=10)
+        page.insert_image(fitz.Rect(72, 400, 372, 600), stream=image)
+        for radius in (20, 35, 50):
+            page.draw_circle((460, 680), radius)
+    data = doc.tobytes()
+    doc.close()
+    return data
+
+
+def measure(pdf_bytes: bytes) -> List[Dict[str, Any]]:
+    """
+    Parse one PDF under profiling.
+
+    Returns:
+        Profiled stages, each with ``per_page_bytes`` and the document's ``pages``
+    """
+    with fitz.open(stream=pdf_bytes, filetype="pdf") as doc:
+        pages = max(1, len(doc))
+
+    with memory_profile() as profile:
+        PDFParser().parse_pdf(pdf_bytes)
+
+    stages = profile.to_list()
+    for stage in stages:
+        stage["pages"] = pages
+        stage["per_page_bytes"] = (
+            stage["peak_bytes"] if stage["calls"] > 1 else stage["peak_bytes"] / pages
+        )
+    return stages
+
+
+def check(name: str, pdf_bytes: bytes, budgets: Dict[str, int]) -> List[str]:
+    """
+    Parse one PDF under profiling and compare each stage with its budget.
+
+    Returns:
+        Descriptions of exceeded budgets
+    """
+    stages = measure(pdf_bytes)
+
+    failures = []
+    print(f"\n{name}: {stages[0]['pages'] if stages else 0} pages")
+    print(f"  {'stage':<18} {'calls':>6} {'per page':>10} {'budget':>10} {'rss growth':>11}")
+    for stage in stages:
+        per_page = stage["per_page_bytes"]
+        budget = budgets.get(stage["stage"])
+        over = budget is not None and per_page > budget
+        print(f"  {stage['stage']:<18} {stage['calls']:>6} {per_page / 2**20:>8.2f}Mi "
+              f"{'-' if budget is None else f'{budget / 2**20:.2f}Mi':>10} "
+              f"{stage['rss_growth_bytes'] / 2**20:>9.1f}Mi" + ("  OVER" if over else ""))
+        if over:
+            failures.append(
+                f"{name}: {stage['stage']} used {per_page / 2**20:.2f} MiB per page, "
+                f"budget {budget / 2**20:.2f} MiB"
+            )
+    return failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("pdfs", nargs="*", help="Reference PDFs (default: a synthetic paper)")
+    parser.add_argument("--budget", default="",
+                        help="Overrides as stage=size, e.g. parse_pdf=4MiB,extract_images=16MiB")
+    parser.add_argument("--pages", type=int, default=20, help="Pages in the synthetic paper")
+    args = parser.parse_args()
+
+    budgets = dict(DEFAULT_BUDGETS)
+    for part in filter(None, args.budget.split(",")):
+        stage, _, size = part.partition("=")
+        budgets[stage.strip()] = parse_size(size.strip())
+
+    if args.pdfs:
+        inputs = []
+        for path in args.pdfs:
+            with open(path, "rb") as f:
+                inputs.append((path, f.read()))
+    else:
+        inputs = [(f"synthetic ({args.pages} pages)", reference_pdf(args.pages))]
+
+    failures = []
+    for name, pdf_bytes in inputs:
+        failures.extend(check(name, pdf_bytes, budgets))
+
+    if failures:
+        print("\nMemory budget exceeded:")
+        for failure in failures:
+            print(f"  {failure}")
+        sys.exit(1)
+    print("\nAll stages within budget")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+"""
+Benchmark similar-question lookup latency as the corpus grows.
+
+Builds synthetic corpora of question texts, with a reworded copy planted
+for a sample of them, and compares LSH lookup against a linear scan of
+every signature. Run from parsing-api/:
+
+    python -m benchmarks.similarity_lookup --sizes 1000,10000,50000
+"""
+import argparse
+import random
+import statistics
+import string
+import time
+from typing import List, Tuple
+
+from app.services.minhash import LSHIndex, estimate_similarity, minhash_signature
+
+
+def make_corpus(size: int, seed: int) -> Tuple[List[str], List[Tuple[int, int]]]:
+    """
+    Generate question texts and (original, reworded copy) index pairs.
+
+    One in ten questions gets a copy with a few words substituted.
+    """
+    rng = random.Random(seed)
+    vocabulary = [
+        "".join(rng.choices(string.ascii_lowercase, k=rng.randint(2, 9)))
+        for _ in range(5000)
+    ]
+    # Zipf-like word frequencies, so common words are shared across questions
+    weights = [1 / (rank + 1) for rank in range(len(vocabulary))]
+
+    texts: List[str] = []
+    pairs: List[Tuple[int, int]] = []
+    while len(texts) < size:
+        words = rng.choices(vocabulary, weights, k=rng.randint(25, 60))
+        texts.append(" ".join(words))
+        if len(texts) < size and rng.random() < 0.1:
+            reworded = list(words)
+            for position in rng.sample(range(len(reworded)), k=max(1, len(reworded) // 25)):
+                reworded[position] = rng.choice(vocabulary)
+            pairs.append((len(texts) - 1, len(texts)))
+            texts.append(" ".join(reworded))
+    return texts, pairs
+
+
+def percentile(samples: List[float], fraction: float) -> float:
+    """Nearest-rank percentile of a list of samples."""
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+def run(size: int, queries: int, threshold: float, seed: int):
+    """Benchmark one corpus size and print a result row."""
+    texts, pairs = make_corpus(size, seed)
+
+    start = time.perf_counter()
+    signatures = [minhash_signature(text) for text in texts]
+    signing_ms = (time.perf_counter() - start) * 1000 / size
+
+    index = LSHIndex()
+    for key, signature in enumerate(signatures):
+        index.add(str(key), signature)
+
+    rng = random.Random(seed)
+    sample = rng.sample(pairs, k=min(queries, len(pairs)))
+
+    lsh_times, scan_times, candidate_counts = [], [], []
+    found = 0
+    for original, copy in sample:
+        signature = signatures[original]
+
+        start = time.perf_counter()
+        hits = index.query(signature, threshold, exclude=[str(original)])
+        lsh_times.append((time.perf_counter() - start) * 1000)
+        candidate_counts.append(len(index.candidates(signature)))
+        found += any(key == str(copy) for key, _ in hits)
+
+        start = time.perf_counter()
+        [
+            key for key, other in enumerate(signatures)
+            if key != original and estimate_similarity(signature, other) >= threshold
+        ]
+        scan_times.append((time.perf_counter() - start) * 1000)
+
+    print(
+        f"{size:>9} {signing_ms:>9.3f} "
+        f"{statistics.median(lsh_times):>9.3f} {percentile(lsh_times, 0.95):>9.3f} "
+        f"{statistics.median(scan_times):>10.2f} "
+        f"{statistics.mean(candidate_counts):>10.1f} {found / len(sample):>7.1%}"
+    )
+
+
+def main():
+    """Parse arguments and run the benchmark for each corpus size."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--sizes", default="1000,5000,20000",
+                        help="Comma-separated corpus sizes")
+    parser.add_argument("--queries", type=int, default=200,
+                        help="Lookups per corpus size")
+    parser.add_argument("--threshold", type=float, default=0.5,
+                        help="Minimum estimated similarity")
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    print(f"{'questions':>9} {'sign ms':>9} {'lsh p50':>9} {'lsh p95':>9} "
+          f"{'scan p50':>10} {'candidates':>10} {'recall':>7}")
+    for size in (int(size) for size in args.sizes.split(",")):
+        run(size, args.queries, args.threshold, args.seed)
+
+
+if __name__ == "__main__":
+    main()
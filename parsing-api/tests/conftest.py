@@ -0,0 +1,141 @@
+"""Shared fixtures for the parsing API tests."""
+import hashlib
+import io
+import os
+from typing import Dict, Optional
+
+# Settings require Supabase credentials; the tests never contact Supabase
+for _name in ("SUPABASE_URL", "SUPABASE_KEY", "SUPABASE_SERVICE_KEY"):
+    os.environ.setdefault(_name, "http://supabase.test")
+
+import fitz  # PyMuPDF
+import pytest
+from PIL import Image
+
+from app.config import get_settings
+from app.services import db_service
+from app.utils.storage import StorageService
+from tests.fake_supabase import FakeClient
+
+
+def _png(width: int, height: int, color: str) -> bytes:
+    """Encode a solid-colour PNG."""
+    buffer = io.BytesIO()
+    Image.new("RGB", (width, height), color).save(buffer, "PNG")
+    return buffer.getvalue()
+
+
+# Distinct colours for small icon images
+_ICON_COLORS = ["red", "green", "orange", "purple", "teal", "navy", "olive", "maroon"]
+
+
+def make_pdf(
+    pages: int = 3, marker: str = "", images: bool = True, icons: int = 0, table_rows: int = 0
+) -> bytes:
+    """
+    Build a small exam-style PDF with one question per page.
+
+    Args:
+        pages: Number of question pages
+        marker: Extra text so otherwise identical PDFs hash differently
+        images: Put an image on the second page
+        icons: Number of small (30pt) images to put on the first page
+        table_rows: Rows of a ruled three-column table on the last page
+
+    Returns:
+        PDF file as bytes
+    """
+    doc = fitz.open()
+    for index in range(pages):
+        page = doc.new_page()
+        page.insert_text(
+            (72, 100), f"{index + 1} Explain price elasticity of demand. [6 marks]", fontsize=11
+        )
+        page.insert_text((72, 130), f"Some body text for the question. {marker}", fontsize=10)
+        if images and index == 1:
+            page.insert_image(fitz.Rect(72, 200, 272, 350), stream=_png(400, 300, "blue"))
+        if index == 0:
+            for icon in range(icons):
+                left = 72 + icon * 40
+                page.insert_image(
+                    fitz.Rect(left, 160, left + 30, 190),
+                    stream=_png(120, 120, _ICON_COLORS[icon % len(_ICON_COLORS)])
+                )
+        if index == pages - 1:
+            for row in range(table_rows):
+                for column in range(3):
+                    left, top = 72 + column * 120, 400 + row * 20
+                    page.draw_rect(fitz.Rect(left, top, left + 120, top + 20))
+                    page.insert_text((left + 4, top + 14), f"r{row}c{column}", fontsize=9)
+    data = doc.tobytes()
+    doc.close()
+    return data
+
+
+@pytest.fixture
+def settings_env(monkeypatch):
+    """Set environment variables for settings, re-reading them on each get_settings()."""
+    def set_env(**values: str):
+        for name, value in values.items():
+            monkeypatch.setenv(name, value)
+        get_settings.cache_clear()
+
+    yield set_env
+    monkeypatch.undo()
+    get_settings.cache_clear()
+
+
+@pytest.fixture
+def fake_storage(monkeypatch) -> Dict[str, bytes]:
+    """Keep storage objects in memory instead of Supabase Storage."""
+    objects: Dict[str, bytes] = {}
+
+    def put(path: str, data: bytes) -> str:
+        objects[path] = bytes(data)
+        return f"http://storage.test/{path}"
+
+    def shared_path(content_hash: str, format: str, variant: Optional[str]) -> str:
+        suffix = f"_{variant}" if variant else ""
+        return f"shared/{content_hash}{suffix}.{format}"
+
+    async def upload_shared_image(self, image_bytes, format, content_hash, variant=None):
+        return put(shared_path(content_hash, format, variant), image_bytes)
+
+    def put_shared_image(self, image_bytes, format, content_hash, variant=None):
+        return put(shared_path(content_hash, format, variant), image_bytes)
+
+    async def upload_pdf(self, pdf_bytes):
+        pdf_hash = hashlib.sha256(pdf_bytes).hexdigest()
+        return pdf_hash, put(f"pdfs/{pdf_hash}.pdf", pdf_bytes)
+
+    async def upload_span_layer(self, paper_id, data):
+        put(f"layers/{paper_id}.json.gz", data)
+
+    async def delete_pdf(self, pdf_hash):
+        objects.pop(f"pdfs/{pdf_hash}.pdf", None)
+
+    async def delete_span_layer(self, paper_id):
+        objects.pop(f"layers/{paper_id}.json.gz", None)
+
+    for name, method in [
+        ("upload_shared_image", upload_shared_image),
+        ("put_shared_image", put_shared_image),
+        ("upload_pdf", upload_pdf),
+        ("upload_span_layer", upload_span_layer),
+        ("delete_pdf", delete_pdf),
+        ("delete_span_layer", delete_span_layer),
+    ]:
+        monkeypatch.setattr(StorageService, name, method)
+    return objects
+
+
+@pytest.fixture
+def fake_db(monkeypatch) -> FakeClient:
+    """Serve the Supabase backend's queries from in-memory tables."""
+    client = FakeClient()
+
+    async def get_async_client():
+        return client
+
+    monkeypatch.setattr(db_service, "get_async_client", get_async_client)
+    return client
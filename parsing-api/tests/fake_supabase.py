@@ -0,0 +1,226 @@
+"""In-memory stand-in for the async Supabase client's PostgREST queries."""
+import copy
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+
+# Primary key columns of tables not keyed by ``id``
+_KEYS = {
+    "QuestionBand": ("band", "question_id"),
+    "PaperStyle": ("paper_id", "style_id"),
+}
+
+
+class FakeResponse:
+    """Query result with the attributes the service layer reads."""
+
+    def __init__(self, data: Any):
+        self.data = data
+
+
+class FakeQuery:
+    """
+    Query builder over in-memory tables.
+
+    Upserts follow PostgREST: the columns written are the union of the
+    batch's keys, so columns absent from every record keep their values on
+    existing rows. Selects return at most ``max_rows`` rows, like
+    PostgREST's default ``max-rows``.
+    """
+
+    def __init__(self, client: "FakeClient", table: str):
+        self.client = client
+        self.table = table
+        self.action = "select"
+        self.payload: Any = None
+        self.columns: Optional[List[str]] = None
+        self.options: Dict[str, Any] = {}
+        self.filters: List[Callable[[Dict[str, Any]], bool]] = []
+        self.ordering: List[Tuple[str, bool]] = []
+        self.window: Optional[Tuple[int, int]] = None
+
+    def select(self, columns: str = "*", **_: Any) -> "FakeQuery":
+        if columns.strip() != "*":
+            self.columns = [column.strip() for column in columns.split(",")]
+        return self
+
+    def insert(self, records: Any, **_: Any) -> "FakeQuery":
+        self.action, self.payload = "insert", records
+        return self
+
+    def upsert(self, records: Any, on_conflict: str = "", ignore_duplicates: bool = False, **_: Any):
+        self.action, self.payload = "upsert", records
+        self.options = {"on_conflict": on_conflict, "ignore_duplicates": ignore_duplicates}
+        return self
+
+    def update(self, values: Dict[str, Any]) -> "FakeQuery":
+        self.action, self.payload = "update", values
+        return self
+
+    def delete(self) -> "FakeQuery":
+        self.action = "delete"
+        return self
+
+    def eq(self, column: str, value: Any) -> "FakeQuery":
+        self.filters.append(lambda row: row.get(column) == value)
+        return self
+
+    def in_(self, column: str, values: List[Any]) -> "FakeQuery":
+        values = list(values)
+        self.filters.append(lambda row: row.get(column) in values)
+        return self
+
+    def lt(self, column: str, value: Any) -> "FakeQuery":
+        self.filters.append(lambda row: row.get(column) is not None and row[column] < value)
+        return self
+
+    def gt(self, column: str, value: Any) -> "FakeQuery":
+        self.filters.append(lambda row: row.get(column) is not None and row[column] > value)
+        return self
+
+    def order(self, column: str, desc: bool = False, **_: Any) -> "FakeQuery":
+        self.ordering.append((column, desc))
+        return self
+
+    def limit(self, count: int) -> "FakeQuery":
+        self.window = (0, count - 1)
+        return self
+
+    def range(self, start: int, end: int) -> "FakeQuery":
+        self.window = (start, end)
+        return self
+
+    async def execute(self) -> FakeResponse:
+        self.client.calls.append((self.table, self.action))
+        if self.client.fail is not None:
+            error = self.client.fail(self.table, self.action)
+            if error is not None:
+                raise error
+        rows = self.client.tables.setdefault(self.table, [])
+
+        if self.action in ("insert", "upsert"):
+            records = self.payload if isinstance(self.payload, list) else [self.payload]
+            keys = self._conflict_keys()
+            columns = sorted({column for record in records for column in record})
+            written = []
+            for record in records:
+                values = {column: copy.deepcopy(record.get(column)) for column in columns}
+                existing = next(
+                    (row for row in rows if all(row.get(k) == values[k] for k in keys)), None
+                )
+                if existing is None:
+                    rows.append(values)
+                elif self.action == "insert":
+                    raise RuntimeError(f"duplicate key value in {self.table}")
+                elif not self.options.get("ignore_duplicates"):
+                    existing.update(values)
+                written.append(dict(values))
+            return FakeResponse(written)
+
+        matched = [row for row in rows if all(test(row) for test in self.filters)]
+        if self.action == "update":
+            for row in matched:
+                row.update(copy.deepcopy(self.payload))
+        elif self.action == "delete":
+            self.client.tables[self.table] = [row for row in rows if row not in matched]
+            return FakeResponse([dict(row) for row in matched])
+
+        for column, desc in reversed(self.ordering):
+            matched.sort(key=lambda row: row.get(column), reverse=desc)
+        start, end = self.window or (0, len(matched) - 1)
+        matched = matched[start:min(end + 1, start + self.client.max_rows)]
+        if self.columns is not None:
+            matched = [{column: row.get(column) for column in self.columns} for row in matched]
+        return FakeResponse(copy.deepcopy(matched))
+
+    def _conflict_keys(self) -> Tuple[str, ...]:
+        if self.options.get("on_conflict"):
+            return tuple(key.strip() for key in self.options["on_conflict"].split(","))
+        return _KEYS.get(self.table, ("id",))
+
+
+class FakeRpc:
+    """Call of a registered stand-in for a database function."""
+
+    def __init__(self, client: "FakeClient", name: str, params: Dict[str, Any]):
+        self.client = client
+        self.name = name
+        self.params = params
+
+    async def execute(self) -> FakeResponse:
+        self.client.calls.append((self.name, "rpc"))
+        return FakeResponse(self.client.functions[self.name](self.client, **self.params))
+
+
+def prune_questions(client: "FakeClient", paper, question_ids, content_ids, band_question_ids, bands):
+    """prisma/sql/question_segmentation.sql, including the ON DELETE CASCADE."""
+    tables = client.tables
+    tables["Question"] = [
+        row for row in tables.get("Question", [])
+        if row["paper_id"] != paper or row["id"] in question_ids
+    ]
+    remaining = {row["id"] for row in tables["Question"]}
+    tables["QuestionContent"] = [
+        row for row in tables.get("QuestionContent", [])
+        if row["question_id"] in remaining
+        and (row["question_id"] not in question_ids or row["id"] in content_ids)
+    ]
+    kept_bands = set(zip(bands, band_question_ids))
+    tables["QuestionBand"] = [
+        row for row in tables.get("QuestionBand", [])
+        if row["question_id"] in remaining
+        and (row["question_id"] not in question_ids or (row["band"], row["question_id"]) in kept_bands)
+    ]
+
+
+def list_papers(
+    client: "FakeClient", exam_board_filter=None, year_filter=None, session_filter=None,
+    paper_number_filter=None, after_exam_board=None, after_year=None, after_session=None,
+    after_paper_number=None, after_id=None, page_size=50
+):
+    """prisma/sql/paper_catalogue.sql."""
+    order = ("exam_board", "year", "session", "paper_number", "id")
+    after = (after_exam_board, after_year, after_session, after_paper_number, after_id)
+    filters = {
+        "exam_board": exam_board_filter, "year": year_filter,
+        "session": session_filter, "paper_number": paper_number_filter,
+    }
+    questions = client.tables.get("Question", [])
+    rows = sorted(
+        (
+            row for row in client.tables.get("Paper", [])
+            if row.get("ingest_status", "complete") == "complete"
+            and all(value is None or row[column] == value for column, value in filters.items())
+            and (after_id is None or tuple(row[column] for column in order) > after)
+        ),
+        key=lambda row: tuple(row[column] for column in order)
+    )
+    return [
+        {**row, "question_count": sum(1 for q in questions if q["paper_id"] == row["id"])}
+        for row in rows[:page_size]
+    ]
+
+
+class FakeClient:
+    """
+    Async client whose ``table`` and ``rpc`` work on dictionaries.
+
+    ``calls`` records (table or function, action) for each executed query.
+    ``fail``, if set, is called with (table, action) before each query and
+    may return an exception to raise.
+    """
+
+    def __init__(self, max_rows: int = 1000):
+        self.tables: Dict[str, List[Dict[str, Any]]] = {}
+        self.functions: Dict[str, Callable[..., Any]] = {
+            "prune_questions": prune_questions,
+            "list_papers": list_papers,
+        }
+        self.calls: List[Tuple[str, str]] = []
+        self.fail: Optional[Callable[[str, str], Optional[Exception]]] = None
+        self.max_rows = max_rows
+
+    def table(self, name: str) -> FakeQuery:
+        return FakeQuery(self, name)
+
+    def rpc(self, name: str, params: Optional[Dict[str, Any]] = None) -> FakeRpc:
+        return FakeRpc(self, name, params or {})
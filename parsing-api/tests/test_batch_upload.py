@@ -0,0 +1,146 @@
+"""The /batch endpoint's handling of PDFs and ZIP archives."""
+import io
+import json
+import zipfile
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.main import app
+from app.routers import parse as parse_router
+from app.services.pdf_parser import PDFParser
+from tests.conftest import make_pdf
+
+METADATA = {"exam_board": "AQA", "year": 2019, "session": "June", "paper_number": 1}
+
+
+class InProcessExecutor:
+    """Parses in the test process instead of on the worker pool."""
+
+    async def parse(self, pdf_bytes, client=""):
+        return PDFParser().parse_pdf(pdf_bytes)
+
+
+@pytest.fixture
+def client(fake_db, fake_storage, monkeypatch):
+    monkeypatch.setattr(parse_router, "get_parse_executor", lambda: InProcessExecutor())
+    return TestClient(app)
+
+
+def zip_bytes(entries, compression=zipfile.ZIP_DEFLATED) -> bytes:
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w", compression) as archive:
+        for name, data in entries.items():
+            if name.endswith("/"):
+                archive.writestr(zipfile.ZipInfo(name), b"")
+            else:
+                archive.writestr(name, data)
+    return buffer.getvalue()
+
+
+def upload(client, files, manifest):
+    return client.post(
+        "/api/parse/batch",
+        files=[("files", (name, data, "application/octet-stream")) for name, data in files],
+        data={"manifest": json.dumps(manifest)}
+    )
+
+
+def by_name(body):
+    return {result["filename"]: result for result in body["results"]}
+
+
+def test_archive_entries_are_named_by_their_path(client):
+    archive = zip_bytes({
+        "2019/": b"",
+        "2019/june/": b"",
+        "2019/june/paper1.PDF": make_pdf(marker="p1"),
+        "2019/june/paper2.pdf": make_pdf(marker="p2"),
+        "2019/readme.txt": b"not a paper",
+        "2019/june/mark-scheme.docx": b"PK\x03\x04",
+        "__MACOSX/2019/june/._paper1.PDF": b"\x00\x05\x16\x07",
+    })
+    manifest = {
+        "2019/june/paper1.PDF": METADATA,
+        "2019/june/paper2.pdf": {**METADATA, "paper_number": 2},
+    }
+
+    response = upload(client, [("papers.zip", archive)], manifest)
+
+    assert response.status_code == 200
+    body = response.json()
+    assert (body["total"], body["succeeded"], body["failed"]) == (2, 2, 0)
+    results = by_name(body)
+    assert set(results) == set(manifest)
+    assert all(result["questions_count"] == 3 for result in results.values())
+
+
+def test_partial_failures_are_counted_per_file(client):
+    archive = zip_bytes({
+        "good.pdf": make_pdf(marker="good"),
+        "broken.pdf": b"%PDF-1.7 this is not really a PDF",
+        "unlisted.pdf": make_pdf(marker="unlisted"),
+    })
+    manifest = {
+        "good.pdf": METADATA,
+        "broken.pdf": METADATA,
+        "loose.pdf": METADATA,
+        "bad-metadata.pdf": {"exam_board": "AQA"},
+        "missing.pdf": METADATA,
+    }
+
+    response = upload(
+        client,
+        [
+            ("papers.zip", archive),
+            ("loose.pdf", make_pdf(marker="loose")),
+            ("bad-metadata.pdf", make_pdf(marker="bad")),
+        ],
+        manifest
+    )
+
+    assert response.status_code == 200
+    body = response.json()
+    assert (body["total"], body["succeeded"], body["failed"]) == (6, 2, 4)
+    results = by_name(body)
+    assert results["good.pdf"]["status"] == results["loose.pdf"]["status"] == "success"
+    assert results["good.pdf"]["paper_id"] != results["loose.pdf"]["paper_id"]
+    assert results["broken.pdf"]["status"] == "error"
+    assert results["unlisted.pdf"]["error"] == "No manifest entry for this file"
+    assert results["bad-metadata.pdf"]["error"].startswith("Invalid metadata")
+    assert results["missing.pdf"]["error"] == "Manifest entry has no matching file"
+
+
+def test_archive_that_is_not_a_zip_is_rejected(client):
+    response = upload(client, [("papers.zip", b"PK\x03\x04 truncated")], {})
+
+    assert response.status_code == 400
+    assert response.json()["detail"] == "Invalid ZIP archive: papers.zip"
+
+
+def test_corrupt_entry_in_an_archive_is_rejected(client):
+    archive = bytearray(zip_bytes({"paper.pdf": make_pdf()}, compression=zipfile.ZIP_STORED))
+    # Flip bytes inside the stored PDF so its CRC no longer matches
+    offset = archive.index(b"%PDF") + 200
+    archive[offset:offset + 8] = b"XXXXXXXX"
+
+    response = upload(client, [("papers.zip", bytes(archive))], {"paper.pdf": METADATA})
+
+    assert response.status_code == 400
+    assert "paper.pdf is unreadable" in response.json()["detail"]
+
+
+def test_files_other_than_pdfs_and_archives_are_rejected(client):
+    response = upload(client, [("notes.txt", b"hello")], {})
+
+    assert response.status_code == 400
+    assert response.json()["detail"] == "Only PDF files and ZIP archives are accepted: notes.txt"
+
+
+def test_batch_file_limit_counts_archive_entries(client, settings_env):
+    settings_env(BATCH_MAX_FILES="2")
+    archive = zip_bytes({f"paper{index}.pdf": make_pdf(marker=str(index)) for index in range(3)})
+
+    response = upload(client, [("papers.zip", archive)], {})
+
+    assert response.status_code == 413
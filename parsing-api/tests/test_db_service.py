@@ -0,0 +1,175 @@
+"""Supabase backend of DatabaseService, against in-memory tables."""
+import asyncio
+
+import pytest
+
+from app.services.db_service import DatabaseService
+from app.services.pdf_parser import PDFParser
+from app.utils.storage import StorageService
+from tests.conftest import make_pdf
+
+
+METADATA = {"exam_board": "AQA", "year": 2019, "session": "June", "paper_number": 1}
+
+
+@pytest.fixture
+def service(settings_env, fake_storage, fake_db):
+    # One question per batch
+    settings_env(DB_INSERT_BATCH_SIZE="1")
+    return DatabaseService()
+
+
+@pytest.fixture
+def image_uploads(monkeypatch):
+    """Content hashes passed to upload_shared_image, in call order."""
+    hashes = []
+    upload = StorageService.upload_shared_image
+
+    async def record(self, image_bytes, format, content_hash, variant=None):
+        hashes.append(content_hash)
+        return await upload(self, image_bytes, format, content_hash, variant)
+
+    monkeypatch.setattr(StorageService, "upload_shared_image", record)
+    return hashes
+
+
+def store(service, pdf):
+    return asyncio.run(service.store_parsed_paper(PDFParser().parse_pdf(pdf), METADATA, pdf))
+
+
+@pytest.mark.parametrize("atlas", ["false", "true"])
+def test_resumed_ingest_does_not_upload_written_batches_again(
+    atlas, settings_env, service, fake_db, image_uploads
+):
+    settings_env(IMAGE_ATLAS=atlas)
+    service = DatabaseService()
+    pdf = make_pdf(pages=3, icons=2)
+    question_writes = []
+
+    def fail_second_batch(table, action):
+        if table == "Question" and action == "upsert":
+            question_writes.append(table)
+            if len(question_writes) == 2:
+                return ValueError("connection lost")
+        return None
+
+    fake_db.fail = fail_second_batch
+    with pytest.raises(ValueError):
+        store(service, pdf)
+    first_attempt = set(image_uploads)
+    [paper] = fake_db.tables["Paper"]
+    assert paper["ingest_status"] == "pending"
+    assert paper["ingest_checkpoint"] == 0
+
+    fake_db.fail = None
+    image_uploads.clear()
+    stored = store(service, pdf)
+
+    assert stored["ingest_status"] == "complete"
+    icon_rows = [
+        row for row in fake_db.tables["QuestionContent"]
+        if row["content_type"] == "IMAGE" and row["width"] < 40
+    ]
+    assert len(icon_rows) == 2
+    assert all(row["image_url"] for row in icon_rows)
+    assert all(bool(row["image_atlas"]) == (atlas == "true") for row in icon_rows)
+    # Only the second page's image, from the batch that failed, is sent again
+    assert len(set(image_uploads)) == 1
+    assert set(image_uploads) <= first_attempt
+
+
+def test_list_paper_ids_pages_past_the_response_cap(service, fake_db):
+    fake_db.max_rows = 10
+    fake_db.tables["Paper"] = [
+        {"id": f"{index:04d}", "ingest_status": "complete"} for index in range(25)
+    ] + [{"id": "pending", "ingest_status": "pending"}]
+
+    paper_ids = asyncio.run(service.list_paper_ids())
+
+    assert paper_ids == [f"{index:04d}" for index in range(25)]
+
+
+def test_resegmented_content_keeps_no_columns_of_its_old_type(service, fake_db):
+    pdf = make_pdf(pages=3)
+    parsed = PDFParser().parse_pdf(pdf)
+    paper_id = store(service, pdf)["id"]
+    [image_row] = [
+        row for row in fake_db.tables["QuestionContent"] if row["content_type"] == "IMAGE"
+    ]
+
+    # The image's position now holds a line of text
+    question = next(
+        q for q in parsed["questions"] if any(c["type"] == "IMAGE" for c in q["content"])
+    )
+    position = next(i for i, c in enumerate(question["content"]) if c["type"] == "IMAGE")
+    question["content"][position] = {
+        "type": "TEXT", "data": {"text": "Figure 1", "style_id": 0, "x": 72, "y": 200}
+    }
+    asyncio.run(service.replace_questions(paper_id, parsed))
+
+    row = next(r for r in fake_db.tables["QuestionContent"] if r["id"] == image_row["id"])
+    assert row["content_type"] == "TEXT"
+    assert row["text"] == "Figure 1"
+    assert row["image_url"] is None
+    assert row["image_width"] is None
+    assert row["alt_text"] is None
+
+
+@pytest.fixture
+def stage_events(monkeypatch):
+    """("build", seq) and ("write", seq) as batches reach each ingest stage."""
+    events = []
+    build = DatabaseService._build_batch_rows
+    upsert = DatabaseService._upsert_batched
+
+    async def record_build(self, paper_id, questions):
+        events.append(("build", questions[-1]["sequence_order"]))
+        # Let the write stage run, as a real upload would
+        await asyncio.sleep(0)
+        return await build(self, paper_id, questions)
+
+    async def record_upsert(self, table, records):
+        if table == "Question":
+            events.append(("write", records[-1]["sequence_order"]))
+            await asyncio.sleep(0.001)
+        return await upsert(self, table, records)
+
+    monkeypatch.setattr(DatabaseService, "_build_batch_rows", record_build)
+    monkeypatch.setattr(DatabaseService, "_upsert_batched", record_upsert)
+    return events
+
+
+def test_image_stage_runs_at_most_a_queue_ahead_of_writes(settings_env, service, stage_events):
+    settings_env(INGEST_QUEUE_SIZE="1")
+    service = DatabaseService()
+
+    store(service, make_pdf(pages=8, images=False))
+
+    builds = [seq for stage, seq in stage_events if stage == "build"]
+    writes = [seq for stage, seq in stage_events if stage == "write"]
+    assert builds == writes == list(range(8))
+    # Batches built beyond the one being written: one queued and one in hand
+    lead = max(
+        seq - sum(1 for stage, _ in stage_events[:index] if stage == "write")
+        for index, (stage, seq) in enumerate(stage_events) if stage == "build"
+    )
+    assert lead <= 2
+
+
+def test_failed_write_stops_the_other_stages(settings_env, service, fake_db, fake_storage, stage_events):
+    settings_env(INGEST_QUEUE_SIZE="1")
+    service = DatabaseService()
+    fake_db.fail = lambda table, action: (
+        ValueError("constraint violated") if (table, action) == ("QuestionContent", "upsert") else None
+    )
+
+    with pytest.raises(ValueError, match="constraint violated"):
+        store(service, make_pdf(pages=8, images=False))
+
+    builds = [seq for stage, seq in stage_events if stage == "build"]
+    assert len(builds) < 8
+    [paper] = fake_db.tables["Paper"]
+    assert paper["ingest_status"] == "pending"
+    assert paper["ingest_checkpoint"] is None
+    # The span layer waits for every image, so it is never stored
+    assert not any(path.startswith("layers/") for path in fake_storage)
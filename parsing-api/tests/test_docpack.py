@@ -0,0 +1,41 @@
+"""Round trip of parsed documents through the packed file format."""
+from app.services.docpack import PackedDocument, pack_document
+from app.services.pdf_parser import PDFParser
+from tests.conftest import make_pdf
+
+
+def plain(value):
+    """Copy parsed data with memoryviews as bytes and tuples as lists."""
+    if isinstance(value, memoryview):
+        return bytes(value)
+    if isinstance(value, dict):
+        return {key: plain(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [plain(item) for item in value]
+    return value
+
+
+def test_mapped_document_rebuilds_parsed_data(tmp_path):
+    parsed = PDFParser().parse_pdf(make_pdf(images=True, table_rows=4))
+    path = tmp_path / "doc.pack"
+    path.write_bytes(pack_document(parsed))
+
+    rebuilt = PackedDocument.open(str(path), delete=True).to_parsed_data()
+
+    assert not path.exists()
+    content_types = {item["type"] for q in rebuilt["questions"] for item in q["content"]}
+    assert {"TEXT", "IMAGE", "TABLE"} <= content_types
+    assert rebuilt["styles"]
+    assert plain(rebuilt) == plain(parsed)
+
+
+def test_image_bytes_survive_the_round_trip(tmp_path):
+    parsed = PDFParser().parse_pdf(make_pdf(images=True))
+    path = tmp_path / "doc.pack"
+    path.write_bytes(pack_document(parsed))
+
+    rebuilt = PackedDocument.open(str(path)).to_parsed_data()
+
+    original = parsed["pages"][1]["image_elements"][0]
+    restored = rebuilt["pages"][1]["image_elements"][0]
+    assert bytes(restored["image_bytes"]) == bytes(original["image_bytes"])
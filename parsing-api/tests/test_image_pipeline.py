@@ -0,0 +1,116 @@
+"""Image variants and content-addressed image storage."""
+import asyncio
+import hashlib
+import io
+
+import pytest
+from PIL import Image
+
+from app.services.image_pipeline import ImageProcessor, primary_variant
+from app.services.image_sink import ImageUploadSink
+from app.utils import storage
+from app.utils.storage import StorageService
+from tests.conftest import _png
+from tests.test_storage import FakeBucket, use_bucket
+
+
+def decode(data: bytes) -> Image.Image:
+    image = Image.open(io.BytesIO(data))
+    image.load()
+    return image
+
+
+def sizes(variants):
+    return {(v["label"], v["format"]): (v["width"], v["height"]) for v in variants}
+
+
+def test_variants_are_sized_for_their_page_placement():
+    # 800x600 pixels shown at 200x150 points
+    variants = ImageProcessor(["webp"]).process(_png(800, 600, "blue"), 200, 150)
+
+    assert sizes(variants) == {
+        ("thumb", "webp"): (160, 120),
+        ("1x", "webp"): (267, 200),
+        ("2x", "webp"): (533, 400),
+    }
+    for variant in variants:
+        image = decode(variant["bytes"])
+        assert image.format == "WEBP"
+        assert image.size == (variant["width"], variant["height"])
+
+
+def test_variants_are_never_upscaled_and_equal_sizes_are_encoded_once():
+    variants = ImageProcessor(["webp"], thumbnail_size=400).process(_png(120, 90, "red"), 300, 225)
+
+    assert sizes(variants) == {("thumb", "webp"): (120, 90)}
+
+
+def test_every_format_gets_every_size():
+    processor = ImageProcessor(["webp", "avif"])
+    if processor.formats != ["webp", "avif"]:
+        pytest.skip("Pillow cannot encode AVIF here")
+
+    variants = processor.process(_png(800, 600, "blue"), 200, 150)
+
+    assert len(variants) == 6
+    assert {decode(v["bytes"]).format for v in variants} == {"WEBP", "AVIF"}
+    assert primary_variant(variants)["label"] == "2x"
+    assert primary_variant(variants)["format"] == "webp"
+
+
+def test_unknown_formats_fall_back_to_webp():
+    assert ImageProcessor(["gif", "bmp"]).formats == ["webp"]
+
+
+def test_transparency_is_kept():
+    buffer = io.BytesIO()
+    Image.new("RGBA", (64, 64), (255, 0, 0, 0)).save(buffer, "PNG")
+
+    (variant,) = ImageProcessor(["webp"]).process(buffer.getvalue(), 48, 48)
+
+    assert decode(variant["bytes"]).mode == "RGBA"
+
+
+def test_identical_images_are_uploaded_once_under_their_hash(fake_storage):
+    data = _png(400, 300, "green")
+    content_hash = hashlib.sha256(data).hexdigest()
+    sink = ImageUploadSink(
+        StorageService(), ImageProcessor(["webp"]), max_buffer_bytes=2**20, max_workers=2
+    )
+    elements = [
+        {"image_bytes": data, "format": "png", "bbox_width": 200, "bbox_height": 150}
+        for _ in range(3)
+    ]
+
+    try:
+        for element in elements:
+            sink.submit(element)
+        sink.close()
+    finally:
+        sink.shutdown()
+
+    assert sorted(fake_storage) == [
+        f"shared/{content_hash}_{label}.webp" for label in ("1x", "2x", "thumb")
+    ]
+    assert {element["image_url"] for element in elements} == {
+        f"http://storage.test/shared/{content_hash}_2x.webp"
+    }
+    assert all(element["image_variants"] == elements[0]["image_variants"] for element in elements)
+
+
+def test_shared_keys_name_the_hash_variant_and_format(monkeypatch):
+    monkeypatch.setattr(storage, "_known_shared", storage.OrderedDict())
+    service = StorageService()
+    bucket = FakeBucket()
+    use_bucket(monkeypatch, service, bucket)
+
+    async def upload_twice():
+        return [
+            await service.upload_shared_image(b"webp", "webp", "f00d", variant="thumb")
+            for _ in range(2)
+        ]
+
+    urls = asyncio.run(upload_twice())
+
+    assert urls == ["http://storage.test/shared/f00d_thumb.webp"] * 2
+    assert bucket.uploads == ["shared/f00d_thumb.webp"]
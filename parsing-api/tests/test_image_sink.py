@@ -0,0 +1,43 @@
+"""Bounded buffering in ImageUploadSink."""
+import io
+import os
+
+from PIL import Image
+
+from app.services.image_pipeline import get_image_processor
+from app.services.image_sink import ImageUploadSink
+from app.utils.storage import StorageService
+
+
+def noisy_png(size: int = 96) -> bytes:
+    """A PNG that barely compresses, so its byte size is predictable."""
+    buffer = io.BytesIO()
+    Image.frombytes("RGB", (size, size), os.urandom(size * size * 3)).save(buffer, "PNG")
+    return buffer.getvalue()
+
+
+def test_held_sprites_count_against_the_buffer(fake_storage):
+    images = [noisy_png() for _ in range(8)]
+    budget = int(len(images[0]) * 2.5)
+    sink = ImageUploadSink(
+        StorageService(), get_image_processor(),
+        max_buffer_bytes=budget, max_workers=2, atlas_max_image=40
+    )
+    elements = [
+        {"image_bytes": data, "format": "png", "bbox_width": 30, "bbox_height": 30}
+        for data in images
+    ]
+
+    try:
+        for element in elements:
+            sink.submit(element)
+            assert sink.buffered_bytes <= budget
+        sink.close()
+    finally:
+        sink.shutdown()
+
+    assert sink.peak_buffered_bytes <= budget
+    assert sink.buffered_bytes == 0
+    assert all(element["image_atlas"] for element in elements)
+    # Packed early, two at a time, rather than all at once on close
+    assert len({element["image_url"] for element in elements}) == 4
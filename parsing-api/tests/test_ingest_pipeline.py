@@ -0,0 +1,142 @@
+"""Bounded-queue ingest pipeline."""
+import asyncio
+
+import pytest
+
+from app.services.ingest_pipeline import Pipeline, get_stage_metrics
+
+
+def test_items_pass_through_every_stage_in_order():
+    seen = []
+
+    async def double(item):
+        await asyncio.sleep(0)
+        return item * 2
+
+    async def collect(item):
+        seen.append(item)
+
+    async def main():
+        pipeline = Pipeline(queue_size=2)
+        first = pipeline.add_stage("test_double", double)
+        pipeline.add_stage("test_collect", collect)
+        await pipeline.run(range(5))
+        return first.done.is_set()
+
+    assert asyncio.run(main())
+    assert seen == [0, 2, 4, 6, 8]
+
+
+@pytest.mark.parametrize("queue_size", [1, 3])
+def test_fast_stage_is_held_back_by_a_slow_one(queue_size):
+    pulled, events = [], []
+
+    def items():
+        for item in range(20):
+            pulled.append(item)
+            yield item
+
+    async def fast(item):
+        events.append(("fast", item))
+        return item
+
+    async def slow(item):
+        events.append(("slow", item))
+        await asyncio.sleep(0.002)
+
+    async def main():
+        pipeline = Pipeline(queue_size)
+        pipeline.add_stage("test_fast", fast)
+        pipeline.add_stage("test_slow", slow)
+        await pipeline.run(items())
+
+    asyncio.run(main())
+
+    # Items the fast stage had started beyond those the slow stage had started
+    lead = max(
+        item - sum(1 for stage, _ in events[:index] if stage == "slow")
+        for index, (stage, item) in enumerate(events) if stage == "fast"
+    )
+    assert lead <= queue_size
+    assert len(pulled) == 20
+
+
+def test_stage_failure_propagates_and_cancels_the_rest():
+    handled, cancelled = [], []
+
+    async def first(item):
+        handled.append(item)
+        return item
+
+    async def second(item):
+        if item == 2:
+            raise ValueError("write failed")
+        await asyncio.sleep(0)
+
+    async def waiting_alongside():
+        try:
+            await asyncio.sleep(10)
+        except asyncio.CancelledError:
+            cancelled.append("alongside")
+            raise
+
+    async def main():
+        pipeline = Pipeline(queue_size=1)
+        first_stage = pipeline.add_stage("test_first", first)
+        pipeline.add_stage("test_second", second)
+        with pytest.raises(ValueError, match="write failed"):
+            await pipeline.run(range(100), alongside=[waiting_alongside()])
+        return first_stage
+
+    first_stage = asyncio.run(main())
+
+    assert cancelled == ["alongside"]
+    assert not first_stage.done.is_set()
+    assert len(handled) < 10
+    assert get_stage_metrics("test_second").failed >= 1
+    # Abandoned items no longer count as queued
+    assert get_stage_metrics("test_first").queued == 0
+    assert get_stage_metrics("test_second").queued == 0
+
+
+def test_failure_alongside_cancels_the_stages():
+    handled = []
+
+    async def slow(item):
+        handled.append(item)
+        await asyncio.sleep(0.01)
+
+    async def failing():
+        await asyncio.sleep(0.015)
+        raise RuntimeError("styles failed")
+
+    async def main():
+        pipeline = Pipeline(queue_size=1)
+        pipeline.add_stage("test_slow_only", slow)
+        with pytest.raises(RuntimeError, match="styles failed"):
+            await pipeline.run(range(100), alongside=[failing()])
+
+    asyncio.run(main())
+
+    assert len(handled) < 10
+
+
+def test_work_alongside_can_wait_for_a_stage():
+    order = []
+
+    async def stage(item):
+        order.append(item)
+
+    async def main():
+        pipeline = Pipeline(queue_size=1)
+        images = pipeline.add_stage("test_images", stage)
+
+        async def after_images():
+            await images.done.wait()
+            order.append("after")
+
+        await pipeline.run(range(3), alongside=[after_images()])
+
+    asyncio.run(main())
+
+    assert order == [0, 1, 2, "after"]
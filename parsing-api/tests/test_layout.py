@@ -0,0 +1,107 @@
+"""Column detection and position-based assignment on two-column pages."""
+import fitz  # PyMuPDF
+import pytest
+
+from app.services.layout import PageAnchors, detect_columns
+from app.services.pdf_parser import PDFParser
+from tests.conftest import _png
+
+# Left and right column x positions on an A4 page (595pt wide)
+LEFT, RIGHT = 50, 320
+
+
+def two_column_pdf(spanning_image: bool = False) -> bytes:
+    """
+    Build one page with questions 1-2 in the left column and 3-4 in the right.
+
+    Each column has an image under its first question. With
+    ``spanning_image``, a full-width figure crosses both columns between
+    the first and second question of each column.
+    """
+    doc = fitz.open()
+    page = doc.new_page(width=595, height=842)
+    for x, first, color in ((LEFT, 1, "blue"), (RIGHT, 3, "green")):
+        for number, top in ((first, 100), (first + 1, 450)):
+            page.insert_text((x, top), f"{number} Describe the market. [4 marks]", fontsize=10)
+            for line in range(4):
+                page.insert_text(
+                    (x, top + 15 * (line + 1)), f"Column text q{number} line {line}", fontsize=10
+                )
+        page.insert_image(fitz.Rect(x, 200, x + 150, 260), stream=_png(300, 120, color))
+    if spanning_image:
+        page.insert_image(fitz.Rect(50, 320, 545, 400), stream=_png(600, 100, "red"))
+    data = doc.tobytes()
+    doc.close()
+    return data
+
+
+@pytest.fixture
+def parsed():
+    return PDFParser().parse_pdf(two_column_pdf())
+
+
+def question(parsed, number):
+    return next(q for q in parsed["questions"] if q["question_number"] == str(number))
+
+
+def texts(q):
+    return [item["data"]["text"] for item in q["content"] if item["type"] == "TEXT"]
+
+
+def test_two_column_page_is_split_at_the_gutter(parsed):
+    page = parsed["pages"][0]
+
+    columns = detect_columns(page["text_elements"], page["width"])
+
+    assert len(columns) == 2
+    (_, split), _ = columns
+    assert LEFT + 150 < split < RIGHT
+
+
+def test_single_column_page_is_not_split():
+    page = PDFParser().parse_pdf(two_column_pdf())["pages"][0]
+    left_only = [e for e in page["text_elements"] if e["x"] < RIGHT]
+
+    assert detect_columns(left_only, page["width"]) == [(0.0, page["width"])]
+
+
+def test_text_is_read_column_by_column(parsed):
+    assert [q["question_number"] for q in parsed["questions"]] == ["1", "2", "3", "4"]
+    for number in (1, 2, 3, 4):
+        body = texts(question(parsed, number))
+        assert body[1:] == [f"Column text q{number} line {line}" for line in range(4)]
+
+
+def test_images_go_to_the_question_above_them_in_their_column(parsed):
+    for number in (1, 3):
+        content = question(parsed, number)["content"]
+        assert [item["type"] for item in content] == ["TEXT"] * 5 + ["IMAGE"]
+    for number in (2, 4):
+        assert "IMAGE" not in [item["type"] for item in question(parsed, number)["content"]]
+
+
+def test_full_width_element_is_read_with_the_first_column():
+    parsed = PDFParser().parse_pdf(two_column_pdf(spanning_image=True))
+    spanning = next(
+        item for q in parsed["questions"] for item in q["content"]
+        if item["type"] == "IMAGE" and item["data"]["bbox_width"] > 400
+    )
+
+    owner = next(q for q in parsed["questions"] if spanning in q["content"])
+
+    # Read after question 1's own image, before question 2 starts
+    assert owner["question_number"] == "1"
+    assert owner["content"][-1] is spanning
+    assert texts(question(parsed, 3))[0].startswith("3 ")
+
+
+def test_anchor_lookup_falls_back_to_the_carried_question():
+    carried = {"question_number": "7"}
+    anchors = PageAnchors(2, [(0.0, 300.0), (300.0, 600.0)], carried=carried)
+    later = {"question_number": "8"}
+    anchors.add({"x": 320, "y": 400, "width": 100}, later)
+
+    # Anything before question 8 in reading order, including the whole left column
+    assert anchors.locate({"x": 50, "y": 700, "bbox_width": 100}) is carried
+    assert anchors.locate({"x": 320, "y": 100, "bbox_width": 100}) is carried
+    assert anchors.locate({"x": 320, "y": 500, "bbox_width": 100}) is later
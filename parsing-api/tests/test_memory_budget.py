@@ -0,0 +1,20 @@
+"""Per-page parsing memory, checked with benchmarks.memory_budget."""
+from benchmarks.memory_budget import DEFAULT_BUDGETS, check, measure, reference_pdf
+
+
+def per_page(pages: int) -> dict:
+    return {stage["stage"]: stage["per_page_bytes"] for stage in measure(reference_pdf(pages))}
+
+
+def test_reference_paper_stays_within_budget():
+    assert check("synthetic (10 pages)", reference_pdf(10), DEFAULT_BUDGETS) == []
+
+
+def test_per_page_peak_does_not_grow_with_the_paper():
+    short, long = per_page(5), per_page(20)
+
+    for name, budget in DEFAULT_BUDGETS.items():
+        assert long[name] <= budget, name
+    # Pages are released as they are parsed, so the whole-document peak
+    # spread over more pages can only shrink
+    assert long["parse_pdf"] <= short["parse_pdf"]
@@ -0,0 +1,84 @@
+"""MinHash signatures and LSH banding."""
+import random
+import statistics
+
+from app.services.minhash import (
+    NUM_BANDS, LSHIndex, band_keys, estimate_similarity, minhash_signature, shingles
+)
+
+QUESTION = (
+    "Explain how an increase in the price of oil is likely to affect the costs of "
+    "production and the profits of airline companies in the short run."
+)
+# Same question with two words changed and different numbering and marks
+REWORDED = (
+    "3 (b) Explain how an increase in the price of oil is likely to affect the costs of "
+    "production and the revenues of airline firms in the short run. [9 marks]"
+)
+UNRELATED = (
+    "Evaluate whether a central bank should target the rate of inflation rather than "
+    "the level of unemployment when setting monetary policy."
+)
+
+
+def jaccard(a: str, b: str) -> float:
+    x, y = shingles(a), shingles(b)
+    return len(x & y) / len(x | y)
+
+
+def shared_bands(a: str, b: str) -> set:
+    return set(band_keys(minhash_signature(a))) & set(band_keys(minhash_signature(b)))
+
+
+def test_numbers_do_not_change_the_signature():
+    assert minhash_signature(f"4 {QUESTION} [6]") == minhash_signature(QUESTION)
+
+
+def test_short_text_has_no_signature():
+    assert minhash_signature("1 (a) Define inflation.") is None
+
+
+def test_signatures_are_stable():
+    # Signatures are stored, so the permutations must not change between releases
+    keys = band_keys(minhash_signature(QUESTION))
+    assert len(keys) == NUM_BANDS
+    assert keys[0] == "0:66895c7f8832437e"
+
+
+def test_similarity_estimate_is_unbiased():
+    rng = random.Random(7)
+    words = QUESTION.lower().rstrip(".").split() + UNRELATED.lower().rstrip(".").split()
+    errors = []
+    for _ in range(200):
+        text = [rng.choice(words) for _ in range(40)]
+        edited = list(text)
+        for _ in range(rng.randint(1, 10)):
+            edited[rng.randrange(len(edited))] = rng.choice(words)
+        a, b = " ".join(text), " ".join(edited)
+        errors.append(estimate_similarity(minhash_signature(a), minhash_signature(b)) - jaccard(a, b))
+
+    # Each estimate has a standard error of at most 1/16 with 64 permutations
+    assert abs(statistics.mean(errors)) < 0.02
+    assert statistics.pstdev(errors) < 1 / 16
+
+
+def test_near_duplicates_share_a_band():
+    assert jaccard(QUESTION, REWORDED) > 0.5
+    assert shared_bands(QUESTION, REWORDED)
+
+
+def test_unrelated_questions_share_no_band():
+    assert jaccard(QUESTION, UNRELATED) < 0.1
+    assert not shared_bands(QUESTION, UNRELATED)
+
+
+def test_index_finds_near_duplicates_only():
+    index = LSHIndex()
+    for key, text in (("original", QUESTION), ("reworded", REWORDED), ("other", UNRELATED)):
+        index.add(key, minhash_signature(text))
+
+    hits = index.query(minhash_signature(QUESTION), threshold=0.5, exclude=["original"])
+
+    assert [key for key, _ in hits] == ["reworded"]
+    assert hits[0][1] == estimate_similarity(minhash_signature(QUESTION), minhash_signature(REWORDED))
+    assert "other" not in index.candidates(minhash_signature(QUESTION))
@@ -0,0 +1,76 @@
+"""Page classification in PDFParser."""
+import fitz
+import pytest
+
+from app.services.pdf_parser import (
+    PAGE_ADDITIONAL, PAGE_BLANK, PAGE_COVER, PAGE_QUESTION, PDFParser
+)
+
+INSTRUCTIONS = ("Answer all questions. Use black ink. Time allowed: 1 hour.", "Candidate number")
+
+
+def classify(*lines: str, page_num: int = 0, right: tuple = ()) -> str:
+    """Classify a page of left-aligned ``lines``, plus ``right`` lines near the right margin."""
+    doc = fitz.open()
+    page = doc.new_page()
+    for index, line in enumerate(lines):
+        page.insert_text((72, 72 + index * 16), line, fontsize=11)
+    for index, line in enumerate(right):
+        page.insert_text((500, 300 + index * 16), line, fontsize=11)
+    return PDFParser()._classify_page(page, page_num)
+
+
+@pytest.mark.parametrize("allocation", ["[6 marks]", "(4 marks)", "[3]", "[1 mark]"])
+def test_any_mark_allocation_makes_a_question_page(allocation):
+    assert classify(*INSTRUCTIONS, f"1 Define opportunity cost. {allocation}") == PAGE_QUESTION
+
+
+def test_right_aligned_bare_mark_makes_a_question_page():
+    assert classify(*INSTRUCTIONS, "1 Define opportunity cost.", right=("(2)",)) == PAGE_QUESTION
+
+
+@pytest.mark.parametrize("line", [
+    "(1) Answer all questions in the spaces provided.",
+    "Read each question carefully (2) before answering.",
+    "See Figure 1 (3)",
+])
+def test_numbers_in_brackets_are_not_mark_allocations(line):
+    assert classify(*INSTRUCTIONS, line) == PAGE_COVER
+
+
+def test_additional_page_heading_is_skipped():
+    assert classify(
+        "Additional page, if required.",
+        "Write the question numbers in the left-hand margin.",
+        page_num=11
+    ) == PAGE_ADDITIONAL
+
+
+def test_question_page_mentioning_the_additional_page_is_kept():
+    assert classify(
+        "5 Discuss whether the government should subsidise public transport.",
+        "You may continue your answer on the additional page at the back of this booklet.",
+        "Consider the likely effects on consumers and producers.",
+        "Additional page references must state the question number.",
+        page_num=6
+    ) == PAGE_QUESTION
+
+
+def test_short_page_without_a_blank_phrase_is_kept():
+    assert classify("5 State two causes of inflation.", page_num=4) == PAGE_QUESTION
+
+
+def test_page_saying_it_is_blank_is_skipped():
+    assert classify("BLANK PAGE", "Turn over", page_num=5) == PAGE_BLANK
+
+
+def test_cover_page_needs_specific_instruction_phrases():
+    assert classify(
+        "Instructions", "Information", "Materials", "For this paper you need a calculator."
+    ) == PAGE_QUESTION
+    assert classify(
+        "Instructions",
+        "Answer all questions. Use black ink or black ball-point pen.",
+        "Time allowed: 2 hours",
+        "Candidate number"
+    ) == PAGE_COVER
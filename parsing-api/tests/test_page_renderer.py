@@ -0,0 +1,67 @@
+"""Request coalescing in PageRenderer."""
+import asyncio
+
+import pytest
+
+from app.services.page_renderer import DiskLRUCache, PageRenderer
+
+
+@pytest.fixture
+def renderer(tmp_path):
+    renderer = PageRenderer(DiskLRUCache(str(tmp_path), 2**20), [1.0], 256, max_workers=1)
+    yield renderer
+    renderer.shutdown()
+
+
+def test_concurrent_callers_share_one_run(renderer):
+    runs = []
+
+    async def produce():
+        runs.append(1)
+        await asyncio.sleep(0.01)
+        return "tile"
+
+    async def main():
+        return await asyncio.gather(*[renderer._coalesce("key", produce) for _ in range(3)])
+
+    assert asyncio.run(main()) == ["tile"] * 3
+    assert len(runs) == 1
+    assert renderer._inflight == {}
+
+
+def test_cancelled_first_caller_does_not_strand_the_others(renderer):
+    async def main():
+        started = asyncio.Event()
+        finish = asyncio.Event()
+
+        async def produce():
+            started.set()
+            await finish.wait()
+            return "tile"
+
+        leader = asyncio.ensure_future(renderer._coalesce("key", produce))
+        await started.wait()
+        follower = asyncio.ensure_future(renderer._coalesce("key", produce))
+        await asyncio.sleep(0)
+
+        # Client disconnect
+        leader.cancel()
+        await asyncio.gather(leader, return_exceptions=True)
+        finish.set()
+        return leader.cancelled(), await asyncio.wait_for(follower, timeout=1)
+
+    assert asyncio.run(main()) == (True, "tile")
+    assert renderer._inflight == {}
+
+
+def test_failure_reaches_every_caller(renderer):
+    async def produce():
+        await asyncio.sleep(0.01)
+        raise ValueError("no such page")
+
+    async def main():
+        return await asyncio.gather(
+            *[renderer._coalesce("key", produce) for _ in range(2)], return_exceptions=True
+        )
+
+    assert [type(result) for result in asyncio.run(main())] == [ValueError, ValueError]
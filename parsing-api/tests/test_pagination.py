@@ -0,0 +1,111 @@
+"""Paper listing cursors and the /papers endpoint."""
+import base64
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.main import app
+from app.services.db_service import PAPER_LIST_ORDER
+from app.utils.pagination import decode_cursor, encode_cursor
+
+TYPES = list(PAPER_LIST_ORDER.values())
+
+
+def raw_cursor(payload: bytes) -> str:
+    return base64.urlsafe_b64encode(payload).decode("ascii").rstrip("=")
+
+
+MALFORMED = [
+    "not a cursor!",
+    raw_cursor(b"\xff\xfe"),
+    raw_cursor(b"{not json"),
+    encode_cursor({"exam_board": "AQA"}),
+    encode_cursor(["AQA", 2020, "June", 1]),
+    encode_cursor(["AQA", "2020", "June", 1, "id"]),
+    encode_cursor(["AQA", 2020, "June", True, "id"]),
+    encode_cursor(["AQA", 2020.5, "June", 1, "id"]),
+    encode_cursor(["AQA", 2**40, "June", 1, "id"]),
+    encode_cursor(["AQA", 2020, None, 1, "id"]),
+    encode_cursor(["AQA\x00", 2020, "June", 1, "id"]),
+]
+
+
+def test_cursor_round_trip():
+    values = ["AQA", 2020, "June", 1, "9b1d-é"]
+
+    cursor = encode_cursor(values)
+
+    assert "=" not in cursor
+    assert decode_cursor(cursor, TYPES) == values
+
+
+@pytest.mark.parametrize("cursor", MALFORMED)
+def test_malformed_cursor_is_rejected(cursor):
+    with pytest.raises(ValueError):
+        decode_cursor(cursor, TYPES)
+
+
+@pytest.fixture
+def client(fake_db):
+    return TestClient(app)
+
+
+@pytest.fixture
+def catalogue(fake_db):
+    """Seven papers, four of which share every sort column but the id."""
+    papers = [
+        ("AQA", 2019, "June", 1, "p-5"),
+        ("AQA", 2020, "June", 1, "p-3"),
+        ("AQA", 2020, "June", 1, "p-1"),
+        ("AQA", 2020, "June", 1, "p-4"),
+        ("AQA", 2020, "June", 1, "p-2"),
+        ("AQA", 2020, "June", 2, "p-0"),
+        ("Edexcel", 2018, "Nov", 1, "p-6"),
+    ]
+    fake_db.tables["Paper"] = [
+        {
+            **dict(zip(PAPER_LIST_ORDER, paper)),
+            "title": paper[-1], "subject": "Economics", "level": "A-Level",
+            "total_marks": 80, "uploaded_at": "2024-01-01T00:00:00", "ingest_status": "complete"
+        }
+        for paper in papers
+    ]
+    return [paper[-1] for paper in sorted(papers)]
+
+
+@pytest.mark.parametrize("limit", [1, 2, 3, 7, 50])
+def test_walking_pages_lists_every_paper_once(client, catalogue, limit):
+    seen, cursor, pages = [], None, 0
+    while True:
+        params = {"limit": limit, **({"cursor": cursor} if cursor else {})}
+        response = client.get("/api/parse/papers", params=params)
+        assert response.status_code == 200
+        body = response.json()
+        assert len(body["papers"]) <= limit
+        seen += [paper["id"] for paper in body["papers"]]
+        pages += 1
+        cursor = body["next_cursor"]
+        if cursor is None:
+            break
+
+    assert seen == catalogue
+    assert pages == -(-len(catalogue) // limit)
+
+
+def test_filters_apply_across_pages(client, catalogue):
+    first = client.get("/api/parse/papers", params={"year": 2020, "limit": 3}).json()
+    second = client.get(
+        "/api/parse/papers", params={"year": 2020, "limit": 3, "cursor": first["next_cursor"]}
+    ).json()
+
+    ids = [paper["id"] for paper in first["papers"] + second["papers"]]
+    assert ids == ["p-1", "p-2", "p-3", "p-4", "p-0"]
+    assert second["next_cursor"] is None
+
+
+@pytest.mark.parametrize("cursor", MALFORMED)
+def test_malformed_cursor_is_a_bad_request(client, catalogue, cursor):
+    response = client.get("/api/parse/papers", params={"cursor": cursor})
+
+    assert response.status_code == 400
+    assert response.json()["detail"] == "Invalid cursor"
@@ -0,0 +1,155 @@
+"""Spool file handling and admission control in ParseExecutor."""
+import asyncio
+import json
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import httpx
+import pytest
+
+from app.main import app
+from app.routers import parse as parse_router
+from app.services import parse_pool
+from app.services.docpack import pack_document
+from app.services.parse_pool import ParseExecutor
+from app.services.pdf_parser import PDFParser
+from tests.conftest import make_pdf
+
+
+@pytest.fixture
+def executor(tmp_path):
+    executor = ParseExecutor(
+        max_workers=1, max_concurrency=1, max_queue=1,
+        queue_timeout=5, retry_after=7, aging_rate=0.0, spool_dir=str(tmp_path)
+    )
+    # Threads instead of spawned processes, so the worker can be patched
+    executor._pool.shutdown()
+    executor._pool = ThreadPoolExecutor(max_workers=1)
+    yield executor
+    executor.shutdown()
+
+
+@pytest.fixture
+def held_worker(monkeypatch):
+    """Replace the spool worker with one that waits for ``release`` before writing."""
+    pdf = make_pdf(pages=1, images=False)
+    packed = pack_document(PDFParser().parse_pdf(pdf))
+    started, release = threading.Event(), threading.Event()
+
+    def spool(pdf_bytes, spool_dir):
+        started.set()
+        release.wait(10)
+        path = os.path.join(spool_dir, f"doc-{threading.get_ident()}-{os.urandom(4).hex()}.pack")
+        with open(path, "wb") as handle:
+            handle.write(packed)
+        return path
+
+    monkeypatch.setattr(parse_pool, "parse_pdf_to_spool", spool)
+    return pdf, started, release
+
+
+def test_parse_removes_the_spool_file(executor, held_worker, tmp_path):
+    pdf, _, release = held_worker
+    release.set()
+
+    parsed = asyncio.run(executor.parse(pdf))
+
+    assert parsed["questions"]
+    assert os.listdir(tmp_path) == []
+
+
+def test_cancelled_parse_removes_the_file_written_afterwards(executor, held_worker, tmp_path):
+    pdf, started, release = held_worker
+
+    async def main():
+        request = asyncio.create_task(executor.parse(pdf))
+        await asyncio.to_thread(started.wait, 10)
+        request.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await request
+        # The worker writes its file only after the caller has gone
+        release.set()
+        while executor.running:
+            await asyncio.sleep(0.01)
+        await asyncio.sleep(0.01)
+
+    asyncio.run(main())
+
+    assert os.listdir(tmp_path) == []
+
+
+async def post_upload(pdf: bytes) -> httpx.Response:
+    """Upload a PDF through the API on the running event loop."""
+    metadata = {"exam_board": "AQA", "year": 2019, "session": "June", "paper_number": 1}
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        return await client.post(
+            "/api/parse/upload",
+            files={"file": ("paper.pdf", pdf, "application/pdf")},
+            data={"metadata": json.dumps(metadata)}
+        )
+
+
+@pytest.fixture
+def api(executor, fake_db, fake_storage, monkeypatch):
+    """Route API parses to the test executor."""
+    monkeypatch.setattr(parse_router, "get_parse_executor", lambda: executor)
+    return executor
+
+
+def test_full_queue_is_rejected_with_retry_after(api, held_worker):
+    pdf, started, release = held_worker
+
+    async def main():
+        # One parse running and one waiting fill the pool and its queue
+        running = asyncio.create_task(api.parse(pdf))
+        await asyncio.to_thread(started.wait, 10)
+        waiting = asyncio.create_task(api.parse(pdf))
+        while api.waiting < 1:
+            await asyncio.sleep(0.001)
+
+        response = await post_upload(pdf)
+
+        release.set()
+        await asyncio.gather(running, waiting)
+        return response
+
+    response = asyncio.run(main())
+
+    assert response.status_code == 503
+    assert response.headers["Retry-After"] == "7"
+    assert "Parse queue is full" in response.json()["detail"]
+    assert api.rejected == 1
+
+
+def test_queue_wait_timeout_is_rejected_with_retry_after(api, held_worker):
+    pdf, started, release = held_worker
+    api.queue_timeout = 0.05
+
+    async def main():
+        running = asyncio.create_task(api.parse(pdf))
+        await asyncio.to_thread(started.wait, 10)
+
+        response = await post_upload(pdf)
+
+        release.set()
+        await running
+        return response
+
+    response = asyncio.run(main())
+
+    assert response.status_code == 503
+    assert response.headers["Retry-After"] == "7"
+    assert "Timed out waiting for a parse slot" in response.json()["detail"]
+    assert api.waiting == 0
+
+
+def test_upload_succeeds_once_a_slot_is_free(api, held_worker):
+    pdf, _, release = held_worker
+    release.set()
+
+    response = asyncio.run(post_upload(pdf))
+
+    assert response.status_code == 200
+    assert response.json()["questions_count"] == 1
@@ -0,0 +1,195 @@
+"""
+PostgreSQL COPY backend, against the database in DATABASE_URL.
+
+The database needs the Prisma schema (``npx prisma db push``) and
+prisma/sql/*.sql applied. Tests that write to it are skipped when
+DATABASE_URL is unset.
+"""
+import asyncio
+import hashlib
+import os
+import uuid
+
+import pytest
+
+psycopg = pytest.importorskip("psycopg")
+
+from app.services.pdf_parser import PDFParser
+from app.services.pg_service import PostgresDatabaseService, close_connection_pool, to_libpq_url
+from tests.conftest import make_pdf
+
+requires_database = pytest.mark.skipif(
+    not os.environ.get("DATABASE_URL"), reason="DATABASE_URL is not set"
+)
+
+
+def query(statement: str, params: tuple) -> list:
+    """Run a query on a separate connection, outside the service under test."""
+    with psycopg.connect(to_libpq_url(os.environ["DATABASE_URL"])) as conn:
+        return conn.execute(statement, params).fetchall()
+
+
+@pytest.fixture
+def service(settings_env, fake_storage):
+    settings_env(DB_BACKEND="postgres")
+    yield PostgresDatabaseService()
+    close_connection_pool()
+
+
+@pytest.fixture
+def paper():
+    """A PDF no other test run has stored, with its metadata; removed afterwards."""
+    pdf = make_pdf(marker=uuid.uuid4().hex)
+    metadata = {"exam_board": "AQA", "year": 2019, "session": "June", "paper_number": 1}
+    yield pdf, metadata
+    query(
+        'DELETE FROM "Paper" WHERE pdf_hash = %s RETURNING id',
+        (hashlib.sha256(pdf).hexdigest(),)
+    )
+
+
+def test_builds_rows_with_atlases_before_connecting(settings_env, fake_storage):
+    # Row building runs before any connection is needed
+    settings_env(
+        DB_BACKEND="postgres",
+        DATABASE_URL="postgresql://localhost/unused",
+        IMAGE_ATLAS="true"
+    )
+    service = PostgresDatabaseService()
+    parsed = PDFParser().parse_pdf(make_pdf(icons=3))
+
+    questions, contents = asyncio.run(service._build_question_rows(
+        "00000000-0000-0000-0000-000000000001", parsed
+    ))
+
+    assert len(questions) == len(parsed["questions"])
+    images = [c for c in contents if c["content_type"] == "IMAGE"]
+    sprites = [c for c in images if c["image_atlas"]]
+    assert len(sprites) == 3
+    assert len({c["image_url"] for c in sprites}) == 1
+    assert sprites[0]["image_url"].endswith("_atlas.webp")
+    # The large image is stored on its own
+    assert [c for c in images if not c["image_atlas"]][0]["image_variants"]
+
+
+@requires_database
+def test_copy_ingest_writes_every_row(service, paper):
+    pdf, metadata = paper
+    parsed = PDFParser().parse_pdf(pdf)
+
+    stored = asyncio.run(service.store_parsed_paper(parsed, metadata, pdf))
+
+    paper_id = stored["id"]
+    assert query('SELECT ingest_status FROM "Paper" WHERE id = %s', (paper_id,)) == [("complete",)]
+    questions = query('SELECT id FROM "Question" WHERE paper_id = %s', (paper_id,))
+    assert len(questions) == len(parsed["questions"])
+    content_count = query(
+        'SELECT count(*) FROM "QuestionContent" c JOIN "Question" q ON q.id = c.question_id '
+        "WHERE q.paper_id = %s",
+        (paper_id,)
+    )[0][0]
+    assert content_count == sum(len(q["content"]) for q in parsed["questions"])
+    styles = query('SELECT count(*) FROM "PaperStyle" WHERE paper_id = %s', (paper_id,))
+    assert styles == [(len(parsed["styles"]),)]
+
+
+@requires_database
+def test_failed_copy_rolls_back_the_whole_paper(service, paper, monkeypatch):
+    pdf, metadata = paper
+    build_rows = service._build_question_rows
+
+    async def corrupt_last_row(paper_id, parsed_data):
+        questions, contents = await build_rows(paper_id, parsed_data)
+        # Rejected by the ContentType enum once Paper and Question are copied
+        contents[-1]["content_type"] = "NOT_A_TYPE"
+        return questions, contents
+
+    monkeypatch.setattr(service, "_build_question_rows", corrupt_last_row)
+
+    with pytest.raises(psycopg.DataError):
+        asyncio.run(service.store_parsed_paper(PDFParser().parse_pdf(pdf), metadata, pdf))
+
+    pdf_hash = hashlib.sha256(pdf).hexdigest()
+    assert query('SELECT id FROM "Paper" WHERE pdf_hash = %s', (pdf_hash,)) == []
+    assert query(
+        'SELECT q.id FROM "Question" q JOIN "Paper" p ON p.id = q.paper_id '
+        "WHERE p.pdf_hash = %s",
+        (pdf_hash,)
+    ) == []
+
+
+@requires_database
+def test_get_paper_round_trip(service, paper):
+    pdf, metadata = paper
+    parsed = PDFParser().parse_pdf(pdf)
+    stored = asyncio.run(service.store_parsed_paper(parsed, metadata, pdf))
+
+    loaded = asyncio.run(service.get_paper(stored["id"], expand_styles=True))
+
+    assert loaded["id"] == stored["id"]
+    assert loaded["ingest_status"] == "complete"
+    assert [q["question_number"] for q in loaded["questions"]] == [
+        q["question_number"] for q in parsed["questions"]
+    ]
+    for loaded_question, parsed_question in zip(loaded["questions"], parsed["questions"]):
+        assert [c["content_type"] for c in loaded_question["content"]] == [
+            c["type"] for c in parsed_question["content"]
+        ]
+        for content in loaded_question["content"]:
+            if content["content_type"] == "TEXT":
+                assert content["font_size"] is not None
+            elif content["content_type"] == "IMAGE":
+                assert content["image_url"].startswith("http://storage.test/shared/")
+    assert len(loaded["styles"]) == len(parsed["styles"])
+
+
+@requires_database
+def test_concurrent_ingests_of_one_pdf_store_it_once(service, paper):
+    pdf, metadata = paper
+
+    async def ingest_twice():
+        return await asyncio.gather(*[
+            service.store_parsed_paper(PDFParser().parse_pdf(pdf), metadata, pdf)
+            for _ in range(2)
+        ])
+
+    first, second = asyncio.run(ingest_twice())
+
+    assert first["id"] == second["id"]
+    assert query('SELECT ingest_status FROM "Paper" WHERE id = %s', (first["id"],)) == [("complete",)]
+    questions = query('SELECT count(*) FROM "Question" WHERE paper_id = %s', (first["id"],))
+    assert questions == [(3,)]
+
+
+@requires_database
+def test_list_papers_walks_equal_sort_keys_in_id_order(service):
+    # An exam board no other paper has keeps the listing to these rows
+    board = f"Board {uuid.uuid4().hex}"
+    keys = [(2020, "June", 1)] * 4 + [(2019, "June", 2), (2020, "Nov", 1)]
+    # Hex ids sort the same under any collation
+    ids = [uuid.uuid4().hex for _ in keys]
+    for paper_id, (year, session, number) in zip(ids, keys):
+        query(
+            'INSERT INTO "Paper" (id, title, exam_board, subject, level, year, session, paper_number) '
+            "VALUES (%s, 'Listing', %s, 'Economics', 'A-Level', %s, %s, %s) RETURNING id",
+            (paper_id, board, year, session, number)
+        )
+    query(
+        'INSERT INTO "Paper" (id, title, exam_board, subject, level, year, session, paper_number, '
+        "ingest_status) VALUES (%s, 'Pending', %s, 'Economics', 'A-Level', 2020, 'June', 1, "
+        "'pending') RETURNING id",
+        (uuid.uuid4().hex, board)
+    )
+    expected = [paper_id for _, paper_id in sorted(zip(keys, ids))]
+
+    try:
+        seen, cursor = [], None
+        while True:
+            papers, cursor = asyncio.run(service.list_papers(exam_board=board, limit=2, cursor=cursor))
+            seen += [paper["id"] for paper in papers]
+            if cursor is None:
+                break
+        assert seen == expected
+        assert all(paper["question_count"] == 0 for paper in papers)
+    finally:
+        query('DELETE FROM "Paper" WHERE exam_board = %s RETURNING id', (board,))
@@ -0,0 +1,231 @@
+"""Retries, timeouts and circuit breakers."""
+import asyncio
+import logging
+
+import httpx
+import pytest
+from supabase import PostgrestAPIError
+
+from app.utils import resilience
+from app.utils.resilience import (
+    CircuitBreaker, CircuitOpenError, call_with_retry, call_with_retry_sync, get_breaker, is_transient
+)
+
+
+@pytest.fixture(autouse=True)
+def fresh_breakers(settings_env, monkeypatch):
+    """No backoff delay and a new set of breakers for each test."""
+    settings_env(
+        RETRY_ATTEMPTS="3", RETRY_BASE_DELAY="0",
+        CIRCUIT_FAILURE_THRESHOLD="3", CIRCUIT_RESET_SECONDS="30"
+    )
+    monkeypatch.setattr(resilience, "_breakers", {})
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    """Controllable time.monotonic for the breaker's reset timeout."""
+    now = [1000.0]
+    monkeypatch.setattr(resilience.time, "monotonic", lambda: now[0])
+    return now
+
+
+def flaky(failures, error=lambda: httpx.ConnectError("refused"), result="ok"):
+    """Operation failing ``failures`` times before returning ``result``."""
+    calls = []
+
+    async def operation():
+        calls.append(1)
+        if len(calls) <= failures:
+            raise error()
+        return result
+
+    return operation, calls
+
+
+def test_transient_failures_are_retried(caplog):
+    operation, calls = flaky(2)
+
+    with caplog.at_level(logging.WARNING, logger="app.utils.resilience"):
+        assert asyncio.run(call_with_retry("database", operation, timeout=1)) == "ok"
+
+    assert len(calls) == 3
+    assert len(caplog.records) == 2
+    assert "database call failed (ConnectError: refused), retrying" in caplog.messages[0]
+    assert get_breaker("database").stats()["state"] == "closed"
+
+
+def test_last_failure_is_raised_when_retries_run_out():
+    operation, calls = flaky(5)
+
+    with pytest.raises(httpx.ConnectError):
+        asyncio.run(call_with_retry("database", operation, timeout=1))
+
+    assert len(calls) == 3
+
+
+def test_errors_the_backend_answered_are_not_retried():
+    operation, calls = flaky(1, error=lambda: ValueError("bad query"))
+
+    with pytest.raises(ValueError):
+        asyncio.run(call_with_retry("database", operation, timeout=1))
+
+    assert len(calls) == 1
+    assert get_breaker("database").stats()["consecutive_failures"] == 0
+
+
+def test_non_idempotent_calls_get_one_attempt():
+    operation, calls = flaky(1)
+
+    with pytest.raises(httpx.ConnectError):
+        asyncio.run(call_with_retry("database", operation, timeout=1, idempotent=False))
+
+    assert len(calls) == 1
+
+
+def test_slow_attempts_time_out_and_are_retried():
+    calls = []
+
+    async def operation():
+        calls.append(1)
+        if len(calls) == 1:
+            await asyncio.sleep(10)
+        return "ok"
+
+    assert asyncio.run(call_with_retry("storage", operation, timeout=0.05)) == "ok"
+    assert len(calls) == 2
+    assert get_breaker("storage").stats()["failures"] == 1
+
+
+def test_sync_calls_are_retried():
+    calls = []
+
+    def operation():
+        calls.append(1)
+        if len(calls) < 3:
+            raise httpx.ReadTimeout("slow")
+        return "ok"
+
+    assert call_with_retry_sync("storage", operation) == "ok"
+    assert len(calls) == 3
+
+
+def test_breaker_opens_after_consecutive_failures(clock):
+    breaker = CircuitBreaker("database", failure_threshold=3, reset_timeout=30)
+    for _ in range(2):
+        breaker.before_call()
+        breaker.record_failure()
+    assert breaker.state == "closed"
+
+    breaker.before_call()
+    breaker.record_failure()
+
+    assert breaker.state == "open"
+    with pytest.raises(CircuitOpenError) as raised:
+        breaker.before_call()
+    assert raised.value.retry_after == 30
+    clock[0] += 20.5
+    with pytest.raises(CircuitOpenError) as raised:
+        breaker.before_call()
+    assert raised.value.retry_after == 10
+    assert breaker.stats()["rejected"] == 2
+    assert breaker.stats()["times_opened"] == 1
+
+
+def test_success_resets_the_failure_count():
+    breaker = CircuitBreaker("database", failure_threshold=3, reset_timeout=30)
+    for _ in range(2):
+        breaker.record_failure()
+    breaker.record_success()
+    for _ in range(2):
+        breaker.record_failure()
+
+    assert breaker.state == "closed"
+
+
+def open_breaker(clock) -> CircuitBreaker:
+    breaker = CircuitBreaker("database", failure_threshold=1, reset_timeout=30)
+    breaker.before_call()
+    breaker.record_failure()
+    clock[0] += 30
+    return breaker
+
+
+def test_half_open_breaker_admits_one_trial_call(clock):
+    breaker = open_breaker(clock)
+
+    breaker.before_call()
+
+    assert breaker.state == "half_open"
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call()
+
+
+def test_successful_trial_closes_the_breaker(clock):
+    breaker = open_breaker(clock)
+    breaker.before_call()
+
+    breaker.record_success()
+
+    assert breaker.state == "closed"
+    breaker.before_call()
+    breaker.before_call()
+
+
+def test_failed_trial_reopens_the_breaker(clock):
+    breaker = open_breaker(clock)
+    breaker.before_call()
+
+    breaker.record_failure()
+
+    assert breaker.state == "open"
+    assert breaker.stats()["times_opened"] == 2
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call()
+
+
+def test_abandoned_trial_lets_another_through(clock):
+    breaker = open_breaker(clock)
+    breaker.before_call()
+
+    breaker.abandon_call()
+
+    breaker.before_call()
+    assert breaker.state == "half_open"
+
+
+def test_open_breaker_fails_fast_without_calling(clock):
+    operation, calls = flaky(10)
+    with pytest.raises(httpx.ConnectError):
+        asyncio.run(call_with_retry("database", operation, timeout=1))
+    assert get_breaker("database").state == "open"
+
+    with pytest.raises(CircuitOpenError):
+        asyncio.run(call_with_retry("database", operation, timeout=1))
+
+    assert len(calls) == 3
+
+
+def test_breaker_recovers_through_a_trial_call(clock):
+    operation, calls = flaky(3)
+    with pytest.raises(httpx.ConnectError):
+        asyncio.run(call_with_retry("database", operation, timeout=1))
+    clock[0] += 30
+
+    assert asyncio.run(call_with_retry("database", operation, timeout=1)) == "ok"
+
+    assert get_breaker("database").state == "closed"
+
+
+@pytest.mark.parametrize("error, transient", [
+    (asyncio.TimeoutError(), True),
+    (httpx.ConnectError("refused"), True),
+    (ConnectionResetError(), True),
+    (PostgrestAPIError({"code": "PGRST001", "message": "no connection"}), True),
+    (PostgrestAPIError({"code": "40P01", "message": "deadlock"}), True),
+    (PostgrestAPIError({"code": "23505", "message": "duplicate key"}), False),
+    (ValueError("bad"), False),
+    (KeyError("id"), False),
+])
+def test_transient_errors(error, transient):
+    assert is_transient(error) is transient
@@ -0,0 +1,95 @@
+"""Parse slot scheduling."""
+import asyncio
+
+import pytest
+
+from app.services import scheduler as scheduler_module
+from app.services.scheduler import SlotScheduler
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    """Controllable time.monotonic for the scheduler."""
+    now = [0.0]
+    monkeypatch.setattr(scheduler_module.time, "monotonic", lambda: now[0])
+    return now
+
+
+async def grant_order(scheduler, held, jobs, clock=None):
+    """
+    Queue jobs behind already held slots, free the held slots, and record the order jobs run in.
+
+    Args:
+        scheduler: Scheduler whose slots are all taken by ``held`` clients
+        held: Clients holding the slots; only the first one's slot is freed
+        jobs: (name, cost, client, enqueue time) tuples
+        clock: Fake clock, set to each job's enqueue time as it is queued
+    """
+    order = []
+
+    async def job(name, cost, client):
+        await scheduler.acquire(cost, client, timeout=5)
+        order.append(name)
+        await asyncio.sleep(0)
+        scheduler.release(client)
+
+    tasks = []
+    for name, cost, client, enqueued in jobs:
+        if clock is not None:
+            clock[0] = enqueued
+        tasks.append(asyncio.ensure_future(job(name, cost, client)))
+        await asyncio.sleep(0)
+    scheduler.release(held[0])
+    await asyncio.gather(*tasks)
+    return order
+
+
+async def hold(scheduler, *clients):
+    for client in clients:
+        await scheduler.acquire(1, client, timeout=1)
+
+
+def test_cheapest_job_runs_first(clock):
+    async def main():
+        scheduler = SlotScheduler(slots=1, aging_rate=0)
+        await hold(scheduler, "holder")
+        return await grant_order(scheduler, ["holder"], [
+            ("booklet", 40, "a", 0), ("paper", 12, "b", 0), ("insert", 2, "c", 0)
+        ])
+
+    assert asyncio.run(main()) == ["insert", "paper", "booklet"]
+
+
+def test_aged_job_overtakes_a_cheaper_one(clock):
+    async def main():
+        scheduler = SlotScheduler(slots=1, aging_rate=1.0)
+        await hold(scheduler, "holder")
+        return await grant_order(scheduler, ["holder"], [
+            # Waiting 30s brings the booklet's score to -10, below the paper's 2
+            ("booklet", 20, "a", 0), ("paper", 2, "b", 30)
+        ], clock)
+
+    assert asyncio.run(main()) == ["booklet", "paper"]
+
+
+def test_busy_client_does_not_starve_others(clock):
+    async def main():
+        scheduler = SlotScheduler(slots=2, aging_rate=0)
+        # Client "bulk" already has a job running in the other slot
+        await hold(scheduler, "holder", "bulk")
+        return await grant_order(scheduler, ["holder"], [
+            ("bulk-2", 1, "bulk", 0), ("bulk-3", 1, "bulk", 0), ("other", 1.5, "other", 0)
+        ])
+
+    assert asyncio.run(main())[0] == "other"
+
+
+def test_timed_out_job_leaves_the_queue():
+    async def main():
+        scheduler = SlotScheduler(slots=1, aging_rate=0)
+        await hold(scheduler, "holder")
+        with pytest.raises(asyncio.TimeoutError):
+            await scheduler.acquire(1, "late", timeout=0.01)
+        return scheduler.waiting, scheduler.running
+
+    assert asyncio.run(main()) == (0, 1)
@@ -0,0 +1,69 @@
+"""Content-addressed uploads in StorageService."""
+import asyncio
+
+import pytest
+from supabase import StorageException
+
+from app.utils import storage
+from app.utils.storage import StorageService
+
+
+class FakeBucket:
+    """Bucket API holding ``stored`` paths; ``racing`` paths appear just after being listed."""
+
+    def __init__(self, stored=(), racing=()):
+        self.stored = set(stored)
+        self.racing = set(racing)
+        self.uploads = []
+
+    async def list(self, folder, options):
+        listed = [
+            {"name": path.split("/", 1)[1]} for path in self.stored
+            if path.startswith(f"{folder}/") and options["search"] in path
+        ]
+        self.stored |= self.racing
+        return listed
+
+    async def upload(self, path, file, file_options):
+        self.uploads.append(path)
+        if path in self.stored:
+            raise StorageException({
+                "statusCode": 400, "error": "Duplicate", "message": "The resource already exists"
+            })
+        self.stored.add(path)
+
+    async def get_public_url(self, path):
+        return f"http://storage.test/{path}"
+
+
+@pytest.fixture
+def service(monkeypatch):
+    monkeypatch.setattr(storage, "_known_shared", storage.OrderedDict())
+    return StorageService()
+
+
+def use_bucket(monkeypatch, service, bucket):
+    async def fake_bucket():
+        return bucket
+
+    monkeypatch.setattr(service, "_bucket", fake_bucket)
+
+
+def test_stored_image_is_not_sent_again(monkeypatch, service):
+    bucket = FakeBucket(stored={"shared/abc123.png"})
+    use_bucket(monkeypatch, service, bucket)
+
+    url = asyncio.run(service.upload_shared_image(b"png", "png", "abc123"))
+
+    assert url == "http://storage.test/shared/abc123.png"
+    assert bucket.uploads == []
+
+
+def test_upload_taken_by_a_concurrent_ingest_returns_its_url(monkeypatch, service):
+    bucket = FakeBucket(racing={"shared/abc123.png"})
+    use_bucket(monkeypatch, service, bucket)
+
+    url = asyncio.run(service.upload_shared_image(b"png", "png", "abc123"))
+
+    assert url == "http://storage.test/shared/abc123.png"
+    assert bucket.uploads == ["shared/abc123.png"]
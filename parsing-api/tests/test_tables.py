@@ -0,0 +1,94 @@
+"""Ruled table extraction and the rows it saves."""
+import fitz  # PyMuPDF
+
+from app.models.response import TableData
+from app.services.pdf_parser import PDFParser
+
+TABLE_TOP = 150
+
+
+def table_pdf(bold_header: bool = False, merged_row: int = -1, question_above: bool = True) -> bytes:
+    """
+    Build one page with a ruled 4x3 table under question 1.
+
+    Args:
+        bold_header: Set the first row in bold
+        merged_row: Row whose cells are merged into one across the table
+        question_above: Put the question number above the table (else below it)
+    """
+    doc = fitz.open()
+    page = doc.new_page()
+    question_y = 100 if question_above else 400
+    page.insert_text((72, question_y), "1 Study the table. [4 marks]", fontsize=11)
+    for row in range(4):
+        top = TABLE_TOP + row * 20
+        for column in range(3):
+            if row == merged_row and column > 0:
+                continue
+            left = 72 + column * 120
+            right = 432 if row == merged_row else left + 120
+            page.draw_rect(fitz.Rect(left, top, right, top + 20))
+            page.insert_text(
+                (left + 4, top + 14), f"r{row}c{column}", fontsize=9,
+                fontname="hebo" if bold_header and row == 0 else "helv"
+            )
+    data = doc.tobytes()
+    doc.close()
+    return data
+
+
+def only_table(parsed):
+    (table,) = parsed["pages"][0]["table_elements"]
+    return table
+
+
+def content_rows(parsed):
+    return sum(len(question["content"]) for question in parsed["questions"])
+
+
+def test_table_replaces_its_cell_spans():
+    parsed = PDFParser().parse_pdf(table_pdf())
+    table = only_table(parsed)
+
+    assert table["rows"] == [[f"r{r}c{c}" for c in range(3)] for r in range(4)]
+    assert len(table["column_x"]) == 4 and len(table["row_y"]) == 5
+    texts = [e["text"] for e in parsed["pages"][0]["text_elements"]]
+    assert not any(text.startswith("r") for text in texts)
+    TableData(**table)
+
+
+def test_merged_cells_continue_as_none():
+    parsed = PDFParser().parse_pdf(table_pdf(merged_row=1))
+    table = only_table(parsed)
+
+    assert table["rows"][1] == ["r1c0", None, None]
+    assert table["cells"][1][1:] == [None, None]
+    assert TableData(**table).rows[1] == ["r1c0", None, None]
+
+
+def test_bold_first_row_is_a_header():
+    assert only_table(PDFParser().parse_pdf(table_pdf(bold_header=True)))["header_row"] is True
+
+
+def test_first_row_styled_like_the_body_is_not_a_header():
+    assert only_table(PDFParser().parse_pdf(table_pdf()))["header_row"] is False
+
+
+def test_rows_saved_match_the_content_rows_avoided():
+    with_tables = PDFParser().parse_pdf(table_pdf(merged_row=2))
+    # Without table or diagram detection every cell span is its own text row
+    without_tables = PDFParser(detect_tables=False, diagram_min_paths=10**6).parse_pdf(
+        table_pdf(merged_row=2)
+    )
+
+    saved = with_tables["stats"]["table_rows_saved"]
+    assert saved == only_table(with_tables)["spans_replaced"] - 1 == 9
+    assert content_rows(without_tables) - content_rows(with_tables) == saved
+
+
+def test_tables_outside_any_question_save_no_rows():
+    parsed = PDFParser().parse_pdf(table_pdf(question_above=False))
+
+    assert parsed["stats"]["tables"] == 1
+    assert parsed["stats"]["table_rows_saved"] == 0
+    assert all(item["type"] != "TABLE" for q in parsed["questions"] for item in q["content"])
@@ -6,6 +6,10 @@ from datetime import datetime
 from supabase import create_client, Client
 
 
+# PaperStyle fields copied onto the text rows that reference a style
+STYLE_FIELDS = ("font_family", "font_size", "is_bold", "is_italic", "color")
+
+
 class StorageService:
     """Service for uploading images to Supabase Storage."""
     
@@ -160,6 +164,15 @@ class DatabaseService:
         
         paper = paper_response.data[0]
         
+        # Text rows stored with a style_id carry no inline formatting
+        styles_response = (
+            self.client.table("PaperStyle")
+            .select("*")
+            .eq("paper_id", paper_id)
+            .execute()
+        )
+        styles = {row["style_id"]: row for row in styles_response.data}
+        
         questions_response = (
             self.client.table("Question")
             .select("*")
@@ -178,6 +191,11 @@ class DatabaseService:
                 .execute()
             )
             
+            for content in content_response.data:
+                style = styles.get(content.get("style_id"))
+                if style is not None:
+                    content.update({field: style[field] for field in STYLE_FIELDS})
+            
             question["content"] = content_response.data
             questions.append(question)
         
@@ -0,0 +1,50 @@
+-- Paper catalogue listing with keyset pagination.
+-- Run after `npx prisma db push`, e.g. in the Supabase SQL Editor.
+
+-- One page of paper summaries in (exam_board, year, session, paper_number, id)
+-- order, starting after the given sort key. The row comparison walks the
+-- "Paper_exam_board_year_session_paper_number_id_idx" index, and question
+-- counts come from the (paper_id, sequence_order) index, so the cost of a
+-- page does not depend on how many papers come before it.
+CREATE OR REPLACE FUNCTION list_papers(
+    exam_board_filter text DEFAULT NULL,
+    year_filter int DEFAULT NULL,
+    session_filter text DEFAULT NULL,
+    paper_number_filter int DEFAULT NULL,
+    after_exam_board text DEFAULT NULL,
+    after_year int DEFAULT NULL,
+    after_session text DEFAULT NULL,
+    after_paper_number int DEFAULT NULL,
+    after_id text DEFAULT NULL,
+    page_size int DEFAULT 50
+)
+RETURNS TABLE (
+    id text,
+    title text,
+    exam_board text,
+    subject text,
+    level text,
+    year int,
+    session text,
+    paper_number int,
+    total_marks int,
+    uploaded_at timestamp,
+    question_count bigint
+)
+LANGUAGE sql STABLE
+AS $$
+    SELECT p.id, p.title, p.exam_board, p.subject, p.level, p.year, p.session,
+           p.paper_number, p.total_marks, p.uploaded_at,
+           (SELECT count(*) FROM "Question" q WHERE q.paper_id = p.id)
+    FROM "Paper" p
+    WHERE p.ingest_status = 'complete'
+      AND (exam_board_filter IS NULL OR p.exam_board = exam_board_filter)
+      AND (year_filter IS NULL OR p.year = year_filter)
+      AND (session_filter IS NULL OR p.session = session_filter)
+      AND (paper_number_filter IS NULL OR p.paper_number = paper_number_filter)
+      AND (after_id IS NULL OR
+           (p.exam_board, p.year, p.session, p.paper_number, p.id) >
+           (after_exam_board, after_year, after_session, after_paper_number, after_id))
+    ORDER BY p.exam_board, p.year, p.session, p.paper_number, p.id
+    LIMIT page_size;
+$$;
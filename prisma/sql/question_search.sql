@@ -0,0 +1,58 @@
+-- Full-text search over questions.
+-- Run after `npx prisma db push`, e.g. in the Supabase SQL Editor.
+
+-- Replace the placeholder column Prisma creates with a generated one
+ALTER TABLE "Question" DROP COLUMN IF EXISTS search_vector;
+ALTER TABLE "Question"
+    ADD COLUMN search_vector tsvector
+    GENERATED ALWAYS AS (to_tsvector('english', coalesce(plain_text, ''))) STORED;
+
+CREATE INDEX IF NOT EXISTS "Question_search_vector_idx"
+    ON "Question" USING GIN (search_vector);
+
+-- Ranked question hits with paper metadata, optionally filtered by exam
+-- board and year. Called via PostgREST RPC or directly over SQL.
+CREATE OR REPLACE FUNCTION search_questions(
+    query text,
+    exam_board_filter text DEFAULT NULL,
+    year_filter int DEFAULT NULL,
+    result_limit int DEFAULT 20,
+    result_offset int DEFAULT 0
+)
+RETURNS TABLE (
+    question_id text,
+    question_number text,
+    marks int,
+    paper_id text,
+    paper_title text,
+    exam_board text,
+    year int,
+    session text,
+    paper_number int,
+    rank real,
+    snippet text
+)
+LANGUAGE sql STABLE
+AS $$
+    -- Rank and limit first, so headlines are only built for returned rows
+    WITH hits AS (
+        SELECT q.id, q.question_number, q.marks, q.plain_text, q.paper_id,
+               ts_rank_cd(q.search_vector, tsq) AS rank, tsq
+        FROM "Question" q
+        JOIN "Paper" p ON p.id = q.paper_id,
+             websearch_to_tsquery('english', query) AS tsq
+        WHERE q.search_vector @@ tsq
+          AND p.ingest_status = 'complete'
+          AND (exam_board_filter IS NULL OR p.exam_board = exam_board_filter)
+          AND (year_filter IS NULL OR p.year = year_filter)
+        ORDER BY rank DESC, q.id
+        LIMIT result_limit OFFSET result_offset
+    )
+    SELECT h.id, h.question_number, h.marks, p.id, p.title, p.exam_board,
+           p.year, p.session, p.paper_number, h.rank,
+           ts_headline('english', h.plain_text, h.tsq,
+                       'MaxFragments=1, MinWords=10, MaxWords=30')
+    FROM hits h
+    JOIN "Paper" p ON p.id = h.paper_id
+    ORDER BY h.rank DESC, h.id;
+$$;
@@ -0,0 +1,30 @@
+-- Removal of question rows left over from an earlier segmentation.
+-- Run after `npx prisma db push`, e.g. in the Supabase SQL Editor.
+
+-- Re-segmentation upserts a paper's new rows over the old ones first, so
+-- readers never see the paper without questions, then calls this to drop
+-- rows the new segmentation no longer has, in one transaction. Content and
+-- bands of removed questions go with them (ON DELETE CASCADE); for kept
+-- questions, bands are matched as (band, question_id) pairs.
+CREATE OR REPLACE FUNCTION prune_questions(
+    paper text,
+    question_ids text[],
+    content_ids text[],
+    band_question_ids text[],
+    bands text[]
+)
+RETURNS void
+LANGUAGE sql VOLATILE
+AS $$
+    DELETE FROM "Question"
+    WHERE paper_id = paper AND NOT (id = ANY(question_ids));
+
+    DELETE FROM "QuestionContent"
+    WHERE question_id = ANY(question_ids) AND NOT (id = ANY(content_ids));
+
+    DELETE FROM "QuestionBand" b
+    WHERE b.question_id = ANY(question_ids)
+      AND (b.band, b.question_id) NOT IN (
+          SELECT k.band, k.question_id FROM unnest(bands, band_question_ids) AS k(band, question_id)
+      );
+$$;